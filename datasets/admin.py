@@ -0,0 +1,40 @@
+from django.contrib import admin
+from .models import CSVUpload, CSVUploadChunk, ExportJob, Tombstone
+
+
+@admin.register(CSVUpload)
+class CSVUploadAdmin(admin.ModelAdmin):
+    list_display = ('original_name', 'user', 'kind', 'status', 'size', 'short_sha256', 'duplicate_of', 'created_at')
+    list_filter = ('kind', 'status', 'created_at')
+    search_fields = ('original_name', 'sha256', 'user__email', 'task_id')
+    readonly_fields = ('sha256', 'result', 'created_at', 'completed_at')
+    ordering = ('-created_at',)
+
+    def short_sha256(self, obj):
+        return obj.sha256[:12]
+
+    short_sha256.short_description = "SHA-256"
+
+
+@admin.register(CSVUploadChunk)
+class CSVUploadChunkAdmin(admin.ModelAdmin):
+    list_display = ('upload', 'start_row', 'end_row', 'start_byte', 'end_byte', 'error_count', 'duration', 'created_at')
+    search_fields = ('upload__original_name', 'upload__sha256')
+    ordering = ('-created_at',)
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('dataset', 'format', 'user', 'status', 'row_count', 'size', 'created_at', 'completed_at')
+    list_filter = ('dataset', 'format', 'status', 'created_at')
+    search_fields = ('user__email', 'fingerprint', 'task_id', 'file_key')
+    readonly_fields = ('fingerprint', 'params', 'error', 'created_at', 'completed_at')
+    ordering = ('-created_at',)
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('feed', 'object_id', 'owner_id', 'deleted_at')
+    list_filter = ('feed', 'deleted_at')
+    search_fields = ('object_id', 'owner_id')
+    ordering = ('-deleted_at',)
@@ -0,0 +1,197 @@
+import csv
+import gzip
+import hashlib
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from accounts.utils import send_notification
+from .arrow import COLUMNAR_FORMATS, arrow_available, write_parquet
+from .exports import Echo, get_export
+from .models import ExportJob
+from .uploads import get_writer, presigned_url
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "parquet")
+CSV_LINES_PER_WRITE = 1000  # ✅ CSV lines joined before each compressed write
+
+
+class ExportRequestError(ValueError):
+    """The export request cannot be served (unknown dataset or format, or invalid filters)."""
+
+
+def export_fingerprint(user_id, dataset_name, fmt, params):
+    """Identity of an export request: same user, dataset, format and filters → same fingerprint."""
+    payload = json.dumps([user_id, dataset_name, fmt, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def export_file_key(job):
+    extension = "csv.gz" if job.format == "csv" else "parquet"
+    return f"exports/{job.user_id}/{job.dataset}_{job.id}.{extension}"
+
+
+def request_export(user, dataset_name, params, fmt="csv"):
+    """
+    Create an export job for `user`, or return the identical job already pending or running.
+    Returns (job, created). Raises ExportRequestError for requests that cannot be served.
+    """
+    dataset = get_export(dataset_name)
+    if dataset is None:
+        raise ExportRequestError(f"Unknown dataset '{dataset_name}'.")
+    if fmt not in EXPORT_FORMATS:
+        raise ExportRequestError(f"Unsupported format '{fmt}'. Use one of: {', '.join(EXPORT_FORMATS)}.")
+    if fmt == "parquet" and not arrow_available():
+        raise ExportRequestError("Parquet exports are not available on this server.")
+
+    params = dataset.clean_params(params)
+    try:
+        dataset.queryset(user, params)  # ✅ Reject invalid filters now rather than in the worker
+    except ValueError as e:
+        raise ExportRequestError(str(e))
+    except ValidationError as e:
+        raise ExportRequestError(" ".join(e.messages))
+
+    fingerprint = export_fingerprint(user.id, dataset.name, fmt, params)
+    expire_stale_export_jobs(fingerprint)
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(user=user, dataset=dataset.name, params=params, format=fmt, fingerprint=fingerprint)
+            transaction.on_commit(lambda: enqueue_export(job))  # ✅ The worker never sees an uncommitted job
+    except IntegrityError:
+        # ✅ An identical export is already queued or running: share it
+        job = ExportJob.objects.filter(fingerprint=fingerprint, status__in=["pending", "running"]).first()
+        if job is None:  # It finished in the meantime; start a fresh one
+            return request_export(user, dataset_name, params, fmt)
+        logger.info(f"♻️ Export request by {user} matches in-flight job {job.id}")
+        return job, False
+    return job, True
+
+
+def expire_stale_export_jobs(fingerprint=None):
+    """
+    Mark pending or running jobs older than `EXPORT_JOB_STALE_MINUTES` as failed (their task was lost,
+    e.g. the worker died), so they no longer hold the in-flight slot of identical requests.
+    Returns the number of jobs expired.
+    """
+    cutoff = timezone.now() - timedelta(minutes=getattr(settings, "EXPORT_JOB_STALE_MINUTES", 60))
+    stale = ExportJob.objects.filter(status__in=["pending", "running"], created_at__lt=cutoff)
+    if fingerprint:
+        stale = stale.filter(fingerprint=fingerprint)
+    expired = stale.update(status="failed", error="Timed out.", completed_at=timezone.now())
+    if expired:
+        logger.warning(f"⚠️ Expired {expired} stale export job(s)")
+    return expired
+
+
+def enqueue_export(job):
+    """Queue the task of a new job; if the broker is unreachable, fail the job instead of leaving it pending."""
+    from .tasks import run_export_job  # Imported here: the task module imports this one
+
+    try:
+        task = run_export_job.delay(job.id)
+    except Exception as e:
+        logger.error(f"🚨 Could not queue export job {job.id}: {e}")
+        job.status = "failed"
+        job.error = f"Could not be queued: {e}"
+        job.completed_at = timezone.now()
+        job.save(update_fields=["status", "error", "completed_at"])
+        return
+    job.task_id = task.id
+    job.save(update_fields=["task_id"])
+
+class _CountingWriter:
+    """Wraps a storage writer to count the bytes written through it."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.size = 0
+
+    def write(self, data):
+        self.writer.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+def _write_csv_gzip(dataset, queryset, writer):
+    """Compressed CSV, streamed: rows → csv lines → gzip → storage writer. Returns (rows, bytes)."""
+    rows = 0
+    csv_writer = csv.writer(Echo())
+    counter = _CountingWriter(writer)
+    with gzip.GzipFile(fileobj=counter, mode="wb", compresslevel=6) as gz:
+        lines = [csv_writer.writerow(dataset.headers)]
+        for row in dataset.rows(queryset):
+            lines.append(csv_writer.writerow(row))
+            rows += 1
+            if len(lines) >= CSV_LINES_PER_WRITE:
+                gz.write("".join(lines).encode("utf-8"))
+                lines = []
+        if lines:
+            gz.write("".join(lines).encode("utf-8"))
+    return rows, counter.size
+
+
+def export_download_url(job):
+    """Fresh time-limited link to the file of a completed job."""
+    filename = job.file_key.rsplit("/", 1)[-1]
+    return presigned_url(job.file_key, getattr(settings, "EXPORT_LINK_EXPIRY_SECONDS", 24 * 3600), filename=filename)
+
+
+def run_export(job):
+    """
+    Produce the file of an export job in storage and notify the user with a download link.
+    Failures mark the job failed and notify the user as well.
+    """
+    job.status = "running"
+    job.save(update_fields=["status"])
+    dataset = get_export(job.dataset)
+    key = export_file_key(job)
+    try:
+        queryset = dataset.queryset(job.user, job.params)
+        if default_storage.exists(key):
+            default_storage.delete(key)  # ✅ A retried job rewrites its file
+        writer = get_writer(key, content_type=COLUMNAR_FORMATS["parquet"][0] if job.format == "parquet" else None)
+        try:
+            if job.format == "parquet":
+                rows, size = write_parquet(dataset, queryset, writer)
+            else:
+                rows, size = _write_csv_gzip(dataset, queryset, writer)
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
+    except Exception as e:
+        logger.error(f"🚨 Export job {job.id} ({job.dataset}, {job.format}) failed: {e}")
+        job.status = "failed"
+        job.error = str(e)
+        job.completed_at = timezone.now()
+        job.save(update_fields=["status", "error", "completed_at"])
+        send_notification(job.user, f"⚠️ Your {job.dataset} export failed. Please try again later.", "system")
+        return job
+
+    job.status = "completed"
+    job.file_key = key
+    job.row_count = rows
+    job.size = size
+    job.completed_at = timezone.now()
+    job.save(update_fields=["status", "file_key", "row_count", "size", "completed_at"])
+
+    hours = getattr(settings, "EXPORT_LINK_EXPIRY_SECONDS", 24 * 3600) // 3600
+    send_notification(
+        job.user,
+        f"📦 Your {job.dataset} export ({rows} rows, {job.get_format_display()}) is ready: "
+        f"{export_download_url(job)} (link valid for {hours} hours)",
+        "system",
+    )
+    logger.info(f"✅ Export job {job.id}: {rows} rows, {size} bytes written to {key}")
+    return job
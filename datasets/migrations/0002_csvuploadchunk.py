@@ -0,0 +1,36 @@
+# Generated by Django 5.0.11 on 2026-10-19 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CSVUploadChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_row', models.PositiveIntegerField()),
+                ('end_row', models.PositiveIntegerField()),
+                ('start_byte', models.BigIntegerField()),
+                ('end_byte', models.BigIntegerField()),
+                ('created_ids', models.JSONField(blank=True, default=list)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('duration', models.FloatField(default=0.0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('upload', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='datasets.csvupload')),
+            ],
+            options={
+                'ordering': ['start_byte'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='csvuploadchunk',
+            constraint=models.UniqueConstraint(fields=('upload', 'start_byte'), name='unique_csv_upload_chunk'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.11 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('datasets', '0002_csvuploadchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='csvuploadchunk',
+            name='rejections',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
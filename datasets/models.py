@@ -0,0 +1,147 @@
+from django.db import models
+from django.conf import settings
+
+
+class CSVUpload(models.Model):
+    """
+    One uploaded CSV file, fingerprinted (SHA-256) while it was streamed to storage.
+    Used to skip re-processing identical content for the same user and model version.
+    """
+    KIND_CHOICES = [
+        ("recommendations", "Recommendations CSV"),
+        ("soil", "Soil CSV"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="csv_uploads")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    original_name = models.CharField(max_length=255)
+    file_key = models.CharField(max_length=500)  # ✅ Storage key (R2 object key or local path)
+    file_url = models.URLField(max_length=1000, blank=True)
+    size = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64)
+    model_version = models.CharField(max_length=255, blank=True, default="")  # Empty when no model is involved (soil)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    task_id = models.CharField(max_length=255, blank=True, default="")
+    result = models.JSONField(default=dict, blank=True)  # ✅ Task result, including the created object IDs
+    duplicate_of = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True, related_name="duplicates")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "kind", "sha256", "model_version"], name="csv_upload_fingerprint_idx"),
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.original_name} ({self.kind}, {self.sha256[:12]}…) - {self.status}"
+
+
+class CSVUploadChunk(models.Model):
+    """
+    Checkpoint of one committed byte (and row) range of a CSVUpload.
+    Written in the same transaction as the chunk's rows, so a retried task resumes after the last
+    committed range and a chunk can never be written twice (unique start_byte per upload).
+    Chunk tasks of a fanned-out upload number rows from the start of their byte range;
+    `datasets.utils.renumber_chunks` makes them file-wide once every range is done.
+    """
+    upload = models.ForeignKey(CSVUpload, on_delete=models.CASCADE, related_name="chunks")
+    start_row = models.PositiveIntegerField()  # ✅ 0-based data row offset (header excluded)
+    end_row = models.PositiveIntegerField()  # Exclusive
+    start_byte = models.BigIntegerField()  # ✅ File offset of the chunk's first record
+    end_byte = models.BigIntegerField()  # Exclusive: where a resumed task seeks to
+    created_ids = models.JSONField(default=list, blank=True)
+    error_count = models.PositiveIntegerField(default=0)  # Rows skipped (invalid data, unknown crop, ...)
+    rejections = models.JSONField(default=dict, blank=True)  # ✅ Skipped rows, column-wise: {"row": [...], "reason": [...], ...}
+    duration = models.FloatField(default=0.0)  # Seconds spent processing the chunk
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["upload", "start_byte"], name="unique_csv_upload_chunk"),
+        ]
+        ordering = ["start_byte"]
+
+    def __str__(self):
+        return f"Upload {self.upload_id} rows {self.start_row}-{self.end_row}"
+
+
+class ExportJob(models.Model):
+    """
+    A background export of one registered dataset (`datasets.exports`) for a user.
+    `fingerprint` identifies the request (user, dataset, format, filters), so identical requests
+    made while a job is still pending or running share that job instead of starting another one.
+    """
+    FORMAT_CHOICES = [
+        ("csv", "CSV (gzip)"),
+        ("parquet", "Parquet"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="export_jobs")
+    dataset = models.CharField(max_length=50)  # ✅ Registered ExportDataset name
+    params = models.JSONField(default=dict, blank=True)  # Accepted filters only
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default="csv")
+    fingerprint = models.CharField(max_length=64)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    task_id = models.CharField(max_length=255, blank=True, default="")
+    file_key = models.CharField(max_length=500, blank=True, default="")  # ✅ Storage key of the finished file
+    row_count = models.PositiveIntegerField(default=0)
+    size = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # ✅ At most one in-flight job per identical request (enforced by the database, not a race-prone lookup)
+            models.UniqueConstraint(
+                fields=["fingerprint"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="unique_inflight_export_job",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="export_job_user_idx"),
+        ]
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.dataset} export ({self.format}) for {self.user} - {self.status}"
+
+
+class Tombstone(models.Model):
+    """
+    Marker left when a synced record is deleted, so delta-sync clients (`datasets.sync`) learn
+    about deletions. `owner_id` is the record's user id, kept as a plain column (not a foreign key)
+    so tombstones written while a user's records are cascade-deleted don't block the user's deletion.
+    """
+    feed = models.CharField(max_length=50)  # ✅ Registered SyncFeed name, e.g. "recommendations"
+    object_id = models.BigIntegerField()
+    owner_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["feed", "owner_id", "deleted_at", "id"], name="tombstone_owner_feed_idx"),
+            models.Index(fields=["feed", "deleted_at", "id"], name="tombstone_feed_idx"),
+        ]
+        ordering = ["deleted_at", "id"]
+
+    def __str__(self):
+        return f"{self.feed} #{self.object_id} deleted at {self.deleted_at}"
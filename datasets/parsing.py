@@ -0,0 +1,159 @@
+import io
+import logging
+from collections import Counter
+
+import pandas as pd
+from dateutil import parser as date_parser
+from pandas.tseries.api import guess_datetime_format
+
+logger = logging.getLogger(__name__)
+
+FORMAT_SAMPLE_SIZE = 200  # ✅ Values inspected to detect a column's timestamp format
+READ_SIZE = 1024 * 1024  # Bytes read from the storage stream at a time by the CSV record splitter
+
+
+def detect_time_format(values, sample_size=FORMAT_SAMPLE_SIZE):
+    """
+    Guess the strftime format of a column of timestamp strings from a sample of its values.
+    Returns the format most of the sample agrees on, or None when there is no consistent one.
+    """
+    sample = [v for v in values[:sample_size] if v]
+    guesses = Counter(guess_datetime_format(v) for v in sample)
+    guesses.pop(None, None)
+    if not guesses:
+        return None
+    time_format, count = guesses.most_common(1)[0]
+    return time_format if count * 2 > len(sample) else None
+
+
+def _parse_one(value):
+    """Per-row fallback (the previous behaviour): dateutil, naive times taken as UTC."""
+    try:
+        parsed = pd.Timestamp(date_parser.parse(value))
+    except (ValueError, OverflowError):
+        return pd.NaT
+    return parsed.tz_localize("UTC") if parsed.tzinfo is None else parsed.tz_convert("UTC")
+
+
+def parse_timestamps(series):
+    """
+    Parse a column of timestamps to timezone-aware UTC in one vectorized pass.
+
+    The format is detected from a sample and the whole column is parsed with
+    `pd.to_datetime(..., format=..., utc=True)`; only values that do not match it are parsed
+    one by one with dateutil. Naive times are taken as UTC, aware ones are converted to UTC.
+    Unparseable values become NaT.
+    """
+    text = series.astype("string").str.strip()
+    text = text.mask(text == "")
+    values = text.dropna().tolist()
+
+    time_format = detect_time_format(values)
+    if time_format:
+        parsed = pd.to_datetime(text, format=time_format, utc=True, errors="coerce")
+    else:
+        parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns, UTC]")
+
+    failed = parsed.isna() & text.notna()
+    if failed.any():
+        logger.info(f"⚠️ {int(failed.sum())} of {len(text)} timestamps did not match '{time_format}'; parsing them individually.")
+        parsed[failed] = pd.to_datetime(text[failed].map(_parse_one), utc=True)
+    return parsed
+
+
+def iter_csv_records(stream, read_size=READ_SIZE):
+    """
+    Yield the raw records of a CSV byte stream (bytes, line ending included), reading `read_size` bytes
+    at a time. The stream must start at a record boundary. A newline inside a quoted field stays in its
+    record (quote parity, as in RFC 4180).
+    """
+    buffer = b""
+    pending = b""  # Start of a record whose quoted field continues on the next line
+    while True:
+        data = stream.read(read_size)
+        if not data:
+            break
+        lines = (buffer + data).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            record = pending + line + b"\n"
+            if record.count(b'"') % 2:
+                pending = record
+                continue
+            pending = b""
+            yield record
+    tail = pending + buffer
+    if tail:
+        yield tail
+
+
+def read_csv_header(stream):
+    """Column names of a CSV byte stream and the size in bytes of its header record (where the data starts)."""
+    record = next(iter_csv_records(stream, read_size=64 * 1024), b"")
+    return pd.read_csv(io.BytesIO(record), nrows=0).columns.tolist(), len(record)
+
+
+def record_boundaries(stream, position, targets, read_size=READ_SIZE):
+    """
+    The first record boundary at or after each of `targets` (ascending byte offsets) in a CSV byte stream
+    that starts at the record boundary `position`. Boundaries are the offsets just after a newline outside
+    quoted fields: quote parity is tracked from `position`, so a quoted field spanning lines is never cut.
+    Targets sharing a boundary yield it once; targets past the last newline yield nothing.
+    Only counts bytes (no parsing), so a whole file is scanned at close to read speed.
+    """
+    boundaries, pending = [], list(targets)
+    in_quotes = False
+    while pending:
+        data = stream.read(read_size)
+        if not data:
+            break
+        scan = 0  # Quote parity is accounted for up to here
+        while pending:
+            # A boundary at the target itself follows a newline at target - 1
+            start = max(pending[0] - position - 1, scan)
+            if start >= len(data):
+                break
+            in_quotes ^= data.count(b'"', scan, start) % 2 == 1
+            scan = start
+            newline = data.find(b"\n", scan)
+            while newline >= 0:
+                in_quotes ^= data.count(b'"', scan, newline) % 2 == 1
+                scan = newline + 1
+                if not in_quotes:
+                    break
+                newline = data.find(b"\n", scan)
+            if newline < 0:
+                break  # Keep looking in the next read
+            boundary = position + scan
+            boundaries.append(boundary)
+            while pending and pending[0] <= boundary:
+                pending.pop(0)
+        in_quotes ^= data.count(b'"', scan) % 2 == 1
+        position += len(data)
+    return boundaries
+
+
+def iter_csv_blocks(stream, rows_per_block, position, stop_byte=None):
+    """
+    Split the data records of a CSV byte stream into blocks of `rows_per_block` rows, cut at record
+    boundaries, so each block can be parsed on its own (`pd.read_csv(io.BytesIO(data), header=None)`).
+    The stream starts at the record boundary `position` of the file; yields `(data, start_byte, end_byte)`,
+    which lets a checkpoint record where the next block starts.
+    With `stop_byte` (a record boundary, see `record_boundaries`) only the records before it are read,
+    so byte ranges of a file can be processed independently.
+    Blank lines are carried along but not counted (pandas skips them too).
+    """
+    records, rows, start = [], 0, position
+    for record in iter_csv_records(stream):
+        if stop_byte is not None and position >= stop_byte:
+            break
+        records.append(record)
+        position += len(record)
+        if not record.strip():
+            continue
+        rows += 1
+        if rows % rows_per_block == 0:
+            yield b"".join(records), start, position
+            records, start = [], position
+    if any(record.strip() for record in records):
+        yield b"".join(records), start, position
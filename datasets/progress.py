@@ -0,0 +1,124 @@
+import logging
+import time
+
+import redis
+from django.conf import settings
+from django.db.models import F, Sum
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_TTL = 24 * 3600  # ✅ Progress snapshots expire a day after the last update
+
+_client = None
+
+
+def _redis():
+    global _client
+    if _client is None:
+        url = getattr(settings, "TASK_PROGRESS_REDIS_URL", None) or settings.CELERY_BROKER_URL
+        _client = redis.Redis.from_url(url, socket_timeout=5, socket_connect_timeout=5)
+    return _client
+
+
+def _key(upload_id):
+    return f"csv-progress:{upload_id}"
+
+
+def _snapshot(values):
+    """
+    Public progress shape from the Redis hash (bytes → typed values, plus an ETA).
+    Progress is tracked in bytes of the file: the row count of an upload is only known once it has
+    been read, so while it is processing `rows_total` is estimated from the average row size so far.
+    """
+    values = {k.decode(): v.decode() for k, v in values.items()}
+    if not values:
+        return None
+    rows_done = int(values.get("rows_done", 0))
+    bytes_total = int(values.get("bytes_total", 0))
+    bytes_done = int(values.get("bytes_done", 0))
+    bytes_this_run = int(values.get("bytes_this_run", 0))
+    processing = values.get("status", "processing") == "processing"
+    if not processing:
+        rows_total = rows_done
+    else:
+        rows_total = round(rows_done * bytes_total / bytes_done) if bytes_done else 0
+    elapsed = max(time.time() - float(values.get("started_at", time.time())), 0.0)
+    eta = None
+    if processing and bytes_this_run and bytes_total:
+        eta = round(elapsed / bytes_this_run * max(bytes_total - bytes_done, 0), 1)
+    snapshot = {
+        "status": values.get("status", "processing"),
+        "rows_total": rows_total,
+        "rows_done": rows_done,
+        "errors": int(values.get("errors", 0)),
+        "elapsed_seconds": round(elapsed, 1),
+        "eta_seconds": eta,
+    }
+    if "created" in values:
+        snapshot["created"] = int(values["created"])
+    return snapshot
+
+
+def start_progress(upload, bytes_total):
+    """
+    Reset the progress of `upload`, whose data records span `bytes_total` bytes
+    (counting chunks already checkpointed by an earlier attempt).
+    """
+    committed = upload.chunks.aggregate(
+        rows=Sum(F("end_row") - F("start_row")), bytes=Sum(F("end_byte") - F("start_byte")), errors=Sum("error_count"),
+    )
+    try:
+        client = _redis()
+        with client.pipeline() as pipe:
+            pipe.delete(_key(upload.id))
+            pipe.hset(_key(upload.id), mapping={
+                "status": "processing", "bytes_total": bytes_total, "bytes_done": committed["bytes"] or 0,
+                "bytes_this_run": 0, "rows_done": committed["rows"] or 0, "errors": committed["errors"] or 0,
+                "started_at": time.time(),
+            })
+            pipe.expire(_key(upload.id), PROGRESS_TTL)
+            pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Could not record progress for upload {upload.id}: {e}")
+
+
+def report_progress(upload_id, rows, size, errors=0):
+    """Add a committed chunk (`rows` rows, `size` bytes of the file) to the progress of an upload (safe to call from parallel chunk tasks)."""
+    try:
+        client = _redis()
+        with client.pipeline() as pipe:
+            pipe.hincrby(_key(upload_id), "rows_done", rows)
+            pipe.hincrby(_key(upload_id), "bytes_done", size)
+            pipe.hincrby(_key(upload_id), "bytes_this_run", size)
+            pipe.hincrby(_key(upload_id), "errors", errors)
+            pipe.expire(_key(upload_id), PROGRESS_TTL)
+            pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Could not record progress for upload {upload_id}: {e}")
+
+
+def finish_progress(upload):
+    """Record the final state of `upload` (completed or failed)."""
+    result = upload.result or {}
+    try:
+        client = _redis()
+        mapping = {"status": upload.status, "created": len(result.get("created_recommendations") or result.get("saved_ids") or [])}
+        if "error_count" in result:
+            mapping["errors"] = result["error_count"]
+        with client.pipeline() as pipe:
+            pipe.hset(_key(upload.id), mapping=mapping)
+            pipe.hsetnx(_key(upload.id), "started_at", time.time())
+            pipe.expire(_key(upload.id), PROGRESS_TTL)
+            pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Could not record progress for upload {upload.id}: {e}")
+
+
+def get_progress(upload_id):
+    """Latest progress snapshot of an upload, or None (nothing recorded yet, or Redis unavailable)."""
+    try:
+        return _snapshot(_redis().hgetall(_key(upload_id)))
+    except redis.RedisError as e:
+        logger.warning(f"⚠️ Could not read progress for upload {upload_id}: {e}")
+        return None
+
@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import os
+
+import pandas as pd
+from django.core.files.storage import default_storage
+
+from .uploads import StreamedUpload, get_writer
+
+logger = logging.getLogger(__name__)
+
+REJECTION_COLUMNS = ("row", "reason", "column", "value")
+MAX_VALUE_LENGTH = 200  # ✅ Long offending values (e.g. exception messages) are truncated
+
+
+class RejectedRows:
+    """
+    Rows skipped during an import, gathered column-wise:
+    `row` (1-based data row number), `reason` (code), `column` and the offending `value`.
+    """
+
+    def __init__(self):
+        self.columns = {name: [] for name in REJECTION_COLUMNS}
+
+    def add(self, row, reason, column="", value=""):
+        value = "" if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+        self.columns["row"].append(int(row))
+        self.columns["reason"].append(reason)
+        self.columns["column"].append(column)
+        self.columns["value"].append(value[:MAX_VALUE_LENGTH])
+
+    def __len__(self):
+        return len(self.columns["row"])
+
+    def as_dict(self):
+        return self.columns if len(self) else {}
+
+
+def rejections_report_key(upload):
+    """
+    Storage key of the rejected-rows report, next to the uploaded file. It includes the upload id:
+    de-duplicated uploads share a `file_key`, and one upload's report must not overwrite another's.
+    """
+    base, _ = os.path.splitext(upload.file_key)
+    return f"{base}.{upload.pk}.rejected.csv"
+
+
+def write_rejections_report(upload, storage=None):
+    """
+    Write the rejected rows of every committed chunk of `upload` to one CSV (row, reason, column, value),
+    streamed chunk by chunk. Returns a `StreamedUpload`, or None when no row was rejected.
+    """
+    storage = storage or default_storage
+    key = rejections_report_key(upload)
+    if storage.exists(key):
+        storage.delete(key)  # ✅ A retried upload rewrites its report instead of creating report_1.csv
+
+    writer = get_writer(key, storage)
+    digest = hashlib.sha256()
+    size = rows = 0
+    try:
+        for chunk in upload.chunks.exclude(error_count=0).order_by("start_byte").only("rejections"):
+            if not chunk.rejections:
+                continue
+            data = pd.DataFrame(chunk.rejections, columns=REJECTION_COLUMNS).to_csv(index=False, header=rows == 0).encode("utf-8")
+            digest.update(data)
+            writer.write(data)
+            size += len(data)
+            rows += len(chunk.rejections["row"])
+        if rows == 0:
+            writer.abort()
+            return None
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    logger.info(f"⚠️ {rows} rejected rows of upload {upload.pk} written to {key}")
+    return StreamedUpload(key=key, url=storage.url(key), size=size, sha256=digest.hexdigest())
@@ -0,0 +1,147 @@
+import base64
+import json
+import logging
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Tombstone
+
+logger = logging.getLogger(__name__)
+
+_feeds = {}
+
+
+class SyncTokenExpired(Exception):
+    """The token predates the tombstone retention window: deletions may have been missed, resync fully."""
+
+
+@dataclass
+class SyncFeed:
+    """
+    A change feed over one model: rows created or updated since a sync token (by `updated_field`),
+    plus tombstones of rows deleted since then.
+    `queryset(user)` is what the user may see; `owner_scoped` feeds only return the user's own tombstones.
+    """
+    name: str
+    model: type
+    updated_field: str
+    queryset: Callable  # (user) -> QuerySet
+    serializer_class: type
+    owner_field: str = "user"
+    owner_scoped: bool = True
+
+
+def _record_tombstone(sender, instance, **kwargs):
+    for feed in _feeds.values():
+        if feed.model is sender:
+            Tombstone.objects.create(feed=feed.name, object_id=instance.pk, owner_id=getattr(instance, f"{feed.owner_field}_id", None))
+
+
+def register_sync_feed(feed):
+    """Make `feed` available by name and start recording tombstones for deletions of its model."""
+    _feeds[feed.name] = feed
+    post_delete.connect(_record_tombstone, sender=feed.model, dispatch_uid=f"sync-tombstone-{feed.model._meta.label}")
+    return feed
+
+
+def get_sync_feed(name):
+    """Registered SyncFeed by name, or None."""
+    return _feeds.get(name)
+
+
+def encode_token(changes, deletes):
+    """
+    Opaque sync token: the (timestamp, id) position reached in the changes and in the tombstones.
+    An id of None means "everything up to and including that timestamp" (a sync stopped there).
+    """
+    payload = {"c": [changes[0].isoformat(), changes[1]], "d": [deletes[0].isoformat(), deletes[1]]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_token(token):
+    """Decode a token produced by `encode_token`. Raises ValueError for malformed tokens."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        positions = []
+        for key in ("c", "d"):
+            value, pk = payload[key]
+            moment = parse_datetime(value)
+            if moment is None:
+                raise ValueError(value)
+            positions.append((moment, None if pk is None else int(pk)))
+    except (TypeError, KeyError, ValueError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid sync token: {token}") from e
+    return positions[0], positions[1]
+
+
+def _after(field, position, overlap):
+    """
+    Rows after `position`. A position with an id continues a paged read exactly; one without an id
+    (where an earlier sync stopped) is moved back by `overlap`, see `sync_changes`.
+    """
+    moment, pk = position
+    if pk is None:
+        return Q(**{f"{field}__gt": moment - overlap})
+    return Q(**{f"{field}__gt": moment}) | Q(**{field: moment, "pk__gt": pk})
+
+
+def _page(queryset, field, position, upper, limit, overlap):
+    """Rows after `position` and not after `upper`, in (field, id) order: (rows, new position, has_more)."""
+    if position is not None:
+        queryset = queryset.filter(_after(field, position, overlap))
+    rows = list(queryset.filter(**{f"{field}__lte": upper}).order_by(field, "pk")[:limit + 1])
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, (getattr(rows[-1], field), rows[-1].pk), True
+    return rows, (upper, None), False  # ✅ Exhausted: everything up to `upper` has been seen
+
+
+def sync_changes(feed, user, token=None, limit=None):
+    """
+    Changes of `feed` visible to `user` since `token` (None: initial sync, every current row and no deletions).
+    Returns (changed rows, deleted ids, next token, has_more). Clients apply the changes, then call
+    again with the next token; while `has_more` is true they should do so right away.
+
+    Timestamps are taken before a transaction commits, so a row can become visible with a timestamp
+    older than a position already handed out. A sync that starts where the previous one stopped
+    therefore re-reads the last SYNC_OVERLAP_SECONDS before it: rows committed by transactions shorter
+    than that are not skipped, and rows (and deleted ids) already sent may be sent again.
+    Clients must apply changes as upserts by id and ignore deleted ids they no longer have.
+    Raises SyncTokenExpired when tombstones the client needs may already have been purged.
+    """
+    limit = limit or getattr(settings, "SYNC_PAGE_SIZE", 500)
+    overlap = timedelta(seconds=getattr(settings, "SYNC_OVERLAP_SECONDS", 120))
+    upper = timezone.now()
+    if token:
+        changes_position, deletes_position = decode_token(token)
+        retention = timedelta(days=getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 30))
+        if deletes_position[0] < timezone.now() - retention:
+            raise SyncTokenExpired()
+    else:
+        changes_position, deletes_position = None, (upper, None)
+
+    rows, changes_position, more_changes = _page(feed.queryset(user), feed.updated_field, changes_position, upper, limit, overlap)
+
+    tombstones = Tombstone.objects.filter(feed=feed.name)
+    if feed.owner_scoped:
+        tombstones = tombstones.filter(owner_id=user.id)
+    deleted, deletes_position, more_deletes = _page(tombstones, "deleted_at", deletes_position, upper, limit, overlap)
+
+    # ✅ Each stream keeps its own position: a deleted row can't reappear among the changes,
+    # so the two never need to be cut at the same point
+    token = encode_token(changes_position, deletes_position)
+    return rows, [t.object_id for t in deleted], token, more_changes or more_deletes
+
+
+def purge_tombstones(days=None):
+    """Delete tombstones older than the retention window. Returns the number deleted."""
+    days = days or getattr(settings, "SYNC_TOMBSTONE_RETENTION_DAYS", 30)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
@@ -0,0 +1,42 @@
+import logging
+from celery import shared_task
+from django.conf import settings
+from .jobs import expire_stale_export_jobs, run_export
+from .sync import purge_tombstones
+from .models import ExportJob
+
+logger = logging.getLogger(__name__)
+
+
+# ✅ Hard limit so a hung export cannot hold its in-flight slot; the soft limit lets run_export mark the job failed
+@shared_task(
+    time_limit=getattr(settings, "EXPORT_JOB_TIME_LIMIT", 30 * 60),
+    soft_time_limit=getattr(settings, "EXPORT_JOB_TIME_LIMIT", 30 * 60) - 60,
+)
+def run_export_job(job_id):
+    """Build the file of an ExportJob in the background; the user is notified with a download link."""
+    job = ExportJob.objects.select_related("user").filter(id=job_id).first()
+    if job is None:
+        logger.warning(f"⚠️ Export job {job_id} no longer exists.")
+        return None
+    if job.status == "completed":
+        logger.info(f"⏩ Export job {job_id} already completed.")
+        return job.file_key
+    if job.status == "failed":
+        logger.info(f"⏩ Export job {job_id} was expired before it ran.")
+        return job.status
+    return run_export(job).status
+
+
+@shared_task
+def purge_tombstones_task():
+    """Periodic (Celery beat) cleanup of delete markers older than the sync retention window."""
+    deleted = purge_tombstones()
+    logger.info(f"✅ Purged {deleted} sync tombstones")
+    return deleted
+
+
+@shared_task
+def expire_stale_export_jobs_task():
+    """Periodic (Celery beat) failover for export jobs whose task was lost, so their status stops reading "pending"."""
+    return expire_stale_export_jobs()
@@ -0,0 +1,365 @@
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+import pandas as pd
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.http import HttpResponse, StreamingHttpResponse
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from soil.models import SoilData
+
+from farming_ai.middleware import BufferedGZipMiddleware
+
+from .parsing import iter_csv_blocks, read_csv_header, record_boundaries
+from .uploads import FileSystemWriter, open_stream, stream_upload
+from . import jobs
+from .models import CSVUpload, CSVUploadChunk, ExportJob, Tombstone
+from .reports import RejectedRows, write_rejections_report
+from .sync import encode_token
+from .utils import collect_chunk_results, find_processed_duplicate, finish_upload, mark_duplicate, register_upload, renumber_chunks
+
+
+@override_settings(DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage", UPLOAD_CHUNK_SIZE=1024)
+class StreamUploadTestCase(SimpleTestCase):
+    CONTENT = b"".join(f"2025-03-01 10:00,Corn,{i}\n".encode() for i in range(1000))
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+
+    def test_streams_in_chunks(self):
+        writes = []
+        write = FileSystemWriter.write
+        with mock.patch.object(FileSystemWriter, "write", autospec=True, side_effect=lambda self, data: (writes.append(len(data)), write(self, data))):
+            # ✅ Large request bodies are spooled to a temporary file, read back chunk by chunk
+            with TemporaryUploadedFile("rows.csv", "text/csv", len(self.CONTENT), None) as uploaded:
+                uploaded.write(self.CONTENT)
+                streamed = stream_upload(uploaded, "uploads/t/rows.csv")
+
+        self.assertEqual(max(writes), 1024)  # ✅ Never more than one UPLOAD_CHUNK_SIZE chunk at a time
+        self.assertEqual(sum(writes), len(self.CONTENT))
+        self.assertEqual((streamed.size, streamed.sha256), (len(self.CONTENT), hashlib.sha256(self.CONTENT).hexdigest()))
+        with default_storage.open(streamed.key, "rb") as stored:
+            self.assertEqual(stored.read(), self.CONTENT)
+        with open_stream(streamed.key, start=100) as stream:
+            self.assertEqual(stream.read(50), self.CONTENT[100:150])
+
+    def test_existing_key_is_not_overwritten(self):
+        first = stream_upload(SimpleUploadedFile("rows.csv", b"a\n"), "uploads/t/rows.csv")
+        second = stream_upload(SimpleUploadedFile("rows.csv", b"b\n"), "uploads/t/rows.csv")
+        self.assertNotEqual(first.key, second.key)
+        with default_storage.open(first.key, "rb") as stored:
+            self.assertEqual(stored.read(), b"a\n")
+
+    def test_failed_upload_leaves_no_file(self):
+        uploaded = SimpleUploadedFile("rows.csv", self.CONTENT)
+        with mock.patch.object(uploaded, "chunks", return_value=self.failing_chunks()):
+            with self.assertRaises(OSError):
+                stream_upload(uploaded, "uploads/t/rows.csv")
+        self.assertFalse(os.path.exists(default_storage.path("uploads/t/rows.csv")))
+
+    @staticmethod
+    def failing_chunks():
+        yield b"time,crop\n"
+        raise OSError("connection reset")
+
+
+class RecordBoundariesTestCase(SimpleTestCase):
+    """
+    Byte ranges cut by `record_boundaries` must hold whole records, even when a quoted field
+    spans lines (and contains quotes) right where a fixed-size cut would fall.
+    """
+
+    CSV = (
+        b'time,crop,notes\n'
+        b'2025-03-01 10:00,Corn,"north\nfield"\n'
+        b'2025-03-01 11:00,Wheat,plain\n'
+        b'2025-03-01 12:00,Corn,"said ""dry""\nthen\n""wet"""\n'
+        b'\n'
+        b'2025-03-01 13:00,Oats,"a,b"\n'
+        b'2025-03-01 14:00,Corn,"x\n\ny"\n'
+        b'2025-03-01 15:00,Rye,last\n'
+    )
+
+    def blocks(self, position, stop_byte=None):
+        stream = io.BytesIO(self.CSV[position:])
+        return [block for block, _, _ in iter_csv_blocks(stream, 2, position, stop_byte=stop_byte)]
+
+    def frame(self, blocks, columns):
+        return pd.concat(
+            [pd.read_csv(io.BytesIO(block), header=None, names=columns) for block in blocks], ignore_index=True,
+        )
+
+    def test_ranges_match_sequential_read(self):
+        columns, data_start = read_csv_header(io.BytesIO(self.CSV))
+        expected = self.frame(self.blocks(data_start), columns)
+        self.assertEqual(len(expected), 6)
+
+        for range_bytes in range(1, len(self.CSV)):
+            for read_size in (1, 7, 64):
+                targets = range(data_start + range_bytes, len(self.CSV), range_bytes)
+                stream = io.BytesIO(self.CSV[data_start:])
+                cuts = [cut for cut in record_boundaries(stream, data_start, targets, read_size) if cut < len(self.CSV)]
+                for cut in cuts:  # ✅ Never inside a quoted field
+                    self.assertEqual(self.CSV[:cut].count(b'"') % 2, 0)
+                    self.assertEqual(self.CSV[cut - 1:cut], b"\n")
+
+                blocks = []
+                for start, stop in zip([data_start, *cuts], [*cuts, len(self.CSV)]):
+                    blocks.extend(self.blocks(start, stop))
+                with self.subTest(range_bytes=range_bytes, read_size=read_size):
+                    pd.testing.assert_frame_equal(self.frame(blocks, columns), expected)
+
+
+@override_settings(DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage")
+class UploadDeduplicationTestCase(TestCase):
+    """Identical content (by SHA-256) is stored once per user and processed once per model version."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(
+            first_name="Test", last_name="Farmer", username="farmer", email="farmer@example.com", password="pass",
+        )
+        cls.other_user = User.objects.create_user(
+            first_name="Other", last_name="Farmer", username="other", email="other@example.com", password="pass",
+        )
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+
+    def register(self, content, user=None, name="rows.csv", model_version="v1"):
+        streamed = stream_upload(SimpleUploadedFile(name, content), f"uploads/t/{name}")
+        return register_upload(user or self.user, "recommendations", streamed, name, model_version=model_version)
+
+    def test_identical_content_is_stored_once(self):
+        first = self.register(b"time,crop\n2025-03-01,Corn\n")
+        second = self.register(b"time,crop\n2025-03-01,Corn\n", name="copy.csv")
+        self.assertEqual(second.file_key, first.file_key)
+        self.assertEqual(second.sha256, first.sha256)
+        self.assertEqual(os.listdir(default_storage.path("uploads/t")), [os.path.basename(first.file_key)])
+
+        self.assertNotEqual(self.register(b"time,crop\n2025-03-02,Corn\n").file_key, first.file_key)
+        self.assertNotEqual(self.register(b"time,crop\n2025-03-01,Corn\n", user=self.other_user).file_key, first.file_key)
+
+    def test_failed_upload_is_not_reused(self):
+        first = self.register(b"time,crop\n")
+        finish_upload(first, {"error": "Missing required columns"}, status="failed")
+        self.assertNotEqual(self.register(b"time,crop\n").file_key, first.file_key)
+
+    def test_processed_duplicate(self):
+        first = self.register(b"time,crop\n2025-03-01,Corn\n")
+        second = self.register(b"time,crop\n2025-03-01,Corn\n")
+        self.assertIsNone(find_processed_duplicate(second))  # ✅ Nothing completed yet
+
+        finish_upload(first, {"message": "CSV processed", "created_recommendations": [1, 2]})
+        self.assertEqual(find_processed_duplicate(second), first)
+        self.assertEqual(mark_duplicate(second, first)["created_recommendations"], [1, 2])
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.duplicate_of), ("completed", first))
+
+        # ✅ A new model version re-processes the same file
+        self.assertIsNone(find_processed_duplicate(self.register(b"time,crop\n2025-03-01,Corn\n", model_version="v2")))
+
+
+@override_settings(DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage")
+class RejectedRowsReportTestCase(TestCase):
+    """Chunk tasks number rows per byte range; the report lists file-wide row numbers, in file order."""
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        user = get_user_model().objects.create_user(
+            first_name="Test", last_name="Farmer", username="farmer", email="farmer@example.com", password="pass",
+        )
+        self.upload = CSVUpload.objects.create(
+            user=user, kind="recommendations", original_name="rows.csv", file_key="uploads/t/rows.csv", sha256="0" * 64,
+        )
+
+    def chunk(self, start_byte, start_row, end_row, rejected=(), created_ids=()):
+        rejections = RejectedRows()
+        for row in rejected:
+            rejections.add(row, "unknown_crop", "crop", "Kale")
+        CSVUploadChunk.objects.create(
+            upload=self.upload, start_byte=start_byte, end_byte=start_byte + 100, start_row=start_row, end_row=end_row,
+            error_count=len(rejections), rejections=rejections.as_dict(), created_ids=list(created_ids),
+        )
+
+    def test_renumbered_report(self):
+        # Committed out of order by three range tasks; each range numbers its rows from 0
+        self.chunk(200, 0, 4, rejected=[2], created_ids=[9, 10, 11])
+        self.chunk(0, 0, 5, rejected=[1, 5], created_ids=[1, 2, 3])
+        self.chunk(100, 0, 3, created_ids=[5, 6, 7])
+
+        self.assertEqual(renumber_chunks(self.upload), 2)
+        self.assertEqual(renumber_chunks(self.upload), 0)  # ✅ Idempotent
+        chunks = self.upload.chunks.values_list("start_row", "end_row")
+        self.assertEqual(list(chunks), [(0, 5), (5, 8), (8, 12)])
+
+        created_ids, error_count, _ = collect_chunk_results(self.upload)
+        self.assertEqual((created_ids, error_count), ([1, 2, 3, 5, 6, 7, 9, 10, 11], 3))
+        report = write_rejections_report(self.upload)
+        with default_storage.open(report.key) as stored:
+            rows = pd.read_csv(stored)
+        self.assertEqual(rows["row"].tolist(), [1, 5, 10])
+        self.assertEqual(report.key, f"uploads/t/rows.{self.upload.pk}.rejected.csv")
+
+    def test_no_rejections_no_report(self):
+        self.chunk(0, 0, 5, created_ids=[1])
+        self.assertIsNone(write_rejections_report(self.upload))
+
+
+@override_settings(DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage", EXPORT_JOB_STALE_MINUTES=60)
+class ExportJobTestCase(TestCase):
+    """Identical requests share the in-flight job; jobs whose task was lost are expired and replaced."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            first_name="Test", last_name="Farmer", username="farmer", email="farmer@example.com", password="pass",
+        )
+        for day in range(3):
+            SoilData.objects.create(user=cls.user, time=timezone.now() - timedelta(days=day), location="Farm", moisture=day)
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+        self.enqueue = self.enterContext(mock.patch.object(jobs, "enqueue_export"))
+
+    def request(self, **params):
+        with self.captureOnCommitCallbacks(execute=True):
+            return jobs.request_export(self.user, "soil", {"location": "Farm", **params})
+
+    def test_identical_requests_share_the_inflight_job(self):
+        job, created = self.request()
+        self.assertTrue(created)
+        self.enqueue.assert_called_once_with(job)  # ✅ Queued once the job is committed
+
+        same, created = self.request(location=" Farm ", unknown="x")  # Same filters once cleaned
+        self.assertEqual((same, created), (job, False))
+        other, created = self.request(start_date="2025-01-01")
+        self.assertTrue(created)
+        self.assertNotEqual(other, job)
+        self.assertEqual(self.enqueue.call_count, 2)
+
+        ExportJob.objects.filter(pk=job.pk).update(status="completed")
+        self.assertTrue(self.request()[1])  # ✅ A finished job no longer holds the slot
+
+    def test_stale_job_is_expired(self):
+        job, _ = self.request()
+        ExportJob.objects.filter(pk=job.pk).update(status="running", created_at=timezone.now() - timedelta(minutes=61))
+        fresh, created = self.request()
+        self.assertTrue(created)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ("failed", "Timed out."))
+
+        ExportJob.objects.filter(pk=fresh.pk).update(created_at=timezone.now() - timedelta(minutes=61))
+        self.assertEqual(jobs.expire_stale_export_jobs(), 1)
+        self.assertEqual(jobs.expire_stale_export_jobs(), 0)
+
+    def test_invalid_filters_are_rejected(self):
+        with self.assertRaises(jobs.ExportRequestError):
+            self.request(start_date="yesterday")
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_export_runs(self):
+        self.enqueue.side_effect = jobs.run_export
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse("export-jobs"), {"dataset": "soil", "format": "csv"}, HTTP_HOST="localhost")
+        self.assertEqual(response.status_code, 202)
+        job = ExportJob.objects.get()
+        self.assertEqual((job.status, job.row_count), ("completed", 3))
+        with default_storage.open(job.file_key, "rb") as stored:
+            self.assertEqual(len(gzip.decompress(stored.read()).decode().splitlines()), 4)
+
+
+class SyncFeedTestCase(TestCase):
+    """Delta sync of the soil feed: paging, changes and tombstones since a token, expired and malformed tokens."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            first_name="Test", last_name="Farmer", username="farmer", email="farmer@example.com", password="pass",
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.soil = [
+            SoilData.objects.create(time=timezone.now(), location=f"Farm {i}", moisture=float(i)) for i in range(5)
+        ]
+
+    def sync(self, token=None, limit=2, expected_status=200):
+        params = {"limit": limit, **({"token": token} if token else {})}
+        response = self.client.get(reverse("soil-data-changes"), params)
+        self.assertEqual(response.status_code, expected_status, response.content[:300])
+        return response.json()
+
+    def sync_all(self, token=None):
+        changed, deleted, pages = {}, set(), 0
+        while True:
+            page = self.sync(token)
+            pages += 1
+            changed.update((row["id"], row) for row in page["changed"])
+            deleted.update(page["deleted"])
+            token = page["token"]
+            if not page["has_more"]:
+                return changed, deleted, token, pages
+
+    def test_initial_sync_pages_through_every_row(self):
+        changed, deleted, _, pages = self.sync_all()
+        self.assertEqual(set(changed), {soil.id for soil in self.soil})
+        self.assertEqual((deleted, pages), (set(), 3))
+
+    def test_changes_and_deletions_since_token(self):
+        _, _, token, _ = self.sync_all()
+        self.soil[0].moisture = 99.0
+        self.soil[0].save()
+        deleted_id = self.soil[1].id
+        self.soil[1].delete()
+        added = SoilData.objects.create(time=timezone.now(), location="Farm 5", moisture=5.0)
+
+        # ✅ Rows near the previous token may come again (overlap window); what changed must be there
+        changed, deleted, _, _ = self.sync_all(token)
+        self.assertEqual(changed[self.soil[0].id]["moisture"], 99.0)
+        self.assertIn(added.id, changed)
+        self.assertNotIn(deleted_id, changed)
+        self.assertEqual(deleted, {deleted_id})
+
+    def test_expired_token(self):
+        old = timezone.now() - timedelta(days=31)
+        self.assertEqual(self.sync(encode_token((old, None), (old, None)), expected_status=410)["status"], "error")
+        self.assertEqual(self.sync("not-a-token", expected_status=400)["status"], "error")
+
+    def test_owner_scoped_tombstones(self):
+        token = self.client.get(reverse("recommendation_changes")).json()["token"]
+        Tombstone.objects.create(feed="recommendations", object_id=1, owner_id=self.user.id)
+        Tombstone.objects.create(feed="recommendations", object_id=2, owner_id=self.user.id + 1)
+        response = self.client.get(reverse("recommendation_changes"), {"token": token})
+        self.assertEqual(response.json()["deleted"], [1])
+
+
+class ResponseCompressionTestCase(SimpleTestCase):
+    """Buffered responses are gzipped; streamed exports (CSV, Parquet, Arrow) are sent as they are."""
+
+    def process(self, response):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+        return BufferedGZipMiddleware(lambda request: response)(request)
+
+    def test_buffered_response_is_gzipped(self):
+        response = self.process(HttpResponse(b'{"rows": []}' * 100, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+
+    def test_streaming_response_is_not_gzipped(self):
+        response = self.process(StreamingHttpResponse(iter([b"a,b\\n"] * 100), content_type="text/csv"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(response.streaming_content), b"a,b\\n" * 100)
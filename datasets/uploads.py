@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import mimetypes
+import os
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+
+logger = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # ✅ S3/R2 reject multipart parts smaller than 5 MiB (except the last one)
+
+
+@dataclass
+class StreamedUpload:
+    """Outcome of `stream_upload`: where the file went and what it contained."""
+    key: str
+    url: str
+    size: int
+    sha256: str
+
+
+def _part_size():
+    return max(getattr(settings, "UPLOAD_PART_SIZE", 8 * 1024 * 1024), MIN_PART_SIZE)
+
+
+class S3MultipartWriter:
+    """
+    Writes a stream to an S3-compatible bucket (Cloudflare R2) as a multipart upload.
+    At most one part (`part_size` bytes) is buffered in memory at a time.
+    The object is stored with `content_type`, so it is not served as `binary/octet-stream`.
+    """
+
+    def __init__(self, storage, key, content_type=None):
+        self.storage = storage
+        self.client = storage.connection.meta.client
+        self.bucket = storage.bucket_name
+        self.key = key
+        self.content_type = content_type or guess_content_type(key)
+        self.part_size = _part_size()
+        self.upload_id = None
+        self.parts = []
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer.extend(data)
+        if len(self.buffer) >= self.part_size:
+            self._flush_part()
+
+    def _flush_part(self):
+        if self.upload_id is None:
+            self.upload_id = self.client.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key, ContentType=self.content_type,
+            )["UploadId"]
+        part_number = len(self.parts) + 1
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=bytes(self.buffer),
+        )
+        self.parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+        self.buffer.clear()
+
+    def close(self):
+        if self.upload_id is None:
+            # ✅ Small file: a single PUT is cheaper than a one-part multipart upload
+            self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer), ContentType=self.content_type)
+        else:
+            if self.buffer:
+                self._flush_part()
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                MultipartUpload={"Parts": self.parts},
+            )
+        self.buffer = bytearray()
+
+    def abort(self):
+        if self.upload_id is not None:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        self.buffer = bytearray()
+
+
+class FileSystemWriter:
+    """
+    Local stand-in for `S3MultipartWriter` (development and tests): same interface, writes chunks to disk.
+    """
+
+    def __init__(self, storage, key, content_type=None):
+        self.storage = storage
+        self.key = key
+        self.path = storage.path(key)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, "wb")
+
+    def write(self, data):
+        self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def guess_content_type(key):
+    """Content type for a storage key from its extension (`application/octet-stream` when unknown)."""
+    content_type, encoding = mimetypes.guess_type(key)
+    if encoding == "gzip":
+        return "application/gzip"  # ✅ e.g. .csv.gz: downloaded as-is, not transparently decompressed
+    return content_type or "application/octet-stream"
+
+
+def get_writer(key, storage=None, content_type=None):
+    """
+    Pick the writer for the configured storage backend (multipart for S3/R2, plain file otherwise).
+    `content_type` defaults to a guess from the key's extension.
+    """
+    storage = storage or default_storage
+    if isinstance(storage, FileSystemStorage):
+        return FileSystemWriter(storage, key, content_type)
+    if hasattr(storage, "bucket_name") and hasattr(storage, "connection"):
+        # django-storages keeps a "location" prefix inside the bucket
+        name = storage._normalize_name(key) if hasattr(storage, "_normalize_name") else key
+        return S3MultipartWriter(storage, name, content_type or guess_content_type(key))
+    raise ValueError(f"Streaming uploads are not supported for storage backend {type(storage).__name__}.")
+
+
+def open_stream(key, storage=None, start=0):
+    """
+    Open a stored file for sequential reading from byte `start` without downloading it first.
+    For S3/R2 this is the (ranged) `get_object` body (read on demand); locally a plain file seeked to `start`.
+    """
+    storage = storage or default_storage
+    if hasattr(storage, "bucket_name") and hasattr(storage, "connection") and not isinstance(storage, FileSystemStorage):
+        name = storage._normalize_name(key) if hasattr(storage, "_normalize_name") else key
+        params = {"Bucket": storage.bucket_name, "Key": name}
+        if start:
+            params["Range"] = f"bytes={start}-"
+        return storage.connection.meta.client.get_object(**params)["Body"]
+    stream = storage.open(key, "rb")
+    if start:
+        stream.seek(start)
+    return stream
+
+
+def stream_upload(uploaded_file, key, storage=None):
+    """
+    Copy a Django `UploadedFile` to storage chunk by chunk, hashing it on the way.
+    Peak memory is one multipart part, regardless of the file size.
+    The stored object keeps the content type the client sent (guessed from the key when missing).
+    Returns a `StreamedUpload`.
+    """
+    storage = storage or default_storage
+    key = storage.get_available_name(key)
+    writer = get_writer(key, storage, getattr(uploaded_file, "content_type", None))
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        for chunk in uploaded_file.chunks(chunk_size=getattr(settings, "UPLOAD_CHUNK_SIZE", 1024 * 1024)):
+            digest.update(chunk)
+            writer.write(chunk)
+            size += len(chunk)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    result = StreamedUpload(key=key, url=storage.url(key), size=size, sha256=digest.hexdigest())
+    logger.info(f"✅ Streamed {size} bytes to {result.url} (sha256 {result.sha256[:12]}…)")
+    return result
+
+
+def presigned_url(key, expires=None, storage=None, filename=None):
+    """
+    Time-limited download link for a stored file. For S3/R2 a presigned `get_object` URL
+    (valid `expires` seconds, optionally served as `filename`); locally the storage URL.
+    """
+    storage = storage or default_storage
+    expires = expires or getattr(settings, "EXPORT_LINK_EXPIRY_SECONDS", 24 * 3600)
+    if hasattr(storage, "bucket_name") and hasattr(storage, "connection"):
+        name = storage._normalize_name(key) if hasattr(storage, "_normalize_name") else key
+        params = {"Bucket": storage.bucket_name, "Key": name}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        return storage.connection.meta.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires)
+    return storage.url(key)
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import BulkExportAPIView, ExportJobAPIView, ExportJobDetailAPIView
+
+urlpatterns = [
+    path("exports/", ExportJobAPIView.as_view(), name="export-jobs"),
+    path("exports/<int:job_id>/", ExportJobDetailAPIView.as_view(), name="export-job-detail"),
+    path("bulk/<str:dataset>/", BulkExportAPIView.as_view(), name="bulk-export"),
+]
@@ -0,0 +1,108 @@
+import logging
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from .models import CSVUpload, CSVUploadChunk
+from .progress import finish_progress
+
+logger = logging.getLogger(__name__)
+
+
+def register_upload(user, kind, streamed, original_name, model_version=""):
+    """
+    Record a streamed upload (`datasets.uploads.StreamedUpload`).
+    When the user already uploaded identical content, the new storage object is deleted
+    and the record points at the existing one, so each distinct file is stored once.
+    """
+    earlier = (
+        CSVUpload.objects.filter(user=user, kind=kind, sha256=streamed.sha256)
+        .exclude(status="failed").order_by("created_at").first()
+    )
+    file_key, file_url = streamed.key, streamed.url
+    if earlier and earlier.file_key != streamed.key and default_storage.exists(earlier.file_key):
+        default_storage.delete(streamed.key)
+        file_key, file_url = earlier.file_key, earlier.file_url
+        logger.info(f"♻️ Upload {original_name} is identical to {earlier.original_name}; reusing {file_key}")
+
+    return CSVUpload.objects.create(
+        user=user,
+        kind=kind,
+        original_name=original_name[:255],
+        file_key=file_key,
+        file_url=file_url,
+        size=streamed.size,
+        sha256=streamed.sha256,
+        model_version=model_version,
+    )
+
+
+def find_processed_duplicate(upload):
+    """Latest completed upload with the same content, user, kind and model version (or None)."""
+    return (
+        CSVUpload.objects.filter(
+            user_id=upload.user_id, kind=upload.kind, sha256=upload.sha256,
+            model_version=upload.model_version, status="completed",
+        )
+        .exclude(pk=upload.pk).order_by("-completed_at").first()
+    )
+
+
+def mark_duplicate(upload, previous):
+    """Short-circuit `upload` to the result (and created IDs) of an identical, already processed upload."""
+    upload.duplicate_of = previous.duplicate_of or previous
+    upload.result = {**previous.result, "duplicate_of": upload.duplicate_of_id}
+    upload.status = "completed"
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=["duplicate_of", "result", "status", "completed_at"])
+    finish_progress(upload)
+    logger.info(f"♻️ Upload {upload.pk} duplicates upload {upload.duplicate_of_id}; skipping processing.")
+    return upload.result
+
+
+def finish_upload(upload, result, status="completed"):
+    upload.result = result
+    upload.status = status
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=["result", "status", "completed_at"])
+    finish_progress(upload)
+
+
+def resume_position(upload, start_byte=0, stop_byte=None):
+    """
+    Where processing of the byte range [start_byte, stop_byte) of `upload` resumes: `(row, byte)` after
+    the last committed chunk of the range (rows counted from the start of the range), or None when nothing
+    in it was checkpointed yet. Ranges are processed in order, so committed chunks are a prefix.
+    """
+    chunks = upload.chunks.filter(start_byte__gte=start_byte)
+    if stop_byte is not None:
+        chunks = chunks.filter(start_byte__lt=stop_byte)
+    last = chunks.order_by("-start_byte").only("end_row", "end_byte").first()
+    return (last.end_row, last.end_byte) if last else None
+
+
+def renumber_chunks(upload):
+    """
+    Give the committed chunks of `upload` (and their rejected rows) file-wide row numbers.
+    Each chunk starts where the chunks before it in the file end; a no-op for sequentially processed files.
+    """
+    changed, row = [], 0
+    for chunk in upload.chunks.order_by("start_byte").only("start_row", "end_row", "rejections"):
+        shift = row - chunk.start_row
+        if shift:
+            chunk.start_row += shift
+            chunk.end_row += shift
+            if chunk.rejections:
+                chunk.rejections["row"] = [number + shift for number in chunk.rejections["row"]]
+            changed.append(chunk)
+        row = chunk.end_row
+    CSVUploadChunk.objects.bulk_update(changed, ["start_row", "end_row", "rejections"], batch_size=500)
+    return len(changed)
+
+
+def collect_chunk_results(upload):
+    """Created IDs, error count and timings of every committed chunk, in file order."""
+    created_ids, error_count, durations = [], 0, []
+    for chunk in upload.chunks.order_by("start_byte").only("created_ids", "error_count", "duration"):
+        created_ids.extend(chunk.created_ids)
+        error_count += chunk.error_count
+        durations.append(chunk.duration)
+    return created_ids, error_count, durations
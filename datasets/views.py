@@ -0,0 +1,143 @@
+from django.core.exceptions import ValidationError
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from .arrow import COLUMNAR_FORMATS, arrow_available, streaming_columnar_response
+from .exports import get_export
+from .jobs import ExportRequestError, export_download_url, request_export
+from .models import ExportJob
+from .sync import SyncTokenExpired, get_sync_feed, sync_changes
+
+
+def _job_payload(job):
+    payload = {
+        "id": job.id,
+        "dataset": job.dataset,
+        "format": job.format,
+        "params": job.params,
+        "status": job.status,
+        "row_count": job.row_count,
+        "size": job.size,
+        "created_at": job.created_at,
+        "completed_at": job.completed_at,
+    }
+    if job.status == "completed":
+        payload["download_url"] = export_download_url(job)  # ✅ Fresh link on every request
+    if job.status == "failed":
+        payload["error"] = "The export failed. Please try again."
+    return payload
+
+
+class ExportJobAPIView(APIView):
+    """
+    POST: request a background export (`dataset`, `format` = csv|parquet, plus the dataset's filters).
+    Identical requests still in flight return the existing job. GET: the user's recent export jobs.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        jobs = ExportJob.objects.filter(user=request.user)[:20]
+        return Response({"status": "success", "jobs": [_job_payload(job) for job in jobs]})
+
+    def post(self, request):
+        data = request.data
+        params = {key: data.get(key) for key in data}  # ✅ Unknown keys are dropped by the dataset's filter list
+        try:
+            job, created = request_export(request.user, data.get("dataset"), params, data.get("format") or "csv")
+        except ExportRequestError as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if created and job.status == "failed":
+            return Response(
+                {"status": "error", "message": "The export could not be started. Please try again later.", "job": _job_payload(job)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        if created:
+            message = "Export started. You will be notified when the file is ready."
+        else:
+            message = "An identical export is already in progress."
+        return Response(
+            {"status": "success", "message": message, "job": _job_payload(job)},
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        )
+
+
+class ExportJobDetailAPIView(APIView):
+    """Status of one export job (with a fresh download link once completed)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = ExportJob.objects.filter(user=request.user, id=job_id).first()
+        if job is None:
+            return Response({"status": "error", "message": "Export job not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"status": "success", "job": _job_payload(job)})
+
+
+class BulkExportAPIView(APIView):
+    """
+    Columnar bulk export of a registered dataset for analytics and model retraining.
+    `?output=arrow` (default, Arrow IPC stream) or `?output=parquet`, plus the dataset's filters.
+    Rows are read with `values_list` in large batches and encoded as Arrow record batches,
+    skipping model instances and JSON serialization entirely.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, dataset):
+        export = get_export(dataset)
+        if export is None:
+            return Response({"status": "error", "message": f"Unknown dataset '{dataset}'."}, status=status.HTTP_404_NOT_FOUND)
+        output = request.query_params.get("output", "arrow")  # Not `format`: DRF reserves it for renderer selection
+        if output not in COLUMNAR_FORMATS:
+            return Response(
+                {"status": "error", "message": f"Unsupported output '{output}'. Use one of: {', '.join(COLUMNAR_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not arrow_available():
+            return Response(
+                {"status": "error", "message": "Columnar exports are not available on this server."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        try:
+            queryset = export.queryset(request.user, export.clean_params(request.query_params))
+        except ValueError as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValidationError as e:  # ✅ A filter value the ORM rejects (e.g. a dataset without date parsing)
+            return Response({"status": "error", "message": " ".join(e.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        return streaming_columnar_response(export, queryset, output)
+
+
+class SyncFeedAPIView(APIView):
+    """
+    Delta sync: `?token=` (omit on the first sync) returns the records created or updated since the
+    token (`changed`), the ids deleted since then (`deleted`) and the token for the next call.
+    Keep calling while `has_more` is true. `?fields=` limits the fields of the changed records.
+    Records and deleted ids near the previous token may be returned again: apply them by id.
+    """
+    permission_classes = [IsAuthenticated]
+    feed_name = None
+
+    def get(self, request):
+        feed = get_sync_feed(self.feed_name)
+        try:
+            limit = min(max(int(request.query_params.get("limit", 500)), 1), 1000)
+        except ValueError:
+            return Response({"status": "error", "message": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows, deleted, token, has_more = sync_changes(feed, request.user, request.query_params.get("token"), limit)
+        except SyncTokenExpired:
+            return Response(
+                {"status": "error", "message": "Sync token expired. Discard local data and sync again without a token."},
+                status=status.HTTP_410_GONE,
+            )
+        except ValueError as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = feed.serializer_class(rows, many=True, context={"request": request})
+        return Response({
+            "status": "success",
+            "changed": serializer.data,
+            "deleted": deleted,
+            "token": token,
+            "has_more": has_more,
+        })
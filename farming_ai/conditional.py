@@ -0,0 +1,44 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def conditional_get(validator):
+    """
+    Conditional GET for a view (plain or DRF; use `method_decorator` on class-based views).
+
+    `validator(request, *args, **kwargs)` returns a cheap fingerprint of the data behind the response
+    (e.g. max `updated_at` and row count), computed without building the payload. The ETag hashes it
+    with the path, the query string and the user, so a client sending a matching `If-None-Match`
+    gets `304 Not Modified` and the view body never runs.
+
+    Responses are marked `private, no-cache`: per-user data must not be shared by caches, and clients
+    revalidate on every request instead of reusing a copy heuristically.
+    """
+
+    def etag(request, *args, **kwargs):
+        parts = (
+            request.path,
+            request.GET.urlencode(),
+            getattr(request.user, "pk", None),
+            validator(request, *args, **kwargs),
+        )
+        return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD"):
+                if response.status_code not in (200, 304) and response.has_header("ETag"):
+                    del response.headers["ETag"]  # ✅ Errors must never be revalidated into a 304
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -2,6 +2,7 @@ from django.shortcuts import redirect
 from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.http import HttpResponseForbidden
+from django.middleware.gzip import GZipMiddleware
 
 class RestrictAdminAccessMiddleware(MiddlewareMixin):
     """Middleware to restrict access to Django Admin."""
@@ -27,3 +28,15 @@ class BlockWordPressScansMiddleware:
         if any(request.path.startswith(bp) for bp in blocked_paths):
             return HttpResponseForbidden("🚫 Forbidden: WordPress is not installed.")
         return self.get_response(request)
+
+
+class BufferedGZipMiddleware(GZipMiddleware):
+    """
+    Django's GZipMiddleware (with its BREACH mitigation) for buffered responses only.
+    Streaming responses (CSV, Parquet and Arrow exports) are sent as they are: Parquet and Arrow are
+    already compressed, and each streamed chunk would otherwise go through gzip on the web worker.
+    """
+    def process_response(self, request, response):
+        if response.streaming:
+            return response
+        return super().process_response(request, response)
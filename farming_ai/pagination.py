@@ -0,0 +1,123 @@
+import base64
+import json
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(row, ordering_field, reverse=False):
+    """
+    Encode the keyset position of `row` as an opaque, URL-safe cursor.
+    `reverse=True` marks a cursor that pages backwards (the "previous" link).
+    """
+    position = getattr(row, ordering_field)
+    payload = {"v": position.isoformat(), "id": row.pk, "r": reverse}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by `encode_cursor`. Raises ValueError for malformed cursors.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        position = parse_datetime(payload["v"])
+        pk = int(payload["id"])
+        reverse = bool(payload.get("r", False))
+    except (TypeError, KeyError, ValueError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if position is None:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return position, pk, reverse
+
+
+def keyset_paginate(queryset, ordering_field, cursor=None, page_size=10, descending=True):
+    """
+    Keyset (seek) pagination on (`ordering_field`, id).
+
+    Each page is a single indexed range query: `WHERE (field, id) < (last_field, last_id) ... LIMIT n + 1`,
+    so neither memory nor latency depends on the size of the table (no OFFSET scan, no COUNT(*)).
+
+    Returns a tuple `(rows, next_cursor, previous_cursor)`; cursors are None when there is no such page.
+    """
+    position, pk, reverse = decode_cursor(cursor) if cursor else (None, None, False)
+
+    # ✅ Walking backwards means flipping both the comparison and the sort direction
+    walk_descending = descending != reverse
+    if position is not None:
+        if walk_descending:
+            queryset = queryset.filter(Q(**{f"{ordering_field}__lt": position}) | Q(**{ordering_field: position, "pk__lt": pk}))
+        else:
+            queryset = queryset.filter(Q(**{f"{ordering_field}__gt": position}) | Q(**{ordering_field: position, "pk__gt": pk}))
+
+    prefix = "-" if walk_descending else ""
+    rows = list(queryset.order_by(f"{prefix}{ordering_field}", f"{prefix}pk")[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    if reverse:
+        rows.reverse()
+        next_cursor = encode_cursor(rows[-1], ordering_field) if rows else None
+        previous_cursor = encode_cursor(rows[0], ordering_field, reverse=True) if rows and has_more else None
+    else:
+        next_cursor = encode_cursor(rows[-1], ordering_field) if rows and has_more else None
+        previous_cursor = encode_cursor(rows[0], ordering_field, reverse=True) if rows and position is not None else None
+
+    return rows, next_cursor, previous_cursor
+
+
+class KeysetPagination(BasePagination):
+    """
+    DRF pagination class backed by `keyset_paginate`.
+    Views may set `paginator.descending = False` before paginating to page in ascending order.
+    """
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 50
+    cursor_query_param = "cursor"
+    ordering_field = "created_at"
+    descending = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        try:
+            rows, self.next_cursor, self.previous_cursor = keyset_paginate(
+                queryset, self.ordering_field,
+                cursor=request.query_params.get(self.cursor_query_param),
+                page_size=self.page_size,
+                descending=self.descending,
+            )
+        except ValueError:
+            raise NotFound("Invalid cursor.")
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), "page")  # ✅ Drop legacy page-number params
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.get_link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self.get_link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.page_size,
+            'results': data
+        })
@@ -0,0 +1,56 @@
+import datetime
+import decimal
+import uuid
+
+from django.utils.functional import Promise
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # ✅ Optional: without orjson the renderer falls back to DRF's JSONRenderer
+    orjson = None
+
+ORJSON_OPTIONS = (
+    (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+)
+
+
+def _default(obj):
+    """Types orjson does not handle natively, encoded the way DRF's JSONEncoder encodes them."""
+    if isinstance(obj, Promise):  # Lazy translation strings
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if hasattr(obj, "isoformat"):  # e.g. pandas.Timestamp
+        value = obj.isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+    if hasattr(obj, "tolist"):  # NumPy / pandas containers not covered by OPT_SERIALIZE_NUMPY
+        return obj.tolist()
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, "__iter__"):  # QuerySets, generators, sets
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer backed by orjson (several times faster on large payloads).
+    Serializes NumPy arrays/scalars and datetimes natively; NaN/Infinity become null instead of an error.
+    Indented output (`; indent=N` in the Accept header) and a missing orjson use the standard renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+
+
+# ✅ For views with large JSON payloads: `renderer_classes = FAST_RENDERER_CLASSES`
+FAST_RENDERER_CLASSES = [ORJSONRenderer, BrowsableAPIRenderer]
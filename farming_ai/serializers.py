@@ -0,0 +1,32 @@
+from rest_framework import serializers
+
+
+def requested_fields(request, param="fields"):
+    """
+    Field names asked for with `?fields=a,b,c`, or None when the parameter is absent/empty
+    (meaning "all fields").
+    """
+    if request is None:
+        return None
+    value = request.query_params.get(param, "")
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    return names or None
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin for sparse fieldsets: with `?fields=id,crop,created_at` in the request
+    (passed through the serializer context) only those fields are rendered.
+    Unknown field names are rejected with a 400 so typos don't silently return empty objects.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        names = requested_fields(self.context.get("request"))
+        if names is None:
+            return
+        unknown = names - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError({"fields": f"Unknown field(s): {', '.join(sorted(unknown))}."})
+        for name in set(self.fields) - names:
+            self.fields.pop(name)
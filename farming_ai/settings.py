@@ -83,6 +83,8 @@ INSTALLED_APPS = [
     'pages',
     'monetization',    
     'honeypot_admin',  
+    'geocoding',
+    'datasets',
 ]
 
 
@@ -97,14 +99,26 @@ REST_FRAMEWORK = {
     ),
 }
 
+# ✅ Opt-in: render every API response with orjson (views with large payloads already use it)
+FAST_JSON_RENDERER = os.getenv("FAST_JSON_RENDERER", "False") == "True"
+if FAST_JSON_RENDERER:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'farming_ai.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+
+
 
 # Middleware Configuration
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
 
-    # ✅ Static Files Middleware (for WhiteNoise)
+    # ✅ Static Files Middleware (for WhiteNoise; serves its own pre-compressed files)
     "whitenoise.middleware.WhiteNoiseMiddleware",
 
+    # ✅ Gzips buffered responses (with Django's BREACH mitigation); streamed exports are left alone
+    "farming_ai.middleware.BufferedGZipMiddleware",
+
     # ✅ Session & Authentication Middleware
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -273,7 +287,7 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # ✅ Enable Cloudflare R2 for Media Storage
-USE_CLOUDFLARE_R2 = True  # Ensure R2 is enabled
+USE_CLOUDFLARE_R2 = os.getenv("USE_CLOUDFLARE_R2", "True") == "True"  # Ensure R2 is enabled (False = local filesystem, e.g. tests)
 
 if USE_CLOUDFLARE_R2:
     DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
@@ -288,6 +302,23 @@ else:
     MEDIA_URL = "/media/"
     MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# ✅ Streaming uploads (datasets.uploads): files are copied in chunks, never held in memory whole
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Read size from Django's UploadedFile
+UPLOAD_PART_SIZE = 8 * 1024 * 1024  # Multipart part size for R2/S3 (min 5 MiB)
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", 5000))  # Rows per chunk when processing uploaded CSVs
+# ✅ Larger uploads are split into byte ranges processed in parallel by a Celery chord
+CSV_PARALLEL_MIN_BYTES = int(os.getenv("CSV_PARALLEL_MIN_BYTES", 5 * 1024 * 1024))
+CSV_PARALLEL_CHUNK_BYTES = int(os.getenv("CSV_PARALLEL_CHUNK_BYTES", 4 * 1024 * 1024))  # Bytes of the file per chunk task
+EXPORT_CHUNK_SIZE = 2000  # ✅ Rows fetched per database round trip by streamed exports
+EXPORT_LINK_EXPIRY_SECONDS = int(os.getenv("EXPORT_LINK_EXPIRY_SECONDS", 24 * 3600))  # Lifetime of background export download links
+EXPORT_ARROW_BATCH_ROWS = 50000  # ✅ Rows per Arrow record batch / Parquet row group in columnar exports
+EXPORT_JOB_TIME_LIMIT = int(os.getenv("EXPORT_JOB_TIME_LIMIT", 30 * 60))  # Seconds an export task may run before it is stopped
+# ✅ In-flight export jobs older than this are treated as failed (lost task), so identical requests can start again
+EXPORT_JOB_STALE_MINUTES = int(os.getenv("EXPORT_JOB_STALE_MINUTES", 60))
+SYNC_PAGE_SIZE = 500  # ✅ Default changes per delta-sync call
+SYNC_OVERLAP_SECONDS = 120  # Re-read at the start of each sync, so rows committed late are not missed (clients dedupe by id)
+SYNC_TOMBSTONE_RETENTION_DAYS = 30  # Delete markers kept this long; older sync tokens must resync fully
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -327,6 +358,25 @@ TRAINED_MODELS_DIR = os.path.join(BASE_DIR, "trained_models")
 
 # OpenCage API Key
 OPENCAGE_API_KEY = os.getenv("OPENCAGE_API_KEY", default="")
+
+# ✅ Shared geocoding cache (GeocodeCache table + in-process LRU)
+GEOCODE_CACHE_TTL_DAYS = int(os.getenv("GEOCODE_CACHE_TTL_DAYS", 90))  # Successful lookups
+GEOCODE_NEGATIVE_TTL_HOURS = int(os.getenv("GEOCODE_NEGATIVE_TTL_HOURS", 24))  # "No match" answers
+GEOCODE_LRU_SIZE = 1024  # Entries kept in memory per process
+GEOCODE_TIMEOUT = 10  # Seconds per OpenCage request
+GEOCODE_BATCH_WORKERS = int(os.getenv("GEOCODE_BATCH_WORKERS", 4))  # Concurrent OpenCage calls during CSV imports
+GAZETTEER_DIR = os.getenv("GAZETTEER_DIR", os.path.join(BASE_DIR, "gazetteer"))  # Offline index (manage.py load_gazetteer)
+
+# ✅ Nearest soil sample lookup (in-memory BallTree over recent SoilData coordinates)
+SOIL_INDEX_WINDOW_DAYS = int(os.getenv("SOIL_INDEX_WINDOW_DAYS", 365))  # Samples older than this are not indexed
+SOIL_NEAREST_RADIUS_KM = float(os.getenv("SOIL_NEAREST_RADIUS_KM", 50))  # Max distance for a sample to count as "nearby"
+
+# ✅ Interpolated soil property rasters (.npy files, memory-mapped; shared by web and Celery containers)
+SOIL_GRID_DIR = os.getenv("SOIL_GRID_DIR", os.path.join(BASE_DIR, "soil_grid"))
+SOIL_GRID_RESOLUTION_DEG = 0.25  # Cell size in degrees
+SOIL_GRID_RADIUS_KM = 100  # Samples further away do not contribute to a cell
+SOIL_GRID_WINDOW_DAYS = 180  # Only samples from the last N days are interpolated
+SOIL_GRID_FULL_REBUILD_DAYS = 7  # Full tile rebuild interval (picks up deleted or edited samples)
 # Celery settings
 
 
@@ -344,6 +394,29 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
 
+# ✅ Live CSV task progress (Redis hash, returned by the task-status endpoint)
+TASK_PROGRESS_REDIS_URL = os.getenv("TASK_PROGRESS_REDIS_URL", CELERY_BROKER_URL)
+
+# ✅ Periodic jobs (run by the `celery-beat` service)
+CELERY_BEAT_SCHEDULE = {
+    "refresh-soil-rollups": {
+        "task": "soil.tasks.refresh_soil_rollups_task",
+        "schedule": 300.0,  # every 5 minutes
+    },
+    "refresh-soil-grid": {
+        "task": "soil.tasks.refresh_soil_grid_task",
+        "schedule": 600.0,  # every 10 minutes
+    },
+    "purge-sync-tombstones": {
+        "task": "datasets.tasks.purge_tombstones_task",
+        "schedule": 86400.0,  # daily
+    },
+    "expire-stale-export-jobs": {
+        "task": "datasets.tasks.expire_stale_export_jobs_task",
+        "schedule": 900.0,  # every 15 minutes
+    },
+}
+
 
 
 # LOGGING = {
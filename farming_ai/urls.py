@@ -41,6 +41,7 @@ urlpatterns = [
     path("weather/", include("weather.urls")), 
     path("soil/", include("soil.urls")), 
     path("recommendations/", include("recommendations.urls")), 
+    path("datasets/", include("datasets.urls")),
     path("", include("pages.urls")),
     path("monetization/", include("monetization.urls")),
 ]
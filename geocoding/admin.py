@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import GeocodeCache
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ('query', 'latitude', 'longitude', 'confidence', 'provider', 'created_at', 'expires_at')
+    list_filter = ('provider', 'confidence')
+    search_fields = ('query', 'query_key', 'formatted')
+    ordering = ('-created_at',)
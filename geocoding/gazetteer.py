@@ -0,0 +1,260 @@
+import bisect
+import difflib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .utils import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# ✅ Place records, aligned with labels; keys point into this array
+PLACE_DTYPE = np.dtype([("latitude", "f4"), ("longitude", "f4"), ("population", "i8"), ("feature_class", "S1")])
+
+EXACT_CONFIDENCE = 9  # Reported like OpenCage's 1-10 confidence scale
+FUZZY_CONFIDENCE = 6
+FUZZY_MIN_RATIO = 0.85  # ✅ Minimum similarity for a typo to count as a match
+FUZZY_SCAN_LIMIT = 5000  # Max keys compared per fuzzy lookup
+RELOAD_CHECK_INTERVAL = 60  # Seconds between checks for a rebuilt index
+
+# GeoNames "geoname" table columns (tab-separated, no header)
+GEONAMES_NAME, GEONAMES_ASCIINAME, GEONAMES_ALTERNATES = 1, 2, 3
+GEONAMES_LAT, GEONAMES_LON, GEONAMES_FEATURE_CLASS = 4, 5, 6
+GEONAMES_COUNTRY, GEONAMES_ADMIN1, GEONAMES_POPULATION = 8, 10, 14
+
+
+def gazetteer_dir():
+    return getattr(settings, "GAZETTEER_DIR", os.path.join(settings.BASE_DIR, "gazetteer"))
+
+
+def read_admin1_names(path):
+    """Parse GeoNames `admin1CodesASCII.txt` into {"US.TX": "Texas", ...}."""
+    names = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 2:
+                names[parts[0]] = parts[1]
+    return names
+
+
+def read_geonames(path, feature_classes="AP", min_population=0, admin1_names=None, alternate_names=False):
+    """
+    Stream places from a GeoNames-style TSV (allCountries.txt, cities500.txt, ...).
+    Yields `(label, latitude, longitude, population, feature_class, keys)`, where `keys`
+    are the normalized names the place can be looked up by.
+    """
+    admin1_names = admin1_names or {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) <= GEONAMES_POPULATION or parts[GEONAMES_FEATURE_CLASS] not in feature_classes:
+                continue
+            try:
+                latitude, longitude = float(parts[GEONAMES_LAT]), float(parts[GEONAMES_LON])
+                population = int(parts[GEONAMES_POPULATION] or 0)
+            except ValueError:
+                continue
+            if population < min_population:
+                continue
+
+            country = parts[GEONAMES_COUNTRY]
+            admin1_code = parts[GEONAMES_ADMIN1]
+            admin1_name = admin1_names.get(f"{country}.{admin1_code}", "")
+
+            names = {parts[GEONAMES_NAME], parts[GEONAMES_ASCIINAME]}
+            if alternate_names:
+                names.update(n for n in parts[GEONAMES_ALTERNATES].split(",") if len(n) >= 3 and "://" not in n)
+            names = {normalize_query(n) for n in names if n}
+            names.discard("")
+
+            # ✅ "Austin, TX", "Austin, Texas" and "Austin, US" resolve to the same place
+            qualifiers = {normalize_query(q) for q in (country, admin1_name) if q}
+            if admin1_code.isalpha():
+                qualifiers.add(normalize_query(admin1_code))
+            keys = names | {f"{name}, {qualifier}" for name in names for qualifier in qualifiers}
+
+            region = admin1_name if admin1_name != parts[GEONAMES_NAME] else ""
+            label = ", ".join(part for part in (parts[GEONAMES_NAME], region, country) if part)
+            yield label, latitude, longitude, population, parts[GEONAMES_FEATURE_CLASS], keys
+
+
+def _write_strings(strings, blob_path, offsets_path):
+    """Concatenate UTF-8 strings into one blob plus an (n + 1) offsets array."""
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    with open(blob_path, "wb") as f:
+        for i, value in enumerate(strings):
+            encoded = value.encode("utf-8")
+            f.write(encoded)
+            offsets[i + 1] = offsets[i] + len(encoded)
+    np.save(offsets_path, offsets)
+
+
+def build_gazetteer(places, out_dir=None):
+    """
+    Build the on-disk index from `read_geonames` output and swap it in atomically.
+
+    Files: `keys.bin` + `key_offsets.npy` (sorted normalized names), `key_places.npy`
+    (place of each key; duplicates ordered by population, largest first), `places.npy`
+    (coordinates) and `labels.bin` + `label_offsets.npy` (display names).
+    """
+    out_dir = out_dir or gazetteer_dir()
+    build_dir = f"{out_dir}.building"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+
+    labels, records, entries = [], [], []
+    for label, latitude, longitude, population, feature_class, keys in places:
+        place_id = len(records)
+        labels.append(label)
+        records.append((latitude, longitude, population, feature_class))
+        entries.extend((key, -population, place_id) for key in keys)
+    entries.sort()
+
+    _write_strings([key for key, _, _ in entries], os.path.join(build_dir, "keys.bin"), os.path.join(build_dir, "key_offsets.npy"))
+    np.save(os.path.join(build_dir, "key_places.npy"), np.array([place_id for _, _, place_id in entries], dtype=np.int32))
+    np.save(os.path.join(build_dir, "places.npy"), np.array(records, dtype=PLACE_DTYPE))
+    _write_strings(labels, os.path.join(build_dir, "labels.bin"), os.path.join(build_dir, "label_offsets.npy"))
+    with open(os.path.join(build_dir, "meta.json"), "w") as f:
+        json.dump({"places": len(records), "keys": len(entries), "built_at": time.time()}, f)
+
+    # ✅ Swap directories; processes still holding the old memory maps keep reading the unlinked files
+    old_dir = f"{out_dir}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(build_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    logger.info(f"✅ Gazetteer built: {len(records)} places, {len(entries)} keys.")
+    return len(records), len(entries)
+
+
+class _StringTable:
+    """Read-only sequence view over a memory-mapped string blob (usable with `bisect`)."""
+
+    def __init__(self, blob, offsets):
+        self.blob, self.offsets = blob, offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+
+class Gazetteer:
+    """
+    Offline geocoder over the memory-mapped index written by `build_gazetteer`.
+    Lookups are a binary search over sorted keys (exact / prefix) plus a bounded similarity scan (fuzzy).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.keys = _StringTable(self._blob("keys.bin"), np.load(os.path.join(path, "key_offsets.npy"), mmap_mode="r"))
+        self.key_places = np.load(os.path.join(path, "key_places.npy"), mmap_mode="r")
+        self.places = np.load(os.path.join(path, "places.npy"), mmap_mode="r")
+        self.labels = _StringTable(self._blob("labels.bin"), np.load(os.path.join(path, "label_offsets.npy"), mmap_mode="r"))
+
+    def _blob(self, name):
+        path = os.path.join(self.path, name)
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=np.uint8)  # np.memmap refuses empty files
+        return np.memmap(path, dtype=np.uint8, mode="r")
+
+    def _result(self, key_index, confidence):
+        place_id = int(self.key_places[key_index])
+        place = self.places[place_id]
+        return {
+            "latitude": round(float(place["latitude"]), 5),
+            "longitude": round(float(place["longitude"]), 5),
+            "confidence": confidence,
+            "formatted": self.labels[place_id],
+        }
+
+    def _prefix_range(self, prefix):
+        return bisect.bisect_left(self.keys, prefix), bisect.bisect_left(self.keys, prefix + "\U0010ffff")
+
+    def exact(self, query):
+        key = normalize_query(query)
+        i = bisect.bisect_left(self.keys, key)
+        if key and i < len(self.keys) and self.keys[i] == key:
+            return self._result(i, EXACT_CONFIDENCE)  # ✅ First duplicate is the most populous place
+        return None
+
+    def fuzzy(self, query):
+        """Best match for a misspelled name among keys sharing its first three characters."""
+        key = normalize_query(query)
+        if len(key) < 4:
+            return None
+        lo, hi = self._prefix_range(key[:3])
+        best, best_score = None, (FUZZY_MIN_RATIO, 0)
+        matcher = difflib.SequenceMatcher(b=key, autojunk=False)
+        for i in range(lo, min(hi, lo + FUZZY_SCAN_LIMIT)):
+            matcher.set_seq1(self.keys[i])
+            if matcher.real_quick_ratio() < best_score[0] or matcher.quick_ratio() < best_score[0]:
+                continue
+            score = (matcher.ratio(), int(self.places[int(self.key_places[i])]["population"]))
+            if score >= best_score:
+                best, best_score = i, score
+        return self._result(best, FUZZY_CONFIDENCE) if best is not None else None
+
+    def suggest(self, prefix, limit=10):
+        """Prefix (autocomplete) matches, most populous first."""
+        key = normalize_query(prefix)
+        if not key:
+            return []
+        lo, hi = self._prefix_range(key)
+        candidates = {}
+        for i in range(lo, min(hi, lo + FUZZY_SCAN_LIMIT)):
+            place_id = int(self.key_places[i])
+            candidates.setdefault(place_id, i)
+        ranked = sorted(candidates.items(), key=lambda item: -int(self.places[item[0]]["population"]))
+        return [self._result(i, FUZZY_CONFIDENCE) for _, i in ranked[:limit]]
+
+    def lookup(self, query, fuzzy=True):
+        """Exact match first, then (if `fuzzy`) fuzzy; qualified queries ("Paris, Texas") must match exactly."""
+        result = self.exact(query)
+        if result is None and fuzzy and "," not in str(query):
+            result = self.fuzzy(query)
+        return result
+
+
+_gazetteer = None
+_gazetteer_mtime = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Return the process-wide Gazetteer (reloaded when the index is rebuilt), or None if none was built."""
+    global _gazetteer, _gazetteer_mtime, _last_check
+    now = time.monotonic()
+    if _last_check and now - _last_check < RELOAD_CHECK_INTERVAL:
+        return _gazetteer
+    with _lock:
+        _last_check = now
+        meta_path = os.path.join(gazetteer_dir(), "meta.json")
+        try:
+            mtime = os.path.getmtime(meta_path)
+        except OSError:
+            _gazetteer, _gazetteer_mtime = None, None
+            return None
+        if mtime != _gazetteer_mtime:
+            try:
+                _gazetteer, _gazetteer_mtime = Gazetteer(gazetteer_dir()), mtime
+            except (OSError, ValueError) as e:
+                logger.error(f"🚨 Could not load gazetteer index: {e}")
+                _gazetteer = None
+    return _gazetteer
+
+
+def lookup_offline(location_name, fuzzy=True):
+    """Offline geocode; None when there is no index or no match. `fuzzy=False` only accepts exact names."""
+    gazetteer = get_gazetteer()
+    return gazetteer.lookup(location_name, fuzzy=fuzzy) if gazetteer else None
@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from geocoding.gazetteer import build_gazetteer, gazetteer_dir, read_admin1_names, read_geonames
+
+
+class Command(BaseCommand):
+    help = "Build the offline geocoding index from a GeoNames-style TSV (e.g. cities500.txt, allCountries.txt)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="GeoNames TSV file")
+        parser.add_argument("--admin1", help="admin1CodesASCII.txt, enables lookups like 'Austin, Texas'")
+        parser.add_argument("--feature-classes", default="AP", help="GeoNames feature classes to keep (default: AP)")
+        parser.add_argument("--min-population", type=int, default=0)
+        parser.add_argument("--alternate-names", action="store_true", help="Also index alternate names (larger index)")
+        parser.add_argument("--out-dir", default=None, help="Defaults to settings.GAZETTEER_DIR")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            admin1_names = read_admin1_names(options["admin1"]) if options["admin1"] else {}
+            places = read_geonames(
+                options["path"],
+                feature_classes=options["feature_classes"],
+                min_population=options["min_population"],
+                admin1_names=admin1_names,
+                alternate_names=options["alternate_names"],
+            )
+            place_count, key_count = build_gazetteer(places, out_dir=options["out_dir"])
+        except OSError as e:
+            raise CommandError(f"Could not build gazetteer: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Gazetteer built in {time.monotonic() - started:.1f}s: {place_count} places, {key_count} keys "
+            f"→ {options['out_dir'] or gazetteer_dir()}"
+        ))
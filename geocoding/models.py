@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class GeocodeCache(models.Model):
+    """
+    Persistent cache of geocoder answers, shared by every app (soil, weather, monetization).
+    Keyed by the normalized query so "Texas", " texas " and "TEXAS" hit the same row.
+    """
+    query_key = models.CharField(max_length=255, unique=True)  # ✅ Normalized query (see geocoding.utils.normalize_query)
+    query = models.CharField(max_length=255)  # Query as first received, for debugging
+    latitude = models.FloatField(null=True, blank=True)  # ✅ Null = negative result ("no match"), cached for a shorter TTL
+    longitude = models.FloatField(null=True, blank=True)
+    confidence = models.PositiveSmallIntegerField(null=True, blank=True)  # OpenCage confidence (1-10)
+    formatted = models.CharField(max_length=255, blank=True, default="")  # Provider's display name of the match
+    provider = models.CharField(max_length=50, default="opencage")
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    @property
+    def found(self):
+        return self.latitude is not None and self.longitude is not None
+
+    def __str__(self):
+        if not self.found:
+            return f"{self.query} → no match"
+        return f"{self.query} → ({self.latitude}, {self.longitude})"
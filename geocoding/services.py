@@ -0,0 +1,253 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import pandas as pd
+import requests
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+
+from .gazetteer import lookup_offline
+from .models import GeocodeCache
+from .utils import normalize_query
+
+logger = logging.getLogger(__name__)
+
+OPENCAGE_URL = "https://api.opencagedata.com/geocode/v1/json"
+LOW_CONFIDENCE = 7  # ✅ OpenCage confidence below this is logged as a warning (but still used)
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU; entries carry their own expiry (aware datetime)."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at <= timezone.now():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_memory_cache = LRUCache(maxsize=getattr(settings, "GEOCODE_LRU_SIZE", 1024))
+
+
+def _as_result(entry):
+    """Public result shape of a cache row (None for a cached "no match")."""
+    if not entry.found:
+        return None
+    return {
+        "latitude": entry.latitude,
+        "longitude": entry.longitude,
+        "confidence": entry.confidence,
+        "formatted": entry.formatted,
+    }
+
+
+def _query_opencage(location_name):
+    """
+    Call OpenCage once. Returns (result_dict_or_None, provider_ok).
+    `provider_ok=False` means the call itself failed (network, quota, missing key) and must not be cached.
+    """
+    api_key = settings.OPENCAGE_API_KEY  # ✅ Use Django settings
+    if not api_key:
+        logger.error("🚨 Missing OpenCage API Key. Check .env file.")
+        return None, False
+    try:
+        response = requests.get(
+            OPENCAGE_URL,
+            params={"q": location_name, "key": api_key, "limit": 1, "no_annotations": 1},
+            timeout=getattr(settings, "GEOCODE_TIMEOUT", 10),
+        )
+        response.raise_for_status()
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"🚨 Geocoding API error: {e}")
+        return None, False
+
+    if not data.get("results"):
+        logger.warning(f"❌ Geocoding failed: No results for location '{location_name}'")
+        return None, True
+
+    result = data["results"][0]
+    confidence = result.get("confidence", 0)
+    if confidence < LOW_CONFIDENCE:
+        logger.warning(f"⚠️ Low confidence ({confidence}) geocode result for '{location_name}', but using it anyway.")
+    logger.info(f"✅ Geocoded '{location_name}' with confidence {confidence}: {result['geometry']}")
+    return {
+        "latitude": result["geometry"]["lat"],
+        "longitude": result["geometry"]["lng"],
+        "confidence": confidence,
+        "formatted": (result.get("formatted") or "")[:255],
+    }, True
+
+
+def _gazetteer_expiry():
+    """LRU expiry of an exact gazetteer match (the gazetteer changes no more often than found answers expire)."""
+    return timezone.now() + timedelta(days=getattr(settings, "GEOCODE_CACHE_TTL_DAYS", 90))
+
+
+def _store(key, location_name, result, provider="opencage"):
+    """Write (or refresh) the persistent cache row for `key`; found and not-found answers have separate TTLs."""
+    if result:
+        ttl = timedelta(days=getattr(settings, "GEOCODE_CACHE_TTL_DAYS", 90))
+    else:
+        ttl = timedelta(hours=getattr(settings, "GEOCODE_NEGATIVE_TTL_HOURS", 24))
+    defaults = {
+        "query": str(location_name)[:255],
+        "latitude": result["latitude"] if result else None,
+        "longitude": result["longitude"] if result else None,
+        "confidence": result.get("confidence") if result else None,
+        "formatted": result.get("formatted", "") if result else "",
+        "provider": provider,
+        "expires_at": timezone.now() + ttl,
+    }
+    try:
+        entry, _ = GeocodeCache.objects.update_or_create(query_key=key, defaults=defaults)
+    except IntegrityError:
+        # ✅ Another worker cached the same key concurrently; theirs is just as good
+        entry = GeocodeCache.objects.get(query_key=key)
+    return entry
+
+
+def geocode(location_name):
+    """
+    Resolve a location name to `{"latitude", "longitude", "confidence", "formatted"}`, or None.
+
+    Lookup order: in-process LRU → exact gazetteer name → GeocodeCache table → OpenCage.
+    OpenCage answers (including "no match") are cached under the normalized query until their TTL
+    expires; provider errors are never cached, and an expired entry is served while the API is down.
+    Fuzzy gazetteer matches (typos) are only used, uncached, when OpenCage is unavailable and
+    nothing is cached: a near-miss name may be a different place.
+    """
+    key = normalize_query(location_name)
+    if not key:
+        return None
+
+    hit, result = _memory_cache.get(key)
+    if hit:
+        return result
+
+    result = lookup_offline(location_name, fuzzy=False)
+    if result:
+        _memory_cache.set(key, result, _gazetteer_expiry())
+        return result
+
+    entry = GeocodeCache.objects.filter(query_key=key).first()
+    if entry is None or entry.expires_at <= timezone.now():
+        result, provider_ok = _query_opencage(location_name)
+        if provider_ok:
+            entry = _store(key, location_name, result)
+        elif entry is None:
+            return lookup_offline(location_name)  # ✅ Last offline resort, fuzzy matches included
+        else:
+            logger.warning(f"⚠️ Geocoder unavailable, using expired cache entry for '{location_name}'.")
+            return _as_result(entry)
+
+    result = _as_result(entry)
+    _memory_cache.set(key, result, entry.expires_at)
+    return result
+
+
+def geocode_many(location_names, max_workers=None):
+    """
+    Geocode many location strings at once. Returns {location_name: result_or_None}.
+
+    Names are de-duplicated by normalized key, so each distinct place is resolved once:
+    LRU / exact gazetteer hits inline, then one GeocodeCache query for the rest, and only the
+    remaining misses go to OpenCage through a bounded thread pool (HTTP only; DB writes stay on this thread).
+    As in `geocode`, fuzzy gazetteer matches are only a fallback when OpenCage is unavailable.
+    """
+    max_workers = max_workers or getattr(settings, "GEOCODE_BATCH_WORKERS", 4)
+    names_by_key = {}
+    for name in location_names:
+        if isinstance(name, str) and name.strip():
+            names_by_key.setdefault(normalize_query(name), []).append(name)
+    names_by_key.pop("", None)
+
+    resolved, pending = {}, []
+    for key, names in names_by_key.items():
+        hit, result = _memory_cache.get(key)
+        if not hit:
+            result = lookup_offline(names[0], fuzzy=False)
+            hit = result is not None
+            if hit:
+                _memory_cache.set(key, result, _gazetteer_expiry())  # ✅ As in `geocode`
+        if hit:
+            resolved[key] = result
+        else:
+            pending.append(key)
+
+    cached = GeocodeCache.objects.in_bulk(pending, field_name="query_key") if pending else {}
+    misses = []
+    for key in pending:
+        entry = cached.get(key)
+        if entry and entry.expires_at > timezone.now():
+            resolved[key] = _as_result(entry)
+            _memory_cache.set(key, resolved[key], entry.expires_at)
+        else:
+            misses.append(key)
+
+    if misses:
+        logger.info(f"🌍 Batch geocoding {len(misses)} of {len(names_by_key)} distinct locations ({max_workers} workers)")
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            answers = pool.map(_query_opencage, [names_by_key[key][0] for key in misses])
+            for key, (result, provider_ok) in zip(misses, answers):
+                if provider_ok:
+                    entry = _store(key, names_by_key[key][0], result)
+                    _memory_cache.set(key, result, entry.expires_at)
+                elif cached.get(key):
+                    result = _as_result(cached[key])  # ✅ Expired entry beats nothing while the API is down
+                else:
+                    result = lookup_offline(names_by_key[key][0])
+                resolved[key] = result
+
+    return {name: resolved[key] for key, names in names_by_key.items() for name in names}
+
+
+def geocode_dataframe(df, location_column="location", latitude_column="latitude", longitude_column="longitude", max_workers=None):
+    """
+    Fill missing coordinates of `df` (in place) from its location column via `geocode_many`.
+    Rows whose location cannot be resolved keep NaN coordinates. Returns `df`.
+    """
+    for column in (latitude_column, longitude_column):
+        if column not in df.columns:
+            df[column] = float("nan")
+        df[column] = pd.to_numeric(df[column], errors="coerce")
+    if location_column not in df.columns:
+        return df
+
+    missing = df[latitude_column].isna() | df[longitude_column].isna()
+    if not missing.any():
+        return df
+
+    coordinates = geocode_many(df.loc[missing, location_column].dropna().unique().tolist(), max_workers=max_workers)
+    locations = df.loc[missing, location_column]
+    df.loc[missing, latitude_column] = locations.map(lambda name: (coordinates.get(name) or {}).get("latitude"))
+    df.loc[missing, longitude_column] = locations.map(lambda name: (coordinates.get(name) or {}).get("longitude"))
+    df[latitude_column] = pd.to_numeric(df[latitude_column], errors="coerce")
+    df[longitude_column] = pd.to_numeric(df[longitude_column], errors="coerce")
+    return df
@@ -0,0 +1,74 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from . import services
+from .models import GeocodeCache
+
+AUSTIN = {"latitude": 30.27, "longitude": -97.74, "confidence": 9, "formatted": "Austin, Texas"}
+OPENCAGE = {"latitude": 31.0, "longitude": -100.0, "confidence": 8, "formatted": "Texas, United States"}
+
+
+class GeocodeLookupOrderTestCase(TestCase):
+    """In-process LRU → exact gazetteer name → GeocodeCache table → OpenCage (→ fuzzy gazetteer)."""
+
+    def setUp(self):
+        services._memory_cache.clear()
+        self.addCleanup(services._memory_cache.clear)
+        self.gazetteer = self.enterContext(mock.patch.object(
+            services, "lookup_offline", side_effect=lambda name, fuzzy=True: AUSTIN if name.lower() == "austin" else None,
+        ))
+        self.opencage = self.enterContext(mock.patch.object(services, "_query_opencage", return_value=(OPENCAGE, True)))
+
+    def test_gazetteer_before_cache_and_provider(self):
+        self.assertEqual(services.geocode("Austin"), AUSTIN)
+        self.assertEqual(services.geocode(" AUSTIN "), AUSTIN)  # ✅ Same normalized key, served by the LRU
+        self.assertEqual(self.gazetteer.call_count, 1)
+        self.opencage.assert_not_called()
+        self.assertFalse(GeocodeCache.objects.exists())
+
+    def test_cache_table_before_provider(self):
+        GeocodeCache.objects.create(
+            query_key="texas", query="Texas", latitude=1.0, longitude=2.0, expires_at=timezone.now() + timedelta(days=1),
+        )
+        self.assertEqual(services.geocode("Texas")["latitude"], 1.0)
+        self.opencage.assert_not_called()
+
+    def test_provider_answers_are_cached(self):
+        self.assertEqual(services.geocode("Texas"), OPENCAGE)
+        services._memory_cache.clear()
+        self.assertEqual(services.geocode("texas"), OPENCAGE)
+        self.assertEqual(self.opencage.call_count, 1)
+        self.assertEqual(GeocodeCache.objects.get(query_key="texas").latitude, 31.0)
+
+    def test_expired_entry_is_refreshed_and_served_while_provider_is_down(self):
+        GeocodeCache.objects.create(
+            query_key="texas", query="Texas", latitude=1.0, longitude=2.0, expires_at=timezone.now() - timedelta(days=1),
+        )
+        self.opencage.return_value = (None, False)
+        self.assertEqual(services.geocode("Texas")["latitude"], 1.0)
+        self.opencage.return_value = (OPENCAGE, True)
+        self.assertEqual(services.geocode("Texas"), OPENCAGE)
+
+    def test_fuzzy_gazetteer_only_when_provider_is_down(self):
+        self.opencage.return_value = (None, False)
+        services.geocode("Austn")
+        self.assertEqual([call.kwargs.get("fuzzy", True) for call in self.gazetteer.call_args_list], [False, True])
+
+    def test_geocode_many(self):
+        GeocodeCache.objects.create(
+            query_key="dallas", query="Dallas", latitude=32.78, longitude=-96.8, expires_at=timezone.now() + timedelta(days=1),
+        )
+        results = services.geocode_many(["Austin", "austin ", "Dallas", "Texas", "", None])
+        self.assertEqual(results["Austin"], AUSTIN)
+        self.assertEqual(results["austin "], AUSTIN)
+        self.assertEqual(results["Dallas"]["latitude"], 32.78)
+        self.assertEqual(results["Texas"], OPENCAGE)
+        self.assertEqual(self.opencage.call_count, 1)  # ✅ Only the miss goes to OpenCage
+        # ✅ Every answer, gazetteer hits included, is now in the LRU
+        self.gazetteer.reset_mock()
+        with self.assertNumQueries(0):
+            self.assertEqual(services.geocode_many(["AUSTIN", "Dallas", "Texas"])["AUSTIN"], AUSTIN)
+        self.gazetteer.assert_not_called()
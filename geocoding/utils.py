@@ -0,0 +1,13 @@
+import re
+import unicodedata
+
+
+def normalize_query(location_name):
+    """
+    Canonical cache key for a free-text location: unicode NFKC, case-folded,
+    whitespace collapsed and no stray spaces around commas ("  New  York ,USA" → "new york, usa").
+    """
+    key = unicodedata.normalize("NFKC", str(location_name or "")).casefold()
+    key = " ".join(key.split())
+    key = re.sub(r"\s*,\s*", ", ", key).strip(" ,")
+    return key[:255]
@@ -108,14 +108,6 @@ models = {
 }
 
 # --- Geolocation & Weather Functions ---
-def get_lat_long(location):
-    API_KEY = settings.OPENCAGE_API_KEY
-    url = f"https://api.opencagedata.com/geocode/v1/json?q={location}&key={API_KEY}"
-    response = requests.get(url).json()
-    if response["results"]:
-        return response["results"][0]["geometry"]["lat"], response["results"][0]["geometry"]["lng"]
-    return None, None
-
 def get_soil_temp(lat, lon):
     url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=soil_temperature_0cm"
     try:
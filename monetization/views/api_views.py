@@ -10,8 +10,9 @@ from rest_framework.permissions import IsAuthenticated
 
 from monetization.models import ReportRequest, AIReport, CropSuitability, Feedback
 from monetization.services.pdf_generator import generate_pdf
+from geocoding.services import geocode
 from monetization.utils import (
-    get_lat_long, get_soil_temp, get_weather_data,
+    get_soil_temp, get_weather_data,
     predict_soil_temperature, get_recommended_crops, get_suitable_crops,
     generate_risk_assessment, get_yield_prediction,
     get_crop_growth_risks, generate_mitigation_strategies,
@@ -56,9 +57,9 @@ class RequestReportView(APIView):
 
         # 1) Validate & Get Location
         if not data.get("latitude") or not data.get("longitude"):
-            lat, lon = get_lat_long(data.get("location"))
-            if lat and lon:
-                data["latitude"], data["longitude"] = lat, lon
+            geocoded = geocode(data.get("location"))
+            if geocoded:
+                data["latitude"], data["longitude"] = geocoded["latitude"], geocoded["longitude"]
             else:
                 return Response({"error": "Invalid location"}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.http import HttpResponse
 import csv
 import json  # ✅ Needed for parsing JSON
-from .models import Crop, Recommendation
+from .models import Crop, Recommendation, RecommendationDailyStats
 
 
 @admin.register(Crop)
@@ -69,3 +69,11 @@ class RecommendationAdmin(admin.ModelAdmin):
         return response
     
     export_as_csv.short_description = "Export Selected as CSV"
+
+
+@admin.register(RecommendationDailyStats)
+class RecommendationDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ("user", "crop", "date", "risk_assessment", "count", "predicted_yield_sum", "soil_temp_sum")
+    search_fields = ("user__email", "crop__name")
+    list_filter = ("date", "risk_assessment")
+    ordering = ("-date",)
@@ -0,0 +1,60 @@
+import json
+from datasets.exports import ExportDataset, date_range_lookups, register_export
+from .models import Recommendation
+
+
+def recommendation_export_queryset(user, params):
+    """
+    A user's recommendations with the export filters (crop, risk, start_date, end_date), newest first.
+    Raises ValueError for invalid dates.
+    """
+    qs = Recommendation.objects.filter(user=user, **date_range_lookups('created_at', params))
+    crop = params.get('crop')
+    risk = params.get('risk')
+    if crop:
+        qs = qs.filter(crop__name__iexact=crop)
+    if risk:
+        qs = qs.filter(risk_assessment__iexact=risk)
+    return qs.order_by('-created_at')
+
+def format_ai_model_version(value):
+    """Format AI model versions (similar to the Admin code): "Linear Regression: v1 | ..."."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)  # Older rows stored the versions as a JSON string
+        except json.JSONDecodeError:
+            return value
+    if isinstance(value, dict):
+        return " | ".join(f"{key.replace('_', ' ').title()}: {version}" for key, version in value.items())
+    return value
+
+
+def _format_recommendation_row(row):
+    (user_email, crop_name, expected_yield, predicted_yield, predicted_soil_temp, risk_assessment,
+     optimal_planting_time, weather_summary, next_best_action, ai_model_version, created_at) = row
+    return [
+        user_email or "", crop_name or "N/A", expected_yield, predicted_yield, predicted_soil_temp,
+        risk_assessment, optimal_planting_time, weather_summary, next_best_action,
+        format_ai_model_version(ai_model_version), created_at.strftime('%Y-%m-%d %H:%M:%S'),
+    ]
+
+
+# ✅ values_list joins user and crop in the export query itself (no per-row lookups)
+RECOMMENDATION_EXPORT = register_export(ExportDataset(
+    name="recommendations",
+    headers=[
+        "User", "Crop", "Expected Yield", "Predicted Yield", "Predicted Soil Temp",
+        "Risk Assessment", "Optimal Planting Time",
+        "Weather Summary", "Next Best Action", "AI Model Version", "Created At"
+    ],
+    fields=[
+        "user__email", "crop__name", "expected_yield", "predicted_yield", "predicted_soil_temp",
+        "risk_assessment", "optimal_planting_time", "weather_summary", "next_best_action",
+        "ai_model_version", "created_at",
+    ],
+    queryset=recommendation_export_queryset,
+    format_row=_format_recommendation_row,
+    filename="recommendations_export.csv",
+    filters=["crop", "risk", "start_date", "end_date"],
+    types=["string", "string", "float", "float", "float", "string", "string", "string", "string", "string", "string"],
+))
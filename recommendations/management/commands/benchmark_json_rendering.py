@@ -0,0 +1,107 @@
+import time
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.middleware.gzip import GZipMiddleware
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from farming_ai.renderers import ORJSONRenderer, orjson
+from recommendations.models import Recommendation
+from recommendations.serializers import RecommendationSerializer
+from weather.models import WeatherData, precip_30day_sum_subquery
+from weather.serializers import WeatherDataSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare DRF's JSONRenderer with the orjson renderer, and the gzip compression of GZipMiddleware, "
+        "on representative API payloads (CPU time per render and bytes on the wire)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Build the recommendation payloads from this user's data (email)")
+        parser.add_argument("--rows", type=int, default=500, help="Rows per payload (default 500)")
+        parser.add_argument("--repeat", type=int, default=20, help="Renders averaged per measurement (default 20)")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed; the fast renderer would fall back to JSONRenderer.")
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(email=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+
+        rows, repeat = options["rows"], options["repeat"]
+        self.stdout.write(
+            f"{'payload':<24}{'rows':>6}{'drf ms':>10}{'orjson ms':>11}{'speedup':>9}"
+            f"{'bytes':>11}{'gzip':>10}{'gzip ms':>9}"
+        )
+        for name, data, count in self.payloads(user, rows):
+            if not count:
+                self.stdout.write(f"{name:<24}{'(no data)':>6}")
+                continue
+            drf_seconds, drf_body = self.measure(lambda: JSONRenderer().render(data), repeat)
+            fast_seconds, body = self.measure(lambda: ORJSONRenderer().render(data), repeat)
+            # ✅ As GZipMiddleware does it, random padding included
+            gzip_seconds, gzipped = self.measure(
+                lambda: compress_string(body, max_random_bytes=GZipMiddleware.max_random_bytes), repeat,
+            )
+            self.stdout.write(
+                f"{name:<24}{count:>6}{drf_seconds * 1000:>10.2f}{fast_seconds * 1000:>11.2f}"
+                f"{drf_seconds / fast_seconds if fast_seconds else 0:>8.1f}x"
+                f"{len(drf_body):>11}{len(gzipped):>10}{gzip_seconds * 1000:>9.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            "✅ Times are CPU milliseconds per call; 'bytes' is the uncompressed DRF body."
+        ))
+
+    @staticmethod
+    def measure(func, repeat):
+        """Average CPU seconds of `func` over `repeat` calls, and its last result."""
+        result = func()  # Warm-up
+        started = time.process_time()
+        for _ in range(repeat):
+            result = func()
+        return (time.process_time() - started) / repeat, result
+
+    def payloads(self, user, rows):
+        """(name, data, row count) for each payload, shaped like the corresponding API response."""
+        recommendations = Recommendation.objects.all()
+        if user is not None:
+            recommendations = recommendations.filter(user=user)
+        recommendations = recommendations.select_related("user", "crop", "weather_data").order_by("-created_at")
+
+        page = list(recommendations.annotate(weather_precip_30day_sum=precip_30day_sum_subquery())[:rows])
+        yield "recommendation list", {"count": len(page), "results": RecommendationSerializer(page, many=True).data}, len(page)
+
+        risk_map = {"Low risk": 100, "Medium risk": 70, "High risk": 40}
+        points = [
+            {
+                "temperature": rec.weather_data.temperature_2m,
+                "humidity": rec.weather_data.relative_humidity_2m,
+                "wind_speed": rec.weather_data.wind_speed_10m,
+                "precipitation": rec.weather_data.precipitation,
+                "suitability": risk_map.get(rec.risk_assessment, 50),
+                "crop": rec.crop.name if rec.crop else "Unknown",
+                "date": rec.created_at.strftime("%Y-%m-%d"),
+            }
+            for rec in recommendations.filter(weather_data__isnull=False)[:rows]
+        ]
+        yield "weather suitability", {"data": points}, len(points)
+
+        weather = WeatherDataSerializer(WeatherData.objects.order_by("-time")[:rows], many=True).data
+        yield "weather data", {"results": weather}, len(weather)
+
+        # Forecast-style numeric columns straight from NumPy (what the pandas-based views produce)
+        hours = max(rows, 1)
+        forecast = {
+            "time": np.arange("2025-01-01T00", hours, dtype="datetime64[h]").astype("datetime64[s]").astype(str),
+            "temperature_2m": np.random.default_rng(42).normal(18, 6, hours).astype(np.float32),
+            "relative_humidity_2m": np.random.default_rng(7).uniform(20, 100, hours).astype(np.float32),
+            "precipitation": np.random.default_rng(3).exponential(0.5, hours).astype(np.float32),
+        }
+        yield "forecast (numpy)", forecast, hours
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from recommendations.rollups import rebuild_recommendation_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the RecommendationDailyStats rollup from the Recommendation table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild the stats of the user with this email")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(email=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+        buckets = rebuild_recommendation_stats(user=user)
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {buckets} daily stats buckets"))
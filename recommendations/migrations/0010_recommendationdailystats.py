@@ -0,0 +1,40 @@
+# Generated by Django 5.0.11 on 2026-10-19 15:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0009_alter_recommendation_ai_model_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('risk_assessment', models.CharField(blank=True, default='', max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('predicted_yield_sum', models.FloatField(default=0.0)),
+                ('predicted_yield_count', models.PositiveIntegerField(default=0)),
+                ('expected_yield_sum', models.FloatField(default=0.0)),
+                ('expected_yield_count', models.PositiveIntegerField(default=0)),
+                ('soil_temp_sum', models.FloatField(default=0.0)),
+                ('soil_temp_count', models.PositiveIntegerField(default=0)),
+                ('crop', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_stats', to='recommendations.crop')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendation_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'date'], name='recommendat_user_id_7856e6_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recommendationdailystats',
+            constraint=models.UniqueConstraint(fields=('user', 'crop', 'date', 'risk_assessment'), name='unique_recommendation_daily_stats'),
+        ),
+    ]
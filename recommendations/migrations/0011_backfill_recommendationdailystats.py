@@ -0,0 +1,44 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """Populate RecommendationDailyStats from existing recommendations (same buckets as rollups.rebuild)."""
+    Recommendation = apps.get_model("recommendations", "Recommendation")
+    RecommendationDailyStats = apps.get_model("recommendations", "RecommendationDailyStats")
+
+    aggregates = {"count": Count("id")}
+    for field, prefix in (("predicted_yield", "predicted_yield"), ("expected_yield", "expected_yield"), ("predicted_soil_temp", "soil_temp")):
+        aggregates[f"{prefix}_sum"] = Sum(field, default=0.0)
+        aggregates[f"{prefix}_count"] = Count("id", filter=Q(**{f"{field}__isnull": False}))
+    groups = (
+        Recommendation.objects.annotate(date=TruncDate("created_at"))
+        .values("user_id", "crop_id", "date", "risk_assessment")
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+    buckets = {}
+    for group in groups:
+        group["risk_assessment"] = group["risk_assessment"] or ""
+        key = (group["user_id"], group["crop_id"], group["date"], group["risk_assessment"])
+        if key in buckets:
+            for name in aggregates:
+                buckets[key][name] += group[name]
+        else:
+            buckets[key] = group
+    RecommendationDailyStats.objects.bulk_create(
+        [RecommendationDailyStats(**group) for group in buckets.values()], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0010_recommendationdailystats'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
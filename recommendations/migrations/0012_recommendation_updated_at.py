@@ -0,0 +1,34 @@
+# Generated by Django 5.0.11 on 2026-10-19 15:55
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_updated_at(apps, schema_editor):
+    """Existing recommendations were last changed when they were created."""
+    Recommendation = apps.get_model("recommendations", "Recommendation")
+    Recommendation.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0011_backfill_recommendationdailystats'),
+        ('soil', '0006_soildata_soildata_sync_idx'),
+        ('weather', '0002_alter_weatherdata_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recommendation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='recommendation_sync_idx'),
+        ),
+    ]
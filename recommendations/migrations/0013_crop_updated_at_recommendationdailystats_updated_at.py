@@ -0,0 +1,23 @@
+# Generated by Django 5.0.11 on 2026-10-19 15:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0012_recommendation_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='crop',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='recommendationdailystats',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+SUMMED = (
+    "count", "predicted_yield_sum", "predicted_yield_count", "expected_yield_sum", "expected_yield_count",
+    "soil_temp_sum", "soil_temp_count",
+)
+
+
+def merge_duplicate_no_crop_stats(apps, schema_editor):
+    """Fold crop-less buckets that were created twice (NULLs never clashed) into one before the constraint."""
+    RecommendationDailyStats = apps.get_model("recommendations", "RecommendationDailyStats")
+    duplicates = (
+        RecommendationDailyStats.objects.filter(crop__isnull=True)
+        .values("user_id", "date", "risk_assessment")
+        .annotate(rows=Count("id"), keep=Min("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in duplicates:
+        rows = list(RecommendationDailyStats.objects.filter(
+            crop__isnull=True, user_id=group["user_id"], date=group["date"], risk_assessment=group["risk_assessment"],
+        ))
+        keep = next(row for row in rows if row.id == group["keep"])
+        for name in SUMMED:
+            setattr(keep, name, sum(getattr(row, name) for row in rows))
+        keep.save()
+        RecommendationDailyStats.objects.filter(id__in=[row.id for row in rows if row.id != keep.id]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0013_crop_updated_at_recommendationdailystats_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_no_crop_stats, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='recommendationdailystats',
+            name='crop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='recommendations.crop'),
+        ),
+        migrations.AddConstraint(
+            model_name='recommendationdailystats',
+            constraint=models.UniqueConstraint(condition=models.Q(('crop__isnull', True)), fields=('user', 'date', 'risk_assessment'), name='unique_recommendation_daily_stats_no_crop'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.11 on 2026-10-19 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommendations', '0014_recommendationdailystats_crop_cascade'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recommendationdailystats',
+            name='risk_assessment',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
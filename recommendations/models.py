@@ -21,6 +21,7 @@ class Crop(models.Model):
     ]
     
     preferred_growing_season = models.JSONField(default=list, blank=True, help_text="List of preferred months [1-12].")
+    updated_at = models.DateTimeField(auto_now=True)  # ✅ Part of the crop list / chart ETags
     
     def __str__(self):
         return self.name
@@ -42,6 +43,7 @@ class Recommendation(models.Model):
     ai_model_version = models.JSONField(default=dict, blank=True, help_text="Dynamically fetched AI model versions.")
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # ✅ Delta-sync position (see recommendations.sync)
     
     predicted_soil_temp = models.FloatField(null=True, blank=True, help_text="Predicted soil temperature in °C.")
 
@@ -67,8 +69,49 @@ class Recommendation(models.Model):
             models.Index(fields=['soil_data']),
             models.Index(fields=['weather_data']),
             models.Index(fields=['-created_at']),
+            models.Index(fields=['user', 'updated_at', 'id'], name='recommendation_sync_idx'),  # ✅ Change feed
         ]
     
     def __str__(self):
         return f"Recommendation for {self.user.email} - {self.created_at.strftime('%Y-%m-%d')}"
 
+
+
+class RecommendationDailyStats(models.Model):
+    """
+    Daily rollup of a user's recommendations per crop and risk level, read by the chart endpoints.
+    Kept up to date incrementally (see `recommendations.rollups`); sums and non-null counts are stored
+    so averages can be combined across days, crops and risk levels.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="recommendation_stats")
+    # ✅ NULL = recommendations without a crop. Deleting a crop drops its buckets and re-adds its
+    # recommendations (which become crop-less) to the NULL bucket, see recommendations.signals
+    crop = models.ForeignKey(Crop, on_delete=models.CASCADE, null=True, blank=True, related_name="daily_stats")
+    date = models.DateField()
+    risk_assessment = models.TextField(blank=True, default="")  # ✅ Same type as Recommendation.risk_assessment
+
+    count = models.PositiveIntegerField(default=0)
+    predicted_yield_sum = models.FloatField(default=0.0)
+    predicted_yield_count = models.PositiveIntegerField(default=0)  # ✅ Rows with a predicted yield (Avg ignores NULLs)
+    expected_yield_sum = models.FloatField(default=0.0)
+    expected_yield_count = models.PositiveIntegerField(default=0)
+    soil_temp_sum = models.FloatField(default=0.0)
+    soil_temp_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)  # ✅ Set by every rollup change; part of the chart ETags
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "crop", "date", "risk_assessment"], name="unique_recommendation_daily_stats"),
+            # ✅ NULLs are distinct in the constraint above, so the crop-less bucket needs its own
+            models.UniqueConstraint(
+                fields=["user", "date", "risk_assessment"],
+                condition=models.Q(crop__isnull=True),
+                name="unique_recommendation_daily_stats_no_crop",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["user", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.crop_id} {self.date} {self.risk_assessment or '-'}: {self.count}"
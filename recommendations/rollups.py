@@ -0,0 +1,123 @@
+import logging
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Recommendation, RecommendationDailyStats
+
+logger = logging.getLogger(__name__)
+
+# (model field, RecommendationDailyStats sum field, RecommendationDailyStats count field)
+MEASURES = (
+    ("predicted_yield", "predicted_yield_sum", "predicted_yield_count"),
+    ("expected_yield", "expected_yield_sum", "expected_yield_count"),
+    ("predicted_soil_temp", "soil_temp_sum", "soil_temp_count"),
+)
+
+
+def stats_key(recommendation):
+    """(user_id, crop_id, date, risk) rollup bucket of a recommendation."""
+    return (
+        recommendation.user_id,
+        recommendation.crop_id,
+        timezone.localtime(recommendation.created_at).date(),
+        recommendation.risk_assessment or "",
+    )
+
+
+def _deltas(recommendations, sign):
+    deltas = defaultdict(lambda: defaultdict(float))
+    for recommendation in recommendations:
+        delta = deltas[stats_key(recommendation)]
+        delta["count"] += sign
+        for field, sum_field, count_field in MEASURES:
+            value = getattr(recommendation, field)
+            if value is not None:
+                delta[sum_field] += sign * value
+                delta[count_field] += sign
+    return deltas
+
+
+def apply_recommendation_stats(recommendations, sign=1):
+    """
+    Add (`sign=1`) or remove (`sign=-1`) recommendations from the daily rollup.
+    One UPDATE per touched (user, crop, date, risk) bucket, so a bulk-created chunk costs a handful of
+    queries rather than one per row. Buckets that drop to zero are deleted.
+    """
+    for (user_id, crop_id, day, risk), delta in _deltas(recommendations, sign).items():
+        lookup = {"user_id": user_id, "crop_id": crop_id, "date": day, "risk_assessment": risk}
+        increments = {name: F(name) + value for name, value in delta.items()}
+        increments["updated_at"] = timezone.now()  # `update()` skips auto_now
+        with transaction.atomic():
+            updated = RecommendationDailyStats.objects.filter(**lookup).update(**increments)
+            if updated == 0 and sign > 0:
+                try:
+                    with transaction.atomic():
+                        RecommendationDailyStats.objects.create(**lookup, **delta)
+                except IntegrityError:
+                    # ✅ Another worker created the bucket first; add to it instead
+                    RecommendationDailyStats.objects.filter(**lookup).update(**increments)
+            elif sign < 0:
+                RecommendationDailyStats.objects.filter(**lookup, count__lte=0).delete()
+
+
+def filtered_daily_stats(user, crop=None, risk=None, start_date=None, end_date=None):
+    """A user's rollup rows, with the chart endpoints' optional filters (dates are whole days)."""
+    qs = RecommendationDailyStats.objects.filter(user=user)
+    if crop:
+        qs = qs.filter(crop__name__iexact=crop)
+    if risk:
+        qs = qs.filter(risk_assessment__iexact=risk)
+    start, end = parse_date(str(start_date or "")[:10]), parse_date(str(end_date or "")[:10])
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    return qs
+
+
+def average(total, count):
+    """Average from a rollup sum and non-null count (None when there is nothing to average)."""
+    return total / count if count else None
+
+
+def rebuild_recommendation_stats(user=None):
+    """Recompute the rollup from scratch (all users, or one). Returns the number of buckets written."""
+    recommendations = Recommendation.objects.all()
+    stats = RecommendationDailyStats.objects.all()
+    if user is not None:
+        recommendations = recommendations.filter(user=user)
+        stats = stats.filter(user=user)
+
+    aggregates = {"count": Count("id")}
+    for field, sum_field, count_field in MEASURES:
+        aggregates[sum_field] = Sum(field, default=0.0)
+        aggregates[count_field] = Count("id", filter=Q(**{f"{field}__isnull": False}))
+    groups = (
+        recommendations.annotate(date=TruncDate("created_at"))
+        .values("user_id", "crop_id", "date", "risk_assessment")
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+    buckets = {}
+    for group in groups:
+        group["risk_assessment"] = group["risk_assessment"] or ""  # NULL and "" share a bucket
+        key = (group["user_id"], group["crop_id"], group["date"], group["risk_assessment"])
+        if key in buckets:
+            for name in aggregates:
+                buckets[key][name] += group[name]
+        else:
+            buckets[key] = group
+
+    with transaction.atomic():
+        stats.delete()
+        RecommendationDailyStats.objects.bulk_create(
+            [RecommendationDailyStats(**group) for group in buckets.values()], batch_size=1000,
+        )
+    logger.info(f"✅ Rebuilt {len(buckets)} recommendation daily stats buckets")
+    return len(buckets)
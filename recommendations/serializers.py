@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Recommendation, Crop
 from weather.serializers import WeatherDataSerializer
+from farming_ai.serializers import SparseFieldsetMixin
 
 
 class CropSerializer(serializers.ModelSerializer):
@@ -8,7 +9,7 @@ class CropSerializer(serializers.ModelSerializer):
         model = Crop
         fields = ["id", "name", "min_temp", "max_temp", "max_precipitation", "min_soil_temp"]
 
-class RecommendationSerializer(serializers.ModelSerializer):
+class RecommendationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField()
     crop = CropSerializer()
     weather_data = WeatherDataSerializer() 
@@ -17,6 +18,12 @@ class RecommendationSerializer(serializers.ModelSerializer):
         model = Recommendation
         fields = '__all__'
 
+    def to_representation(self, instance):
+        # ✅ List views annotate the 30-day precipitation sum; hand it to the nested weather serializer
+        if hasattr(instance, "weather_precip_30day_sum") and instance.weather_data is not None:
+            instance.weather_data.precip_30day_sum = instance.weather_precip_30day_sum
+        return super().to_representation(instance)
+
 class RecommendationCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recommendation
@@ -0,0 +1,47 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Crop, Recommendation
+from .rollups import MEASURES, apply_recommendation_stats
+
+
+# ✅ Keep RecommendationDailyStats in step with single saves and deletes (including cascades).
+# Bulk inserts (bulk_create sends no signals) call apply_recommendation_stats themselves.
+@receiver(pre_save, sender=Recommendation)
+def remember_previous_stats(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding:
+        # ✅ Only the fields of the row's rollup bucket and measures (see rollups.stats_key)
+        instance._previous_for_stats = Recommendation.objects.filter(pk=instance.pk).only(
+            "user", "crop", "created_at", "risk_assessment", *(field for field, _, _ in MEASURES),
+        ).first()
+
+
+@receiver(post_save, sender=Recommendation)
+def update_stats_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_previous_for_stats", None)
+    if previous is not None:
+        apply_recommendation_stats([previous], sign=-1)
+        instance._previous_for_stats = None
+    apply_recommendation_stats([instance], sign=1)
+
+
+@receiver(post_delete, sender=Recommendation)
+def update_stats_on_delete(sender, instance, **kwargs):
+    apply_recommendation_stats([instance], sign=-1)
+
+
+# ✅ Deleting a crop cascades to its rollup buckets and sets its recommendations' crop to NULL with a
+# plain UPDATE (no signals); add those recommendations back to the crop-less buckets afterwards.
+@receiver(pre_delete, sender=Crop)
+def remember_crop_recommendations(sender, instance, **kwargs):
+    instance._recommendation_ids = list(instance.recommendations.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Crop)
+def move_crop_recommendations_to_no_crop_stats(sender, instance, **kwargs):
+    ids = getattr(instance, "_recommendation_ids", None)
+    if not ids:
+        return
+    moved = Recommendation.objects.filter(id__in=ids)
+    moved.update(updated_at=timezone.now())  # ✅ The crop change must reach delta-sync clients too
+    apply_recommendation_stats(moved.iterator(chunk_size=2000), sign=1)
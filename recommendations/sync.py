@@ -0,0 +1,22 @@
+from datasets.sync import SyncFeed, register_sync_feed
+from weather.models import precip_30day_sum_subquery
+from .models import Recommendation
+from .serializers import RecommendationSerializer
+
+
+def recommendation_sync_queryset(user):
+    """The user's recommendations, with the relations the serializer renders."""
+    return (
+        Recommendation.objects.filter(user=user)
+        .select_related("user", "crop", "weather_data")
+        .annotate(weather_precip_30day_sum=precip_30day_sum_subquery())
+    )
+
+
+RECOMMENDATION_FEED = register_sync_feed(SyncFeed(
+    name="recommendations",
+    model=Recommendation,
+    updated_field="updated_at",
+    queryset=recommendation_sync_queryset,
+    serializer_class=RecommendationSerializer,
+))
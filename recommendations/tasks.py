@@ -1,21 +1,31 @@
+import io
 import os
+import time
 import logging
-import boto3
 import pandas as pd
 import numpy as np
-from celery import shared_task
-from django.utils.timezone import make_aware
+from celery import chord, shared_task
 from django.contrib.auth import get_user_model
-from dateutil import parser as date_parser
+from django.conf import settings
+from django.db import transaction
 from weather.models import WeatherData
-from soil.models import SoilData
+from weather.utils import historical_weather_map
+from soil.spatial import find_nearest_soil
+from soil.interpolation import get_estimated_soil
+from geocoding.services import geocode_dataframe
 from recommendations.models import Recommendation, Crop
+from recommendations.rollups import apply_recommendation_stats
 from recommendations.views import fetch_latest_weather
-from .utils import load_model, load_pipeline, preprocess_input_data, make_predictions, fetch_and_merge_data
+from .utils import load_model, load_pipeline, preprocess_input_data, make_predictions, fetch_and_merge_data, CSV_IMPORT_VERSION
+from datasets.models import CSVUpload, CSVUploadChunk
+from datasets.uploads import open_stream
+from datasets.progress import start_progress, report_progress
+from datasets.reports import RejectedRows, write_rejections_report
+from datasets.parsing import iter_csv_blocks, parse_timestamps, read_csv_header, record_boundaries
+from datasets.utils import find_processed_duplicate, mark_duplicate, finish_upload, resume_position, renumber_chunks, collect_chunk_results
 from django.utils import timezone
 from datetime import timedelta
-import pytz
-import io
+from contextlib import closing
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
@@ -29,15 +39,161 @@ models = {
 
 User = get_user_model()
 
-@shared_task
-def process_csv_upload(file_name, user_id):
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_csv_upload(self, file_name, user_id, upload_id=None):
     """
     Processes a CSV file uploaded to Cloudflare R2.
     - If a full URL is provided, extract the R2 key.
-    - Uses boto3 client to fetch the file from Cloudflare R2.
+    - Streams the file from Cloudflare R2 in chunks.
+    - With `upload_id` (datasets.CSVUpload), identical content already processed for the same
+      user and model version short-circuits to the earlier result instead of being re-processed.
+    - With `upload_id`, every chunk is checkpointed; the task is acknowledged only when it finishes,
+      so if the worker dies it is redelivered and resumes after the last committed chunk.
+    - With `upload_id`, progress (rows done, errors, ETA) is recorded through `datasets.progress`.
+    - With `upload_id`, files of at least `CSV_PARALLEL_MIN_BYTES` are split into byte ranges processed
+      by a chord of `process_csv_chunk` tasks, each reading only its own range; this task is replaced
+      by the chord, so its ID resolves to the result of `reduce_csv_chunks`.
     """
     logger.info(f"🚀 Celery Task Started! File: {file_name}, User ID: {user_id}")
-    
+
+    upload = CSVUpload.objects.filter(pk=upload_id).first() if upload_id else None
+    if upload:
+        if upload.status == "completed":
+            return upload.result  # ✅ Redelivered after it had already finished
+        previous = find_processed_duplicate(upload)
+        if previous:
+            return mark_duplicate(upload, previous)
+        upload.status = "processing"
+        upload.save(update_fields=["status"])
+
+        plan, error = _plan_byte_ranges(file_name, upload)
+        if error:
+            finish_upload(upload, error, status="failed")
+            return error
+        if plan and len(plan["ranges"]) > 1:
+            start_progress(upload, bytes_total=upload.size - plan["data_start"])
+            logger.info(f"🚀 Fanning out upload {upload.id} as {len(plan['ranges'])} chunk tasks")
+            return self.replace(chord(
+                [
+                    process_csv_chunk.s(file_name, user_id, upload.id, start, stop, plan["columns"], plan["data_start"])
+                    for start, stop in plan["ranges"]
+                ],
+                reduce_csv_chunks.s(upload.id),
+            ))
+        start_progress(upload, bytes_total=upload.size)
+
+    result = _process_csv_file(file_name, user_id, upload=upload)
+    if upload:
+        if "error" not in result:
+            result = _upload_result(upload)  # ✅ Include chunks committed by earlier (interrupted) attempts
+        finish_upload(upload, result, status="failed" if "error" in result else "completed")
+    return result
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
+def process_csv_chunk(file_name, user_id, upload_id, start_byte, stop_byte, columns, data_start):
+    """
+    Map step of a fanned-out upload: process the records starting in bytes [start_byte, stop_byte)
+    of the file (`columns` and `data_start` come from the header, read once by the planner).
+    Safe to redeliver: sub-chunks already committed for the range are skipped.
+    """
+    upload = CSVUpload.objects.get(pk=upload_id)
+    started = time.monotonic()
+    result = _process_csv_file(
+        file_name, user_id, upload=upload, start_byte=start_byte, stop_byte=stop_byte,
+        header=(columns, data_start),
+    )
+    return {
+        "start_byte": start_byte,
+        "stop_byte": stop_byte,
+        "error": result.get("error"),
+        "created": len(result.get("created_recommendations", [])),
+        "seconds": round(time.monotonic() - started, 3),
+    }
+
+
+@shared_task
+def reduce_csv_chunks(chunk_results, upload_id):
+    """
+    Reduce step of a fanned-out upload: combine the committed chunks into the upload's result.
+    """
+    upload = CSVUpload.objects.get(pk=upload_id)
+    errors = [r["error"] for r in chunk_results if r.get("error")]
+    if errors:
+        result = {"error": errors[0]}
+        finish_upload(upload, result, status="failed")
+        return result
+
+    result = _upload_result(upload)
+    result["timings"]["tasks"] = len(chunk_results)
+    result["timings"]["slowest_task_seconds"] = max((r["seconds"] for r in chunk_results), default=0.0)
+    finish_upload(upload, result)
+    logger.info(f"🚀 Upload {upload.id} complete: {len(result['created_recommendations'])} recommendations from {len(chunk_results)} chunk tasks")
+    return result
+
+
+def _upload_result(upload):
+    """
+    Task result of a processed upload, built from its committed chunks.
+    Rejected rows are written to a CSV report next to the upload (`rejected_rows_key`).
+    """
+    renumber_chunks(upload)  # ✅ Chunk tasks number rows from the start of their byte range
+    created_ids, error_count, durations = collect_chunk_results(upload)
+    report = write_rejections_report(upload) if error_count else None
+    return {
+        "message": "CSV processed",
+        "created_recommendations": created_ids,
+        "error_count": error_count,
+        "rejected_rows_key": report.key if report else None,
+        "rejected_rows_url": report.url if report else None,
+        "timings": {
+            "chunks": len(durations),
+            "processing_seconds": round(sum(durations), 3),
+            "slowest_chunk_seconds": round(max(durations, default=0.0), 3),
+        },
+    }
+
+
+def _plan_byte_ranges(file_name, upload):
+    """
+    Split an upload of at least `CSV_PARALLEL_MIN_BYTES` into byte ranges of about `CSV_PARALLEL_CHUNK_BYTES`
+    for the chord. Returns (plan, error_result); plan is None for smaller files (processed sequentially),
+    else `{"columns", "data_start", "ranges"}`.
+    The header is read and validated first, so a bad file fails before any chunk task is queued. The cuts
+    are then moved to record boundaries in one pass that only counts quotes and newlines
+    (`datasets.parsing.record_boundaries`): a quoted field spanning lines never straddles two ranges,
+    and each chunk task reads exactly its own range.
+    """
+    if upload.size < getattr(settings, "CSV_PARALLEL_MIN_BYTES", 5 * 1024 * 1024):
+        return None, None
+    file_key = _storage_key(file_name)
+    try:
+        with closing(open_stream(file_key)) as stream:
+            columns, data_start = read_csv_header(stream)
+    except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as e:
+        logger.error(f"⛔ Error reading CSV file: {str(e)}")
+        return None, {"error": "Invalid CSV format"}
+    except Exception as e:
+        logger.error(f"⛔ File {file_key} NOT found in storage! Error: {str(e)}")
+        return None, {"error": f"File {file_key} not found in storage."}
+    error = _check_columns(pd.DataFrame(columns=pd.Index(columns).str.strip()))
+    if error:
+        return None, error
+
+    range_bytes = getattr(settings, "CSV_PARALLEL_CHUNK_BYTES", 4 * 1024 * 1024)
+    targets = range(data_start + range_bytes, upload.size, range_bytes)
+    with closing(open_stream(file_key, start=data_start)) as stream:
+        cuts = [cut for cut in record_boundaries(stream, data_start, targets) if cut < upload.size]
+    starts = [data_start, *cuts]
+    ranges = list(zip(starts, [*cuts, upload.size]))
+    return {"columns": columns, "data_start": data_start, "ranges": ranges}, None
+
+
+def _storage_key(file_name):
+    """Storage key of an uploaded file, given either the key itself or its public URL."""
+    media_url = settings.MEDIA_URL
+    if media_url and file_name.startswith(media_url):
+        return file_name[len(media_url):].lstrip("/")
     # If the provided file_name is a full URL, extract the key
     if file_name.startswith("http"):
         parsed_url = urlparse(file_name)
@@ -45,43 +201,145 @@ def process_csv_upload(file_name, user_id):
         key = parsed_url.path.lstrip("/")
         # Remove bucket prefix if present
         bucket_name = os.getenv("R2_BUCKET_NAME")
-        if key.startswith(bucket_name):
+        if bucket_name and key.startswith(bucket_name):
             key = key[len(bucket_name):].lstrip("/")
-        file_key = key
-        logger.info(f"Extracted file key from URL: {file_key}")
-    else:
-        file_key = file_name
-
-    csv_content = None  # Placeholder for file content
-
-    # Setup boto3 client for Cloudflare R2
-    s3 = boto3.client(
-        "s3",
-        endpoint_url=os.getenv("R2_ENDPOINT_URL"),
-        aws_access_key_id=os.getenv("R2_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("R2_SECRET_ACCESS_KEY"),
-        config=boto3.session.Config(signature_version="s3v4", region_name="auto")
-    )
+        logger.info(f"Extracted file key from URL: {key}")
+        return key
+    return file_name
+
 
-    bucket_name = os.getenv("R2_BUCKET_NAME")
+def _process_csv_file(file_name, user_id, upload=None, start_byte=0, stop_byte=None, header=None):
+    """
+    Stream the CSV from storage and process it `CSV_CHUNK_ROWS` rows at a time:
+    each chunk is geocoded, run through inference and bulk-inserted before the next one is read,
+    so worker memory is bounded by the chunk size rather than the file size.
+    Only the records in bytes [start_byte, stop_byte) are processed (the whole file by default; a range
+    must start and stop at record boundaries); `header` is the file's `(columns, data_start)` when the
+    caller already read it.
+    With an `upload`, processing starts after the last checkpointed chunk of that range: the stream is
+    opened at the byte offset recorded by that checkpoint, so resuming costs nothing for the rows before it.
+    """
+    file_key = _storage_key(file_name)
+    chunk_rows = getattr(settings, "CSV_CHUNK_ROWS", 5000)
+    resume = resume_position(upload, start_byte, stop_byte) if upload else None
+    offset, resume_byte = resume or (0, None)
+    if resume:
+        logger.info(f"⏩ Resuming upload {upload.id} after row {offset} of bytes {start_byte}-{stop_byte or upload.size}")
+        if resume_byte >= (stop_byte if stop_byte is not None else upload.size) > 0:
+            return {"message": "CSV processed", "created_recommendations": []}
+
+    if header is None:
+        try:
+            logger.info(f"🔍 Attempting to stream file {file_key} from storage")
+            header_stream = open_stream(file_key)
+        except Exception as e:
+            logger.error(f"⛔ File {file_key} NOT found in storage! Error: {str(e)}")
+            return {"error": f"File {file_key} not found in storage."}
+        try:
+            with closing(header_stream):
+                header = read_csv_header(header_stream)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as e:
+            logger.error(f"⛔ Error reading CSV file: {str(e)}")
+            return {"error": "Invalid CSV format"}
+        logger.info(f"📊 CSV stream opened! Columns: {header[0]}")
+        error = _check_columns(pd.DataFrame(columns=pd.Index(header[0]).str.strip()))
+        if error:
+            return error
+    columns, data_start = header
+
+    # ✅ Seek straight to the checkpoint (or the start of the range) instead of reading up to it
+    position = resume_byte if resume else max(start_byte, data_start)
     try:
-        logger.info(f"🔍 Attempting to fetch file {file_key} from Cloudflare R2 (Bucket: {bucket_name})")
-        response = s3.get_object(Bucket=bucket_name, Key=file_key)
-        csv_content = response['Body'].read()
-        logger.info(f"✅ Successfully fetched file {file_key} from Cloudflare R2.")
+        stream = open_stream(file_key, start=position)
     except Exception as e:
-        logger.error(f"⛔ File {file_key} NOT found in Cloudflare R2! Error: {str(e)}")
+        logger.error(f"⛔ File {file_key} NOT found in storage! Error: {str(e)}")
         return {"error": f"File {file_key} not found in storage."}
 
-    # Convert CSV content to DataFrame
-    try:
-        df = pd.read_csv(io.BytesIO(csv_content))
-        df.columns = df.columns.str.strip()  # Clean column names
-        logger.info(f"📊 CSV loaded successfully! Columns: {df.columns.tolist()}")
-    except Exception as e:
-        logger.error(f"⛔ Error reading CSV file: {str(e)}")
-        return {"error": "Invalid CSV format"}
+    user = User.objects.get(id=user_id)
+    all_crops = list(Crop.objects.all())  # ✅ Loaded once per file instead of once per row
+    crops_by_name = {c.name.lower(): c for c in all_crops}
+    recommendations_created = []
 
+    with closing(stream):
+        try:
+            blocks = iter_csv_blocks(stream, chunk_rows, position, stop_byte=stop_byte)
+            start_row = offset
+            for block, block_start, block_end in blocks:
+                df = pd.read_csv(io.BytesIO(block), header=None, names=columns)
+                # ✅ Row numbers relative to the range (the whole file unless fanned out; see renumber_chunks)
+                df.index = pd.RangeIndex(start_row, start_row + len(df))
+                df.columns = df.columns.str.strip()  # Clean column names
+
+                started = time.monotonic()
+                df["parsed_time"] = parse_timestamps(df["time"])  # ✅ Whole column at once instead of dateutil per row
+                # ✅ Batch-geocode rows without coordinates: one lookup per distinct location, misses in a bounded pool
+                geocode_dataframe(df)
+
+                # ✅ Last year's readings for every point of the chunk in one range query
+                one_year_ago = timezone.localdate() - timedelta(days=365)
+                points = df[["latitude", "longitude"]].dropna().drop_duplicates().itertuples(index=False)
+                history = historical_weather_map((lat, lon, one_year_ago) for lat, lon in points)
+
+                pending, rejections = [], RejectedRows()
+                for index, row in df.iterrows():
+                    recommendation = _build_recommendation(index, row, user, crops_by_name, all_crops, rejections, history)
+                    if recommendation is not None:
+                        pending.append(recommendation)
+
+                created_ids = _commit_chunk(
+                    upload, start_row, start_row + len(df), pending,
+                    rejections=rejections, duration=time.monotonic() - started,
+                    byte_range=(block_start, block_end),
+                )
+                if created_ids is not None:
+                    recommendations_created.extend(created_ids)
+                    if upload:
+                        report_progress(upload.id, rows=len(df), size=block_end - block_start, errors=len(rejections))
+                    logger.info(f"✅ Rows {start_row + 1}-{start_row + len(df)}: {len(created_ids)} recommendations saved")
+                start_row += len(df)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError) as e:
+            logger.error(f"⛔ Error reading CSV file: {str(e)}")
+            return {"error": "Invalid CSV format"}
+
+    logger.info(f"🚀 CSV processing complete. Total recommendations created: {len(recommendations_created)}")
+    return {"message": "CSV processed", "created_recommendations": recommendations_created}
+
+
+def _commit_chunk(upload, start_row, end_row, recommendations, rejections=None, duration=0.0, byte_range=None):
+    """
+    Bulk-insert one chunk of recommendations. With an `upload`, the rows and the chunk's checkpoint
+    (including its rejected rows and its `byte_range` in the file) are committed in one transaction;
+    a chunk that was already committed (e.g. by a redelivered task) is skipped.
+    Returns the created IDs, or None when the chunk was skipped.
+    """
+    if upload is None:
+        with transaction.atomic():
+            created = Recommendation.objects.bulk_create(recommendations)
+            apply_recommendation_stats(created)  # ✅ bulk_create sends no signals
+        return [r.id for r in created]
+
+    rejections = rejections or RejectedRows()
+    with transaction.atomic():
+        chunk, created = CSVUploadChunk.objects.get_or_create(
+            upload=upload, start_byte=byte_range[0],
+            defaults={
+                "start_row": start_row, "end_row": end_row, "end_byte": byte_range[1],
+                "error_count": len(rejections),
+                "rejections": rejections.as_dict(), "duration": duration,
+            },
+        )
+        if not created:
+            logger.warning(f"⚠️ Rows {start_row + 1}-{end_row} of upload {upload.id} were already committed; skipping.")
+            return None
+        created_recommendations = Recommendation.objects.bulk_create(recommendations)
+        apply_recommendation_stats(created_recommendations)  # ✅ bulk_create sends no signals
+        chunk.created_ids = [r.id for r in created_recommendations]
+        chunk.save(update_fields=["created_ids"])
+    return chunk.created_ids
+
+
+def _check_columns(df):
+    """Return an error result if required columns are missing, else None."""
     required_columns = {
         "time",
         "crop",
@@ -89,241 +347,235 @@ def process_csv_upload(file_name, user_id):
         "relative_humidity_2m",
         "wind_speed_10m",
         "precip_30day_sum",
-        "latitude",
-        "longitude"
     }
     missing_columns = required_columns - set(df.columns)
+    # ✅ Coordinates may be replaced by a "location" column (geocoded per chunk)
+    if "location" not in df.columns:
+        missing_columns |= {"latitude", "longitude"} - set(df.columns)
     if missing_columns:
         logger.error(f"⛔ Missing required columns: {', '.join(missing_columns)}")
         return {"error": f"Missing required columns: {', '.join(missing_columns)}"}
+    logger.info(f"✅ Processing CSV with columns: {df.columns.tolist()}")
+    return None
 
-    logger.info(f"✅ Processing CSV {file_key} with columns: {df.columns.tolist()}")
-    user = User.objects.get(id=user_id)
-    recommendations_created = []
-
-    for index, row in df.iterrows():
-        try:
-            logger.debug(f"📌 Processing Row {index + 1}: {row.to_dict()}")
 
-            # Convert `time` to a timezone-aware datetime object
-            time_str = str(row["time"]).strip()
-            parsed_time = date_parser.parse(time_str)
-            if parsed_time.tzinfo is None:
-                time_obj = make_aware(parsed_time, pytz.UTC)
-            else:
-                time_obj = parsed_time.astimezone(pytz.UTC)
-
-            latitude, longitude = float(row["latitude"]), float(row["longitude"])
-            logger.info(f"📌 Row {index + 1} ➡ Parsed Time: {time_obj}, Lat: {latitude}, Lon: {longitude}")
-
-            # Fetch WeatherData & SoilData
-            weather_data = WeatherData.objects.filter(
-                latitude=latitude, longitude=longitude, time__lte=time_obj
-            ).order_by("-time").first()
-            soil_data = SoilData.objects.filter(
-                latitude=latitude, longitude=longitude, time__lte=time_obj
-            ).order_by("-time").first()
-
-            if not weather_data:
-                logger.warning(f"⛔ No WeatherData found for Row {index + 1}, fetching live data...")
-                live_weather = fetch_latest_weather(lat=latitude, lon=longitude)
-                if live_weather:
-                    weather_data = WeatherData.objects.create(
-                        time=timezone.now(),
-                        original_location="Live Data",
-                        temperature_2m=live_weather["temperature_2m"],
-                        relative_humidity_2m=live_weather["relative_humidity_2m"],
-                        wind_speed_10m=live_weather["wind_speed_10m"],
-                        precipitation=live_weather["precip_30day_sum"],
-                        latitude=latitude,
-                        longitude=longitude
-                    )
-                else:
-                    logger.error(f"⛔ Failed to fetch live weather for Row {index + 1}, skipping entry.")
-                    continue
-
-            if not soil_data:
-                estimated_soil_temp = max(0, weather_data.temperature_2m - 3)
-                soil_data = SoilData.objects.create(
+def _build_recommendation(index, row, user, crops_by_name, all_crops, rejections, history):
+    """
+    Run inference for one CSV row and return an unsaved Recommendation (None to skip the row).
+    Skipped rows are added to `rejections` (datasets.reports.RejectedRows) with a reason code.
+    `history` is the chunk's `historical_weather_map` (last year's readings by point and date).
+    """
+    try:
+        logger.debug(f"📌 Processing Row {index + 1}: {row.to_dict()}")
+
+        # `parsed_time` is the chunk's `time` column normalized to UTC by `parse_timestamps`
+        if pd.isna(row["parsed_time"]):
+            logger.error(f"⛔ Invalid time '{row['time']}' for Row {index + 1}, skipping entry.")
+            rejections.add(index + 1, "invalid_time", "time", row["time"])
+            return None
+        time_obj = row["parsed_time"].to_pydatetime()
+
+        if pd.isna(row["latitude"]) or pd.isna(row["longitude"]):
+            logger.error(f"⛔ No coordinates for Row {index + 1} (location: {row.get('location')}), skipping entry.")
+            rejections.add(index + 1, "unresolved_location", "location", row.get("location"))
+            return None
+        latitude, longitude = float(row["latitude"]), float(row["longitude"])
+        logger.info(f"📌 Row {index + 1} ➡ Parsed Time: {time_obj}, Lat: {latitude}, Lon: {longitude}")
+
+        # Fetch WeatherData & SoilData
+        weather_data = WeatherData.objects.filter(
+            latitude=latitude, longitude=longitude, time__lte=time_obj
+        ).order_by("-time").first()
+        soil_data = find_nearest_soil(latitude, longitude, until=time_obj, max_age=timedelta(days=30))
+
+        if not weather_data:
+            logger.warning(f"⛔ No WeatherData found for Row {index + 1}, fetching live data...")
+            live_weather = fetch_latest_weather(lat=latitude, lon=longitude)
+            if live_weather:
+                weather_data = WeatherData.objects.create(
                     time=timezone.now(),
-                    original_location="Estimated from Weather",
-                    soil_temp_0_to_7cm=estimated_soil_temp,
+                    original_location="Live Data",
+                    temperature_2m=live_weather["temperature_2m"],
+                    relative_humidity_2m=live_weather["relative_humidity_2m"],
+                    wind_speed_10m=live_weather["wind_speed_10m"],
+                    precipitation=live_weather["precip_30day_sum"],
                     latitude=latitude,
-                    longitude=longitude,
-                    data_source="estimated"
+                    longitude=longitude
                 )
-
-            # Fetch Crop Details
-            crop_name = row["crop"].strip()
-            try:
-                crop = Crop.objects.get(name__iexact=crop_name)
-            except Crop.DoesNotExist:
-                logger.error(f"⛔ ERROR: Crop '{crop_name}' not found for row {index + 1}, skipping entry.")
-                continue
-
-            # AI Prediction using weather data as input
-            input_data = pd.DataFrame([{
-                "temperature_2m": weather_data.temperature_2m,
-                "relative_humidity_2m": weather_data.relative_humidity_2m,
-                "wind_speed_10m": weather_data.wind_speed_10m,
-                "precip_30day_sum": weather_data.precipitation
-            }])
-            predictions = make_predictions(models, input_data)
-
-            predicted_soil_temp = predictions.get("linear_regression", [None])[0]
-            if predicted_soil_temp is None:
-                logger.error(f"⛔ ERROR: Soil temp prediction failed for row {index + 1}. Skipping entry.")
-                continue
-            predicted_soil_temp = float(predicted_soil_temp)
-
-            raw_yield_prediction = predictions.get("decision_tree", [None])[0]
-            if raw_yield_prediction is None:
-                logger.error(f"⛔ ERROR: Yield prediction failed for row {index + 1}. Skipping entry.")
-                continue
-            raw_yield_prediction = float(raw_yield_prediction)
-
-            # Determine Risk Level & Expected Yield
-            base_yield = getattr(crop, "expected_yield", 10.0)
-            temp_deviation = max(0, crop.min_soil_temp - predicted_soil_temp, predicted_soil_temp - crop.max_temp)
-
-            if temp_deviation >= 3.5:
-                risk_assessment = "High risk"
-                expected_yield = base_yield * 0.4
-            elif temp_deviation >= 1.5:
-                risk_assessment = "Medium risk"
-                expected_yield = base_yield * 0.7
-            else:
-                risk_assessment = "Low risk"
-                expected_yield = base_yield * (1 + (predicted_soil_temp - crop.min_soil_temp) / (crop.max_temp - crop.min_soil_temp))
-
-            # Improved Crop Recommendations
-            recommended_crops = {"crops": []}
-            crop_scores = []
-
-            # Adaptive tolerance based on soil temperature
-            if predicted_soil_temp < 5:
-                TOLERANCE = 8
-            elif predicted_soil_temp < 10:
-                TOLERANCE = 6
-            elif predicted_soil_temp < 15:
-                TOLERANCE = 5
             else:
-                TOLERANCE = 4
-
-            # Score crops based on suitability
-            for c in Crop.objects.all():
-                is_within_range = (c.min_soil_temp - TOLERANCE) <= predicted_soil_temp <= (c.max_temp + TOLERANCE)
-                if is_within_range:
-                    temp_distance = abs(predicted_soil_temp - ((c.min_soil_temp + c.max_temp) / 2))
-                    precipitation_factor = c.max_precipitation
-                    crop_scores.append((c.name, temp_distance, precipitation_factor))
-
-            # Sort crops (60% temperature, 40% precipitation)
-            crop_scores.sort(key=lambda x: (x[1] * 0.6, x[2] * 0.4))
-
-            # Select top 4 recommended crops
-            for crop_name_val, _, _ in crop_scores[:4]:
-                recommended_crops["crops"].append(crop_name_val)
-
-            # Ensure at least 3 crops are recommended
-            if len(recommended_crops["crops"]) < 3:
-                sorted_all_crops = sorted(
-                    Crop.objects.all(),
-                    key=lambda c: abs(predicted_soil_temp - ((c.min_soil_temp + c.max_temp) / 2))
-                )
-                extra_crops = [c.name for c in sorted_all_crops if c.name not in recommended_crops["crops"]]
-                while len(recommended_crops["crops"]) < 3 and extra_crops:
-                    recommended_crops["crops"].append(extra_crops.pop(0))
-
-            # Final crop list adjustments
-            if risk_assessment == "High risk" and len(recommended_crops["crops"]) > 4:
-                recommended_crops["crops"] = recommended_crops["crops"][:4]
-
-            # Optimal Planting Time Logic
-            if risk_assessment == "High risk":
-                optimal_planting_time = "Late Season" if predicted_soil_temp < crop.min_soil_temp else "Mid Season"
-            else:
-                optimal_planting_time = "Early Season"
-
-            # Additional fields (mirroring RecommendationPredictAPIView)
-            yield_explanation = []
-            if risk_assessment == "High risk":
-                yield_explanation.append(f"⚠ AI predicted yield was {raw_yield_prediction:.2f}, but high-risk conditions reduced it to {expected_yield:.2f}.")
-            elif risk_assessment == "Medium risk":
-                yield_explanation.append(f"⚠ AI predicted yield was {raw_yield_prediction:.2f}, but medium-risk conditions adjusted it to {expected_yield:.2f}.")
-            else:
-                yield_explanation.append(f"✅ AI predicted yield of {raw_yield_prediction:.2f} is optimal for current conditions.")
-
-            # Add weather-based messages
-            if weather_data.precipitation < 10:
-                yield_explanation.append("⚠ Low precipitation detected, possible water stress.")
-            elif weather_data.precipitation > crop.max_precipitation:
-                yield_explanation.append("⚠ High precipitation detected, risk of overwatering or flooding.")
-            if weather_data.wind_speed_10m > 15:
-                yield_explanation.append("⚠ Strong winds detected, possible crop damage risk.")
-
-            mitigation_suggestions = []
-            if risk_assessment == "High risk":
-                mitigation_suggestions.append("Solution: Delay planting by 10 days to avoid extreme temperatures.")
-                mitigation_suggestions.append("Solution: Implement drainage solutions to reduce excess water in the field.")
-            elif risk_assessment == "Medium risk":
-                mitigation_suggestions.append("Solution: Consider increasing irrigation to counter water stress.")
-
-            one_year_ago = timezone.now() - timedelta(days=365)
-            historical_weather = WeatherData.objects.filter(
-                latitude=latitude, longitude=longitude, time__date=one_year_ago.date()
-            ).first()
-            if historical_weather:
-                historical_trends = [
-                    f"Last year's temperature for this period was {historical_weather.temperature_2m}°C, current temperature is {predicted_soil_temp:.1f}°C."
-                ]
-            else:
-                historical_trends = ["No historical data available."]
-
-            alerts = []
-            if risk_assessment == "High risk":
-                alerts.append("📧 ALERT: Soil temperature too low. Expected yield reduced by 40%.")
-
-            next_best_action = "Consider switching to Wheat due to better soil compatibility and lower risk of overwatering."
-            alternative_farming_advice = [
-                "Apply organic mulch to improve soil water retention.",
-                "Monitor soil pH to optimize nutrient uptake for Corn."
-            ]
-            confidence_score = {
-                "soil_temperature": float(np.around(predicted_soil_temp, 2)),
-                "yield_prediction": float(np.around(raw_yield_prediction, 2))
-            }
-            weather_summary = f"{'Warm' if predicted_soil_temp > 15 else 'Cool'} with {'high' if weather_data.precipitation > 20 else 'low'} precipitation."
-            ai_model_version = "CSV Import v1.1"
-
-            # Save Recommendation in DB with all fields
-            recommendation = Recommendation.objects.create(
-                user=user,
-                soil_data=soil_data,
-                weather_data=weather_data,
-                crop=crop,
-                recommended_crops=recommended_crops,
-                expected_yield=expected_yield,
-                risk_assessment=risk_assessment,
-                optimal_planting_time=optimal_planting_time,
-                predicted_yield=raw_yield_prediction,
-                predicted_soil_temp=predicted_soil_temp,
-                confidence_score=confidence_score,
-                weather_summary=weather_summary,
-                yield_explanation=yield_explanation,
-                mitigation_suggestions=mitigation_suggestions,
-                historical_trends=historical_trends,
-                alerts=alerts,
-                next_best_action=next_best_action,
-                alternative_farming_advice=alternative_farming_advice,
-                ai_model_version=ai_model_version
+                logger.error(f"⛔ Failed to fetch live weather for Row {index + 1}, skipping entry.")
+                rejections.add(index + 1, "no_weather_data", "latitude,longitude", f"{latitude},{longitude}")
+                return None
+
+        if not soil_data:
+            soil_data = get_estimated_soil(latitude, longitude, air_temp=weather_data.temperature_2m)
+
+        # Fetch Crop Details
+        crop_name = row["crop"].strip()
+        crop = crops_by_name.get(crop_name.lower())
+        if crop is None:
+            logger.error(f"⛔ ERROR: Crop '{crop_name}' not found for row {index + 1}, skipping entry.")
+            rejections.add(index + 1, "unknown_crop", "crop", crop_name)
+            return None
+
+        # AI Prediction using weather data as input
+        input_data = pd.DataFrame([{
+            "temperature_2m": weather_data.temperature_2m,
+            "relative_humidity_2m": weather_data.relative_humidity_2m,
+            "wind_speed_10m": weather_data.wind_speed_10m,
+            "precip_30day_sum": weather_data.precipitation
+        }])
+        predictions = make_predictions(models, input_data)
+
+        predicted_soil_temp = predictions.get("linear_regression", [None])[0]
+        if predicted_soil_temp is None:
+            logger.error(f"⛔ ERROR: Soil temp prediction failed for row {index + 1}. Skipping entry.")
+            rejections.add(index + 1, "prediction_failed", "temperature_2m", weather_data.temperature_2m)
+            return None
+        predicted_soil_temp = float(predicted_soil_temp)
+
+        raw_yield_prediction = predictions.get("decision_tree", [None])[0]
+        if raw_yield_prediction is None:
+            logger.error(f"⛔ ERROR: Yield prediction failed for row {index + 1}. Skipping entry.")
+            rejections.add(index + 1, "prediction_failed", "temperature_2m", weather_data.temperature_2m)
+            return None
+        raw_yield_prediction = float(raw_yield_prediction)
+
+        # Determine Risk Level & Expected Yield
+        base_yield = getattr(crop, "expected_yield", 10.0)
+        temp_deviation = max(0, crop.min_soil_temp - predicted_soil_temp, predicted_soil_temp - crop.max_temp)
+
+        if temp_deviation >= 3.5:
+            risk_assessment = "High risk"
+            expected_yield = base_yield * 0.4
+        elif temp_deviation >= 1.5:
+            risk_assessment = "Medium risk"
+            expected_yield = base_yield * 0.7
+        else:
+            risk_assessment = "Low risk"
+            expected_yield = base_yield * (1 + (predicted_soil_temp - crop.min_soil_temp) / (crop.max_temp - crop.min_soil_temp))
+
+        # Improved Crop Recommendations
+        recommended_crops = {"crops": []}
+        crop_scores = []
+
+        # Adaptive tolerance based on soil temperature
+        if predicted_soil_temp < 5:
+            TOLERANCE = 8
+        elif predicted_soil_temp < 10:
+            TOLERANCE = 6
+        elif predicted_soil_temp < 15:
+            TOLERANCE = 5
+        else:
+            TOLERANCE = 4
+
+        # Score crops based on suitability
+        for c in all_crops:
+            is_within_range = (c.min_soil_temp - TOLERANCE) <= predicted_soil_temp <= (c.max_temp + TOLERANCE)
+            if is_within_range:
+                temp_distance = abs(predicted_soil_temp - ((c.min_soil_temp + c.max_temp) / 2))
+                precipitation_factor = c.max_precipitation
+                crop_scores.append((c.name, temp_distance, precipitation_factor))
+
+        # Sort crops (60% temperature, 40% precipitation)
+        crop_scores.sort(key=lambda x: (x[1] * 0.6, x[2] * 0.4))
+
+        # Select top 4 recommended crops
+        for crop_name_val, _, _ in crop_scores[:4]:
+            recommended_crops["crops"].append(crop_name_val)
+
+        # Ensure at least 3 crops are recommended
+        if len(recommended_crops["crops"]) < 3:
+            sorted_all_crops = sorted(
+                all_crops,
+                key=lambda c: abs(predicted_soil_temp - ((c.min_soil_temp + c.max_temp) / 2))
             )
-            recommendations_created.append(recommendation.id)
-            logger.info(f"✅ Successfully processed row {index + 1} and created recommendation ID {recommendation.id}")
-
-        except Exception as e:
-            logger.error(f"⛔ ERROR processing row {index + 1}: {str(e)}")
-            continue
+            extra_crops = [c.name for c in sorted_all_crops if c.name not in recommended_crops["crops"]]
+            while len(recommended_crops["crops"]) < 3 and extra_crops:
+                recommended_crops["crops"].append(extra_crops.pop(0))
+
+        # Final crop list adjustments
+        if risk_assessment == "High risk" and len(recommended_crops["crops"]) > 4:
+            recommended_crops["crops"] = recommended_crops["crops"][:4]
+
+        # Optimal Planting Time Logic
+        if risk_assessment == "High risk":
+            optimal_planting_time = "Late Season" if predicted_soil_temp < crop.min_soil_temp else "Mid Season"
+        else:
+            optimal_planting_time = "Early Season"
+
+        # Additional fields (mirroring RecommendationPredictAPIView)
+        yield_explanation = []
+        if risk_assessment == "High risk":
+            yield_explanation.append(f"⚠ AI predicted yield was {raw_yield_prediction:.2f}, but high-risk conditions reduced it to {expected_yield:.2f}.")
+        elif risk_assessment == "Medium risk":
+            yield_explanation.append(f"⚠ AI predicted yield was {raw_yield_prediction:.2f}, but medium-risk conditions adjusted it to {expected_yield:.2f}.")
+        else:
+            yield_explanation.append(f"✅ AI predicted yield of {raw_yield_prediction:.2f} is optimal for current conditions.")
+
+        # Add weather-based messages
+        if weather_data.precipitation < 10:
+            yield_explanation.append("⚠ Low precipitation detected, possible water stress.")
+        elif weather_data.precipitation > crop.max_precipitation:
+            yield_explanation.append("⚠ High precipitation detected, risk of overwatering or flooding.")
+        if weather_data.wind_speed_10m > 15:
+            yield_explanation.append("⚠ Strong winds detected, possible crop damage risk.")
+
+        mitigation_suggestions = []
+        if risk_assessment == "High risk":
+            mitigation_suggestions.append("Solution: Delay planting by 10 days to avoid extreme temperatures.")
+            mitigation_suggestions.append("Solution: Implement drainage solutions to reduce excess water in the field.")
+        elif risk_assessment == "Medium risk":
+            mitigation_suggestions.append("Solution: Consider increasing irrigation to counter water stress.")
+
+        historical_weather = history.get((latitude, longitude, timezone.localdate() - timedelta(days=365)))
+        if historical_weather:
+            historical_trends = [
+                f"Last year's temperature for this period was {historical_weather.temperature_2m}°C, current temperature is {predicted_soil_temp:.1f}°C."
+            ]
+        else:
+            historical_trends = ["No historical data available."]
+
+        alerts = []
+        if risk_assessment == "High risk":
+            alerts.append("📧 ALERT: Soil temperature too low. Expected yield reduced by 40%.")
+
+        next_best_action = "Consider switching to Wheat due to better soil compatibility and lower risk of overwatering."
+        alternative_farming_advice = [
+            "Apply organic mulch to improve soil water retention.",
+            "Monitor soil pH to optimize nutrient uptake for Corn."
+        ]
+        confidence_score = {
+            "soil_temperature": float(np.around(predicted_soil_temp, 2)),
+            "yield_prediction": float(np.around(raw_yield_prediction, 2))
+        }
+        weather_summary = f"{'Warm' if predicted_soil_temp > 15 else 'Cool'} with {'high' if weather_data.precipitation > 20 else 'low'} precipitation."
+        ai_model_version = CSV_IMPORT_VERSION
+
+        # Recommendation with all fields (saved in bulk per chunk)
+        return Recommendation(
+            user=user,
+            soil_data=soil_data,
+            weather_data=weather_data,
+            crop=crop,
+            recommended_crops=recommended_crops,
+            expected_yield=expected_yield,
+            risk_assessment=risk_assessment,
+            optimal_planting_time=optimal_planting_time,
+            predicted_yield=raw_yield_prediction,
+            predicted_soil_temp=predicted_soil_temp,
+            confidence_score=confidence_score,
+            weather_summary=weather_summary,
+            yield_explanation=yield_explanation,
+            mitigation_suggestions=mitigation_suggestions,
+            historical_trends=historical_trends,
+            alerts=alerts,
+            next_best_action=next_best_action,
+            alternative_farming_advice=alternative_farming_advice,
+            ai_model_version=ai_model_version
+        )
 
-    logger.info(f"🚀 CSV processing complete. Total recommendations created: {len(recommendations_created)}")
-    return {"message": "CSV processed", "created_recommendations": recommendations_created}
+    except Exception as e:
+        logger.error(f"⛔ ERROR processing row {index + 1}: {str(e)}")
+        rejections.add(index + 1, "processing_error", "", str(e))
+        return None
@@ -1,3 +1,315 @@
-from django.test import TestCase
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from datasets.models import CSVUpload
+from datasets.uploads import stream_upload
+from datasets.utils import register_upload
+from soil.models import SoilData
+from weather.models import WeatherData
+from . import views, tasks  # noqa: F401 (views first: the tasks module imports from it)
+from .models import Crop, Recommendation, RecommendationDailyStats
+from .rollups import rebuild_recommendation_stats
+
+
+class QueryCountTestCase(TestCase):
+    """
+    The list and chart endpoints must cost a fixed number of queries, however many recommendations
+    the user has: no per-row lookups of crops, weather data or users.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            first_name="Test", last_name="Farmer", username="farmer", email="farmer@example.com", password="pass",
+        )
+        crops = [
+            Crop.objects.create(name="Wheat", min_temp=5, max_temp=25),
+            Crop.objects.create(name="Corn", min_temp=10, max_temp=35),
+        ]
+        now = timezone.now()
+        soil = SoilData.objects.create(user=cls.user, time=now, location="Test Farm", soil_temp_0_to_7cm=15.0)
+        risks = ["Low risk", "Medium risk", "High risk"]
+        for i in range(12):
+            weather = WeatherData.objects.create(
+                time=now - timedelta(days=i), location="Test Farm", temperature_2m=20 + i,
+                relative_humidity_2m=50, wind_speed_10m=5, precipitation=1.5,
+            )
+            recommendation = Recommendation.objects.create(
+                user=cls.user, soil_data=soil, weather_data=weather, crop=crops[i % 2],
+                recommended_crops=[crops[i % 2].name], expected_yield=1000 + i, predicted_yield=1100 + i,
+                predicted_soil_temp=14.0 + i, risk_assessment=risks[i % 3], optimal_planting_time="Mid Season",
+            )
+            # ✅ Spread over several days, so the charts have more than one bucket per crop
+            Recommendation.objects.filter(pk=recommendation.pk).update(created_at=now - timedelta(days=i))
+        rebuild_recommendation_stats(cls.user)  # `update()` moved the rows without signals
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return response
+
+    # Page-number pagination: COUNT(*) + the page (crop, weather and user joined, 30-day precipitation annotated)
+    def test_list_page_number(self):
+        with self.assertNumQueries(2):
+            response = self.get("recommendation_list_create")
+        self.assertEqual(response.json()["count"], 12)
+        self.assertEqual(len(response.json()["results"]), 10)
+
+    # Keyset pagination: the page only, no COUNT(*)
+    def test_list_cursor(self):
+        with self.assertNumQueries(1):
+            response = self.get("recommendation_list_create", cursor="")
+        next_url = response.json()["next"]
+        self.assertIsNotNone(next_url)
+        with self.assertNumQueries(1):
+            response = self.client.get(next_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+    def test_list_sparse_fields(self):
+        with self.assertNumQueries(2):
+            response = self.get("recommendation_list_create", fields="id,crop,created_at")
+        self.assertEqual(set(response.json()["results"][0]), {"id", "crop", "created_at"})
+
+    def test_list_cursor_sparse_fields(self):
+        with self.assertNumQueries(1):
+            response = self.get("recommendation_list_create", cursor="", fields="id,risk_assessment")
+        self.assertEqual(set(response.json()["results"][0]), {"id", "risk_assessment"})
+
+    # Chart views: the ETag validator (rollup + crops versions) and one grouped rollup query
+    def test_temperature_trends_chart(self):
+        with self.assertNumQueries(3):
+            response = self.get("chart_temperature_trends")
+        self.assertEqual({dataset["crop"] for dataset in response.json()["datasets"]}, {"Wheat", "Corn"})
+        self.assertEqual(len(response.json()["labels"]), 12)
+
+    def test_predicted_yield_chart(self):
+        with self.assertNumQueries(3):
+            response = self.get("chart_predicted_yield")
+        risk_total = sum(sum(row["risk_counts"].values()) for row in response.json()["data"])
+        self.assertEqual(risk_total, 12)
+
+    # Validator (recommendations, crops, weather versions) and the points with weather and crop joined
+    def test_weather_suitability_chart(self):
+        with self.assertNumQueries(4):
+            response = self.get("chart_weather_suitability")
+        self.assertEqual(len(response.json()["data"]), 12)
+
+    def test_chart_not_modified(self):
+        etag = self.get("chart_predicted_yield")["ETag"]
+        with self.assertNumQueries(2):  # ✅ Validator only; the view body does not run
+            response = self.client.get(reverse("chart_predicted_yield"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_chart_modified_after_rollup_change(self):
+        etag = self.get("chart_predicted_yield")["ETag"]
+        self.assertEqual(self.client.get(reverse("chart_predicted_yield"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # ✅ A new recommendation updates the rollup (signals), so the cached chart is stale
+        template = Recommendation.objects.filter(user=self.user).first()
+        template.pk = None
+        template.save()
+        response = self.client.get(reverse("chart_predicted_yield"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(sum(sum(row["risk_counts"].values()) for row in response.json()["data"]), 13)
+
+        etag = response["ETag"]
+        template.delete()
+        response = self.client.get(reverse("chart_predicted_yield"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(sum(row["risk_counts"].values()) for row in response.json()["data"]), 12)
+
+    def test_crop_list_modified_after_crop_change(self):
+        etag = self.get("crop_list")["ETag"]
+        self.assertEqual(self.client.get(reverse("crop_list"), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Crop.objects.filter(name="Corn").first().save()  # ✅ updated_at moves
+        self.assertEqual(self.client.get(reverse("crop_list"), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    # ✅ Free-text risk assessments (a TextField on Recommendation) get their own rollup bucket, untruncated
+    def test_rollup_long_risk_assessment(self):
+        recommendation = Recommendation.objects.filter(user=self.user, risk_assessment="Low risk").first()
+        recommendation.risk_assessment = "Frost warning: " + "x" * 200
+        recommendation.save()
+        stats = RecommendationDailyStats.objects.filter(user=self.user)
+        self.assertEqual(stats.get(risk_assessment=recommendation.risk_assessment).count, 1)
+        self.assertEqual(sum(stats.values_list("count", flat=True)), 12)
+
+
+@override_settings(DEFAULT_FILE_STORAGE="django.core.files.storage.FileSystemStorage", CSV_CHUNK_ROWS=4)
+class CSVUploadTestCase(TestCase):
+    """
+    CSV uploads stored through `datasets.uploads` and processed by `recommendations.tasks`
+    in small chunks (`CSV_CHUNK_ROWS`), checkpointed per chunk.
+    """
+
+    HEADER = "time,crop,temperature_2m,relative_humidity_2m,wind_speed_10m,precip_30day_sum,latitude,longitude\n"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            first_name="Test", last_name="Farmer", username="farmer", email="farmer@example.com", password="pass",
+        )
+        cls.other_user = get_user_model().objects.create_user(
+            first_name="Other", last_name="Farmer", username="other", email="other@example.com", password="pass",
+        )
+        Crop.objects.create(name="Corn", min_temp=10, max_temp=35)
+        WeatherData.objects.create(
+            time=timezone.make_aware(datetime(2025, 2, 28)), location="Test Farm", latitude=31.0, longitude=-98.0,
+            temperature_2m=20, relative_humidity_2m=50, wind_speed_10m=5, precipitation=20,
+        )
+
+    def setUp(self):
+        self.enterContext(override_settings(MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())))
+
+    def csv_rows(self, count, crop=lambda i: "Corn", notes=False):
+        return "".join(
+            f"2025-03-01 {i % 24:02d}:00,{crop(i)},20,50,5,20,31.0,-98.0"
+            + (f',"row {i}\nsays ""hi"""' if notes else "") + "\n"
+            for i in range(count)
+        )
+
+    def upload(self, content, name="rows.csv", user=None):
+        streamed = stream_upload(SimpleUploadedFile(name, content.encode(), "text/csv"), f"uploads/t/{name}")
+        return register_upload(user or self.user, "recommendations", streamed, name)
+
+    def test_resume_after_crash(self):
+        upload = self.upload(self.HEADER + self.csv_rows(18))
+        commit_chunk, calls = tasks._commit_chunk, []
+
+        def crash_on_third_chunk(*args, **kwargs):
+            calls.append(args[1])
+            if len(calls) == 3:
+                raise RuntimeError("worker lost")
+            return commit_chunk(*args, **kwargs)
+
+        with mock.patch.object(tasks, "_commit_chunk", side_effect=crash_on_third_chunk):
+            with self.assertRaises(RuntimeError):
+                tasks.process_csv_upload(upload.file_key, self.user.id, upload_id=upload.id)
+        self.assertEqual(upload.chunks.count(), 2)
+
+        # ✅ Redelivery: the first two chunks are not read again, the rest are committed once
+        calls.clear()
+        with mock.patch.object(tasks, "_commit_chunk", side_effect=commit_chunk) as patched:
+            result = tasks.process_csv_upload(upload.file_key, self.user.id, upload_id=upload.id)
+        self.assertEqual([call.args[1] for call in patched.call_args_list], [8, 12, 16])
+
+        ids = result["created_recommendations"]
+        self.assertEqual(len(ids), 18)
+        self.assertEqual(len(set(ids)), 18)
+        self.assertEqual(Recommendation.objects.filter(user=self.user).count(), 18)
+        chunks = list(upload.chunks.values_list("start_row", "end_row", "start_byte", "end_byte"))
+        self.assertEqual([(start, end) for start, end, _, _ in chunks], [(0, 4), (4, 8), (8, 12), (12, 16), (16, 18)])
+        self.assertTrue(all(a[3] == b[2] for a, b in zip(chunks, chunks[1:])))
+        self.assertEqual(chunks[-1][3], upload.size)
+
+    def test_fan_out_matches_sequential(self):
+        # ✅ Multi-line quoted notes, so fixed-size cuts would land inside records; every 5th crop is unknown
+        content = self.HEADER.replace("\n", ",notes\n") + self.csv_rows(
+            23, crop=lambda i: "Kale" if i % 5 == 3 else "Corn", notes=True,
+        )
+        sequential_upload = self.upload(content)
+        sequential = tasks.process_csv_upload(sequential_upload.file_key, self.user.id, upload_id=sequential_upload.id)
+
+        fanned_out_upload = self.upload(content, user=self.other_user)
+        with self.settings(CSV_PARALLEL_MIN_BYTES=0, CSV_PARALLEL_CHUNK_BYTES=150):
+            plan, error = tasks._plan_byte_ranges(fanned_out_upload.file_key, fanned_out_upload)
+            self.assertIsNone(error)
+            self.assertGreater(len(plan["ranges"]), 5)
+            chunk_results = [
+                tasks.process_csv_chunk(
+                    fanned_out_upload.file_key, self.other_user.id, fanned_out_upload.id,
+                    start, stop, plan["columns"], plan["data_start"],
+                )
+                for start, stop in plan["ranges"]
+            ]
+        fanned_out = tasks.reduce_csv_chunks(chunk_results, fanned_out_upload.id)
+
+        def outcome(result):
+            recommendations = Recommendation.objects.in_bulk(result["created_recommendations"])
+            rows = [
+                (r.crop.name, r.predicted_soil_temp, r.predicted_yield, r.risk_assessment)
+                for r in (recommendations[pk] for pk in result["created_recommendations"])
+            ]
+            with default_storage.open(result["rejected_rows_key"]) as report:
+                return rows, result["error_count"], pd.read_csv(report)
+
+        sequential_rows, sequential_errors, sequential_report = outcome(sequential)
+        fanned_out_rows, fanned_out_errors, fanned_out_report = outcome(fanned_out)
+        self.assertEqual(len(fanned_out_rows), 19)
+        self.assertEqual(fanned_out_rows, sequential_rows)
+        self.assertEqual(fanned_out_errors, sequential_errors)
+        # ✅ Rejected rows keep their file-wide (1-based) row numbers after the chunks are renumbered
+        self.assertEqual(fanned_out_report["row"].tolist(), [4, 9, 14, 19])
+        pd.testing.assert_frame_equal(fanned_out_report, sequential_report)
+
+    def test_task_status(self):
+        upload = self.upload(self.HEADER + self.csv_rows(3))
+        upload.task_id = "task-1"
+        upload.save(update_fields=["task_id"])
+        url = reverse("task_status", args=["task-1"])
+        client = APIClient()
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_authenticate(self.other_user)
+        self.assertEqual(client.get(url).status_code, 404)  # ✅ Someone else's upload
+
+        client.force_authenticate(self.user)
+        progress = {"status": "processing", "rows_total": 3, "rows_done": 1, "errors": 0}
+        with mock.patch("recommendations.views.AsyncResult") as async_result:
+            CSVUpload.objects.filter(pk=upload.pk).update(status="processing")
+            with mock.patch("recommendations.views.get_progress", return_value=progress):
+                response = client.get(url)
+            self.assertEqual((response.json()["status"], response.json()["progress"]), ("STARTED", progress))
+
+            tasks.process_csv_upload(upload.file_key, self.user.id, upload_id=upload.id)
+            response = client.get(url)
+            self.assertEqual(response.json()["status"], "SUCCESS")
+            self.assertEqual(len(response.json()["result"]["created_recommendations"]), 3)
+        async_result.assert_not_called()  # ✅ Answered from the upload row and Redis only
+
+
+    def test_duplicate_upload_is_not_reprocessed(self):
+        first = self.upload(self.HEADER + self.csv_rows(5))
+        result = tasks.process_csv_upload(first.file_key, self.user.id, upload_id=first.id)
+        second = self.upload(self.HEADER + self.csv_rows(5), name="again.csv")
+        self.assertEqual(second.file_key, first.file_key)
+
+        duplicate = tasks.process_csv_upload(second.file_key, self.user.id, upload_id=second.id)
+        self.assertEqual(duplicate["created_recommendations"], result["created_recommendations"])
+        self.assertEqual(duplicate["duplicate_of"], first.id)
+        self.assertEqual(Recommendation.objects.filter(user=self.user).count(), 5)
+        self.assertFalse(second.chunks.exists())
+
+
+class PredictValidationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            first_name="Test", last_name="Farmer", username="farmer", email="farmer@example.com", password="pass",
+        )
+        Crop.objects.create(name="Corn", min_temp=10, max_temp=35)
+
+    def test_invalid_coordinates(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for latitude, longitude in (("north", "-98"), ("31", ""), ("95", "-98"), ("31", "-181"), ("nan", "-98")):
+            with self.subTest(latitude=latitude, longitude=longitude):
+                response = client.post(
+                    reverse("recommendation_predict"), {"crop": "Corn", "latitude": latitude, "longitude": longitude},
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["status"], "error")
@@ -18,6 +18,7 @@ from .views import (
     PredictedYieldChartDataAPIView,
     WeatherSuitabilityChartDataAPIView,
 )
+from datasets.views import SyncFeedAPIView
 
 urlpatterns = [
     # ✅ Web page for recommendations
@@ -38,6 +39,7 @@ urlpatterns = [
 
 
     # ✅ API to retrieve or delete a specific recommendation
+    path("api/recommendations/changes/", SyncFeedAPIView.as_view(feed_name="recommendations"), name="recommendation_changes"),  # ✅ Delta sync
     path("api/recommendations/<int:pk>/", RecommendationDetailAPIView.as_view(), name="recommendation_detail"),
 
 
@@ -1,4 +1,5 @@
 import os
+import json
 from django.conf import settings
 import pickle
 import dill
@@ -126,5 +127,17 @@ def get_model_version(model_name):
     return "Unknown Version"
 
 
+CSV_IMPORT_VERSION = "CSV Import v1.1"
 
 
+def get_csv_model_version():
+    """
+    Version fingerprint of the CSV import (import logic + trained models).
+    Identical uploads are only re-used while this stays the same.
+    """
+    return json.dumps({
+        "csv_import": CSV_IMPORT_VERSION,
+        "linear_regression": get_model_version("linear_regression"),
+        "decision_tree": get_model_version("decision_tree"),
+        "feature_engineering_pipeline": get_model_version("feature_engineering_pipeline"),
+    }, sort_keys=True)
@@ -8,13 +8,24 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.generics import ListAPIView
 from django.shortcuts import render
-from .models import Recommendation, Crop
+from .models import Recommendation, Crop, RecommendationDailyStats
+from .rollups import average, filtered_daily_stats
+from .exports import RECOMMENDATION_EXPORT, recommendation_export_queryset
+from datasets.exports import streaming_csv_response
+from farming_ai.pagination import KeysetPagination
+from farming_ai.serializers import requested_fields
+from farming_ai.conditional import conditional_get
+from farming_ai.renderers import FAST_RENDERER_CLASSES
+from django.utils.decorators import method_decorator
 from .utils import load_model, load_pipeline, preprocess_input_data, make_predictions, fetch_and_merge_data, get_model_version  
 from .serializers import RecommendationSerializer, RecommendationExportSerializer, CropSerializer
 import pandas as pd
 import numpy as np
-from weather.models import WeatherData
+from weather.models import WeatherData, precip_30day_sum_subquery
+from weather.utils import historical_weather_map
 from soil.models import SoilData
+from soil.spatial import find_nearest_soil
+from soil.interpolation import get_estimated_soil
 import logging
 from django.db.models import Q
 from django.utils.dateparse import parse_datetime
@@ -28,14 +39,11 @@ from celery.result import AsyncResult
 from rest_framework.generics import ListAPIView
 import csv
 from django.http import HttpResponse
-from django.db.models import Avg, Count
+from django.db.models import Count, Max, Sum
 import random
 from collections import defaultdict
-from django.db.models.functions import TruncDate
 import os
 import logging
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 
 logger = logging.getLogger(__name__)
 
@@ -149,6 +157,14 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100  # Max: 100 recommendations per page
 
 
+# ✅ Keyset Pagination on (created_at, id): no OFFSET scan, no COUNT(*)
+class RecommendationCursorPagination(KeysetPagination):
+    page_size = 10
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering_field = "created_at"
+
+
 
 @login_required
 def recommendations_page(request):
@@ -183,39 +199,42 @@ class RecommendationPredictAPIView(APIView):
             except Crop.DoesNotExist:
                 return Response({"status": "error", "message": f"Crop '{user_crop_name}' not found."}, status=400)
 
-            # 🔹 Fetch Latest Soil Data (to get coordinates)
-            latest_soil = SoilData.objects.filter(
-                soil_temp_0_to_7cm__gte=crop.min_soil_temp,
-            ).order_by("-time").first()
+            # 🔹 Pick Soil Context: nearest recent sample to the user's location (if given)
+            lat = request.data.get("latitude")
+            lon = request.data.get("longitude")
+            has_location = lat not in (None, "") or lon not in (None, "")
+            if has_location:
+                try:
+                    lat, lon = float(lat), float(lon)
+                except (TypeError, ValueError):
+                    return Response({"status": "error", "message": "Latitude and longitude must both be numbers."}, status=400)
+                if not (-90 <= lat <= 90 and -180 <= lon <= 180):  # ✅ Also rejects NaN
+                    return Response({"status": "error", "message": "Latitude must be between -90 and 90 and longitude between -180 and 180."}, status=400)
+                latest_soil = find_nearest_soil(lat, lon, max_age=timedelta(days=30))
+            else:
+                # Without a location, fall back to the latest sample suitable for the crop
+                latest_soil = SoilData.objects.filter(
+                    soil_temp_0_to_7cm__gte=crop.min_soil_temp,
+                ).order_by("-time").first()
 
             # 🚀 Handle Missing SoilData
             if not latest_soil:
                 logging.warning("⛔ No SoilData found, estimating soil temperature based on weather.")
-                lat = request.data.get("latitude")
-                lon = request.data.get("longitude")
 
-                if not lat or not lon:
+                if not has_location:
                     latest_weather_data = WeatherData.objects.order_by("-time").first()
                     if latest_weather_data:
                         lat, lon = latest_weather_data.latitude, latest_weather_data.longitude
                     else:
                         return Response({"status": "error", "message": "No SoilData or WeatherData available. Latitude and Longitude are required."}, status=400)
 
-                latest_weather = fetch_latest_weather(lat=lat, lon=lon)
-                if not latest_weather:
-                    return Response({"status": "error", "message": "Could not fetch live weather data."}, status=400)
-
-                air_temp = latest_weather["temperature_2m"]
-                estimated_soil_temp = max(0, air_temp - 3)
-                latest_soil = SoilData.objects.create(
-                    time=timezone.now(),
-                    original_location="Estimated from Weather",
-                    soil_temp_0_to_7cm=estimated_soil_temp,
-                    location="Estimated Location",
-                    latitude=lat,
-                    longitude=lon,
-                    data_source="estimated"
-                )
+                # Interpolated soil grid first (O(1) lookup); air temperature only if the grid has no estimate
+                latest_soil = get_estimated_soil(float(lat), float(lon))
+                if not latest_soil:
+                    latest_weather = fetch_latest_weather(lat=lat, lon=lon)
+                    if not latest_weather:
+                        return Response({"status": "error", "message": "Could not fetch live weather data."}, status=400)
+                    latest_soil = get_estimated_soil(float(lat), float(lon), air_temp=latest_weather["temperature_2m"])
 
             lat, lon = latest_soil.latitude, latest_soil.longitude
             latest_weather = fetch_latest_weather(lat=lat, lon=lon)
@@ -279,8 +298,8 @@ class RecommendationPredictAPIView(APIView):
                 mitigation_suggestions.append("Solution: Consider increasing irrigation to counter water stress.")
 
             # 📊 Fetch Past Trends (e.g., Last Year's Temperature)
-            one_year_ago = timezone.now() - timedelta(days=365)
-            historical_weather = WeatherData.objects.filter(latitude=lat, longitude=lon, time__date=one_year_ago.date()).first()
+            one_year_ago = timezone.localdate() - timedelta(days=365)
+            historical_weather = historical_weather_map([(lat, lon, one_year_ago)]).get((float(lat), float(lon), one_year_ago))
 
             historical_trends = [f"Last year's temperature for this period was {historical_weather.temperature_2m}°C, current temperature is {predicted_soil_temp:.1f}°C."] if historical_weather else ["No historical data available."]
 
@@ -380,12 +399,45 @@ class RecommendationPredictAPIView(APIView):
 
 
 class RecommendationListCreateAPIView(ListAPIView):
+    """
+    The user's recommendations, newest first.
+    `?cursor=` (empty for the first page) switches to keyset pagination, following the `next` links;
+    without it the page-number pagination used by the dashboard is kept.
+    `?fields=id,crop,created_at` returns only those fields.
+    """
     serializer_class = RecommendationSerializer
     pagination_class = StandardResultsSetPagination  
     permission_classes = [IsAuthenticated]
+    renderer_classes = FAST_RENDERER_CLASSES  # ✅ Large pages: orjson
+
+    # Concrete columns that are always loaded (identity and keyset position)
+    always_loaded = {"id", "created_at"}
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if "cursor" in self.request.query_params:
+                self._paginator = RecommendationCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     def get_queryset(self):
         qs = Recommendation.objects.filter(user=self.request.user)
+
+        # ✅ Load only what the serializer will render: joined relations, no unused (large JSON) columns
+        fields = requested_fields(self.request)
+        wanted = fields if fields is not None else {f.name for f in Recommendation._meta.fields}
+        related = [name for name in ("user", "crop", "weather_data") if name in wanted]
+        if related:
+            qs = qs.select_related(*related)
+        if "weather_data" in wanted:
+            qs = qs.annotate(weather_precip_30day_sum=precip_30day_sum_subquery())
+        if fields is not None:
+            deferred = [f.name for f in Recommendation._meta.concrete_fields
+                        if not f.is_relation and f.name not in fields and f.name not in self.always_loaded]
+            qs = qs.defer(*deferred)
+
         crop = self.request.query_params.get('crop')
         risk = self.request.query_params.get('risk')
         start_date = self.request.query_params.get('start_date')
@@ -430,63 +482,15 @@ class RecommendationExportAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self, request):
-        qs = Recommendation.objects.filter(user=request.user)
-        crop = request.query_params.get('crop')
-        risk = request.query_params.get('risk')
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        if crop:
-            qs = qs.filter(crop__name__iexact=crop)
-        if risk:
-            qs = qs.filter(risk_assessment__iexact=risk)
-        if start_date:
-            qs = qs.filter(created_at__gte=start_date)
-        if end_date:
-            qs = qs.filter(created_at__lte=end_date)
-        return qs.order_by('-created_at')
+        return recommendation_export_queryset(request.user, request.query_params)
 
     def get(self, request, *args, **kwargs):
-        qs = self.get_queryset(request)
-        # Create CSV response
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="recommendations_export.csv"'
-        writer = csv.writer(response)
-
-        # Write header row
-        writer.writerow([
-            "User", "Crop", "Expected Yield", "Predicted Yield", "Predicted Soil Temp",
-            "Risk Assessment", "Optimal Planting Time",
-            "Weather Summary", "Next Best Action", "AI Model Version", "Created At"
-        ])
-
-        for rec in qs:
-            user_email = rec.user.email if rec.user else ""
-            crop_name = rec.crop.name if rec.crop else "N/A"
-            expected_yield = rec.expected_yield
-            predicted_yield = rec.predicted_yield
-            predicted_soil_temp = rec.predicted_soil_temp
-            risk_assessment = rec.risk_assessment
-            optimal_planting_time = rec.optimal_planting_time
-            weather_summary = rec.weather_summary
-            next_best_action = rec.next_best_action
-
-            # Format AI model version (similar to your Admin code)
-            try:
-                versions = json.loads(rec.ai_model_version)
-                formatted_ai_model_version = " | ".join(
-                    f"{key.replace('_', ' ').title()}: {value}" for key, value in versions.items()
-                )
-            except (json.JSONDecodeError, TypeError):
-                formatted_ai_model_version = rec.ai_model_version
-
-            created_at = rec.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            writer.writerow([
-                user_email, crop_name, expected_yield, predicted_yield, predicted_soil_temp,
-                risk_assessment, optimal_planting_time,
-                weather_summary, next_best_action, formatted_ai_model_version, created_at
-            ])
-
-        return response
+        try:
+            qs = self.get_queryset(request)
+        except ValueError as e:
+            return Response({"status": "error", "message": str(e)}, status=400)
+        # ✅ Streamed row by row from a chunked cursor; memory stays flat for any export size
+        return streaming_csv_response(RECOMMENDATION_EXPORT, qs)
 
 
 # CSV Export Preview Endpoint (returns JSON preview data, e.g., first 10 records)
@@ -494,23 +498,13 @@ class RecommendationExportPreviewAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self, request):
-        qs = Recommendation.objects.filter(user=request.user)
-        crop = request.query_params.get('crop')
-        risk = request.query_params.get('risk')
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        if crop:
-            qs = qs.filter(crop__name__iexact=crop)
-        if risk:
-            qs = qs.filter(risk_assessment__iexact=risk)
-        if start_date:
-            qs = qs.filter(created_at__gte=start_date)
-        if end_date:
-            qs = qs.filter(created_at__lte=end_date)
-        return qs.order_by('-created_at')
+        return recommendation_export_queryset(request.user, request.query_params)
 
     def get(self, request, *args, **kwargs):
-        qs = self.get_queryset(request)
+        try:
+            qs = self.get_queryset(request).select_related('user', 'crop')
+        except ValueError as e:
+            return Response({"status": "error", "message": str(e)}, status=400)
         preview_qs = qs[:10]  # Limit preview to 10 records
         serializer = RecommendationExportSerializer(preview_qs, many=True)
         return Response(serializer.data, status=200)
@@ -530,6 +524,11 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from recommendations.tasks import process_csv_upload
+from datasets.uploads import stream_upload
+from datasets.utils import register_upload
+from datasets.models import CSVUpload
+from datasets.progress import get_progress
+from recommendations.utils import get_csv_model_version
 
 class FileUploadAPIView(APIView):
     permission_classes = [IsAuthenticated]
@@ -549,14 +548,17 @@ class FileUploadAPIView(APIView):
         upload_dir = os.path.join("uploads", today_str, username)
         file_path = os.path.join(upload_dir, file_obj.name)
 
-        # ✅ Save file using Django’s default storage (Cloudflare R2)
-        saved_file_name = default_storage.save(file_path, ContentFile(file_obj.read()))
-        file_url = default_storage.url(saved_file_name)  # ✅ Get public Cloudflare R2 URL
+        # ✅ Stream the upload to Cloudflare R2 (multipart) instead of reading it into memory
+        streamed = stream_upload(file_obj, file_path)
+        upload = register_upload(request.user, "recommendations", streamed, file_obj.name, model_version=get_csv_model_version())
+        file_url = upload.file_url  # ✅ Get public Cloudflare R2 URL
 
-        logger.info(f"✅ File {file_obj.name} uploaded to Cloudflare R2: {file_url}")
+        logger.info(f"✅ File {file_obj.name} uploaded to Cloudflare R2: {file_url} (sha256 {upload.sha256[:12]}…)")
 
-        # ✅ Trigger Async Celery Task
-        task = process_csv_upload.delay(file_url, request.user.id)  # ✅ Pass URL instead of file path
+        # ✅ Trigger Async Celery Task (short-circuits if this content was already processed)
+        task = process_csv_upload.delay(file_url, request.user.id, upload_id=upload.id)  # ✅ Pass URL instead of file path
+        upload.task_id = task.id
+        upload.save(update_fields=["task_id"])
 
         return Response({
             "message": "CSV processing started asynchronously.",
@@ -566,40 +568,79 @@ class FileUploadAPIView(APIView):
 
 
 
-from django.views.decorators.csrf import csrf_exempt
-from django.utils.decorators import method_decorator
-
-from rest_framework.permissions import AllowAny
-
-@method_decorator(csrf_exempt, name='dispatch')  # ✅ Exempt from CSRF
 class TaskStatusAPIView(APIView):
-    permission_classes = [AllowAny]  # ✅ Allow access without authentication
+    """
+    Status of one of the user's CSV upload tasks, polled by the upload page.
+    The upload row and its progress in Redis (rows done, errors, ETA; see datasets.progress) answer
+    every poll; the Celery result backend is only asked before any progress has been recorded.
+    """
+    permission_classes = [IsAuthenticated]
 
     def get(self, request, task_id, *args, **kwargs):
-        task = AsyncResult(task_id)
-        response_data = {
-            "task_id": task_id,
-            "status": task.status,
-            "result": task.result if task.successful() else None,
-        }
-        return Response(response_data)
+        upload = CSVUpload.objects.filter(task_id=task_id, user=request.user).only("id", "status", "result").first()
+        if upload is None:
+            return Response({"status": "error", "message": "Task not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        progress = get_progress(upload.id)
+        if upload.status == "completed":
+            task_status, result = "SUCCESS", upload.result
+        elif upload.status == "failed":
+            task_status, result = "FAILURE", None
+        elif progress:
+            task_status, result = "STARTED", None
+        else:
+            # ✅ Still queued (or Redis unavailable): the result backend knows whether the task failed early
+            task = AsyncResult(task_id)
+            task_status, result = task.status, (task.result if task.successful() else None)
+        return Response({"task_id": task_id, "status": task_status, "result": result, "progress": progress})
+
+
 
 
 
+# ✅ Validators for conditional GET: one small aggregate each, no payload built
+def daily_stats_version(request, *args, **kwargs):
+    """Version of the user's recommendation rollup (every rollup change sets `updated_at`)."""
+    return tuple(RecommendationDailyStats.objects.filter(user=request.user).aggregate(
+        updated=Max('updated_at'), buckets=Count('id'), total=Sum('count'),
+    ).values())
+
+
+def crops_version(request, *args, **kwargs):
+    return tuple(Crop.objects.aggregate(updated=Max('updated_at'), count=Count('id')).values())
+
+
+def chart_stats_version(request, *args, **kwargs):
+    """Rollup charts also show crop names and optimal ranges."""
+    return daily_stats_version(request) + crops_version(request)
+
+
+def weather_suitability_version(request, *args, **kwargs):
+    recommendations = tuple(Recommendation.objects.filter(user=request.user).aggregate(
+        updated=Max('updated_at'), count=Count('id'),
+    ).values())
+    weather = WeatherData.objects.aggregate(updated=Max('last_updated'))['updated']
+    return recommendations + crops_version(request) + (weather,)
 
 
 class RecommendationSummaryAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(conditional_get(daily_stats_version))
     def get(self, request):
-        qs = Recommendation.objects.filter(user=request.user)
-        total = qs.count()
-        avg_yield = qs.aggregate(avg_yield=Avg('predicted_yield'))['avg_yield']
-        low_risk = qs.filter(risk_assessment="Low risk").count()
-        medium_risk = qs.filter(risk_assessment="Medium risk").count()
-        high_risk = qs.filter(risk_assessment="High risk").count()
-        latest_rec = qs.order_by('-created_at').first()
-        latest_date = latest_rec.created_at.strftime('%Y-%m-%d') if latest_rec else "--"
+        # ✅ One query over the daily rollup (conditional sums instead of a count() per risk level)
+        stats = RecommendationDailyStats.objects.filter(user=request.user).aggregate(
+            total=Sum('count', default=0),
+            yield_sum=Sum('predicted_yield_sum'),
+            yield_count=Sum('predicted_yield_count'),
+            low_risk=Sum('count', filter=Q(risk_assessment="Low risk"), default=0),
+            medium_risk=Sum('count', filter=Q(risk_assessment="Medium risk"), default=0),
+            high_risk=Sum('count', filter=Q(risk_assessment="High risk"), default=0),
+            latest=Max('date'),
+        )
+        total, avg_yield = stats['total'], average(stats['yield_sum'], stats['yield_count'])
+        low_risk, medium_risk, high_risk = stats['low_risk'], stats['medium_risk'], stats['high_risk']
+        latest_date = stats['latest'].strftime('%Y-%m-%d') if stats['latest'] else "--"
 
         # Compute percentages
         low_pct = (low_risk / total * 100) if total > 0 else 0
@@ -655,6 +696,7 @@ class CropListAPIView(ListAPIView):
     permission_classes = [IsAuthenticated]
 
 
+    @method_decorator(conditional_get(crops_version))
     def get(self, request, *args, **kwargs):
         crops = Crop.objects.values_list("name", flat=True)  # Get crop names
         crop_colors = self.generate_crop_colors(crops)
@@ -691,46 +733,38 @@ class TemperatureTrendsChartDataAPIView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(conditional_get(chart_stats_version))
     def get(self, request):
-        qs = Recommendation.objects.filter(user=request.user)
-        # Optional filtering similar to your list view
-        crop = request.query_params.get('crop')
-        risk = request.query_params.get('risk')
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        if crop:
-            qs = qs.filter(crop__name__iexact=crop)
-        if risk:
-            qs = qs.filter(risk_assessment__iexact=risk)
-        if start_date:
-            qs = qs.filter(created_at__gte=start_date)
-        if end_date:
-            qs = qs.filter(created_at__lte=end_date)
+        # ✅ Read from the daily rollup instead of scanning the user's whole history
+        qs = filtered_daily_stats(
+            request.user,
+            crop=request.query_params.get('crop'),
+            risk=request.query_params.get('risk'),
+            start_date=request.query_params.get('start_date'),
+            end_date=request.query_params.get('end_date'),
+        )
         
-        # Group by crop and by day (using TruncDate on created_at)
-        qs = qs.annotate(date=TruncDate('created_at')).values('crop__name', 'date') \
-               .annotate(avg_soil_temp=Avg('predicted_soil_temp')) \
+        # Group by crop and by day; the crop's optimal range comes from the same join
+        qs = qs.values('crop__name', 'crop__min_soil_temp', 'crop__max_temp', 'date') \
+               .annotate(soil_temp_sum=Sum('soil_temp_sum'), soil_temp_count=Sum('soil_temp_count')) \
                .order_by('date')
         
         # Organize data by crop
         data_by_crop = defaultdict(dict)
+        optimal_by_crop = {}
         all_dates = set()
         for entry in qs:
             crop_name = entry['crop__name']
             date_str = entry['date'].strftime("%Y-%m-%d")
             all_dates.add(date_str)
-            data_by_crop[crop_name][date_str] = round(entry['avg_soil_temp'], 2) if entry['avg_soil_temp'] is not None else None
+            avg_soil_temp = average(entry['soil_temp_sum'], entry['soil_temp_count'])
+            data_by_crop[crop_name][date_str] = round(avg_soil_temp, 2) if avg_soil_temp is not None else None
+            optimal_by_crop[crop_name] = (entry['crop__min_soil_temp'], entry['crop__max_temp'])
 
         sorted_dates = sorted(list(all_dates))
         datasets = []
         for crop_name, temp_data in data_by_crop.items():
-            # Fetch optimal values from Crop model
-            try:
-                crop_obj = Crop.objects.get(name__iexact=crop_name)
-                optimal_min = crop_obj.min_soil_temp
-                optimal_max = crop_obj.max_temp  # or whichever field holds the optimal high temperature
-            except Crop.DoesNotExist:
-                optimal_min, optimal_max = None, None
+            optimal_min, optimal_max = optimal_by_crop[crop_name]
             # Build the data array for each date (fill missing with None)
             data_array = [temp_data.get(date, None) for date in sorted_dates]
             datasets.append({
@@ -765,36 +799,37 @@ class PredictedYieldChartDataAPIView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(conditional_get(chart_stats_version))
     def get(self, request):
-        qs = Recommendation.objects.filter(user=request.user)
-        crop = request.query_params.get('crop')
-        risk = request.query_params.get('risk')
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        if crop:
-            qs = qs.filter(crop__name__iexact=crop)
-        if risk:
-            qs = qs.filter(risk_assessment__iexact=risk)
-        if start_date:
-            qs = qs.filter(created_at__gte=start_date)
-        if end_date:
-            qs = qs.filter(created_at__lte=end_date)
+        # ✅ Read from the daily rollup instead of scanning the user's whole history
+        qs = filtered_daily_stats(
+            request.user,
+            crop=request.query_params.get('crop'),
+            risk=request.query_params.get('risk'),
+            start_date=request.query_params.get('start_date'),
+            end_date=request.query_params.get('end_date'),
+        )
         
+        # ✅ Risk levels are counted in the same grouped query (conditional aggregation)
         qs_grouped = qs.values('crop__name').annotate(
-            avg_predicted_yield=Avg('predicted_yield'),
-            avg_expected_yield=Avg('expected_yield'),
-            count=Count('id')
-        )
+            predicted_yield_sum=Sum('predicted_yield_sum'),
+            predicted_yield_count=Sum('predicted_yield_count'),
+            expected_yield_sum=Sum('expected_yield_sum'),
+            expected_yield_count=Sum('expected_yield_count'),
+            low_risk=Sum('count', filter=Q(risk_assessment="Low risk"), default=0),
+            medium_risk=Sum('count', filter=Q(risk_assessment="Medium risk"), default=0),
+            high_risk=Sum('count', filter=Q(risk_assessment="High risk"), default=0),
+        ).order_by('crop__name')
 
-        # Also count risk levels per crop
         data = []
         for group in qs_grouped:
             crop_name = group['crop__name']
-            sub_qs = qs.filter(crop__name__iexact=crop_name)
+            group['avg_predicted_yield'] = average(group['predicted_yield_sum'], group['predicted_yield_count'])
+            group['avg_expected_yield'] = average(group['expected_yield_sum'], group['expected_yield_count'])
             risk_counts = {
-                "Low risk": sub_qs.filter(risk_assessment="Low risk").count(),
-                "Medium risk": sub_qs.filter(risk_assessment="Medium risk").count(),
-                "High risk": sub_qs.filter(risk_assessment="High risk").count()
+                "Low risk": group['low_risk'],
+                "Medium risk": group['medium_risk'],
+                "High risk": group['high_risk']
             }
             data.append({
                 "crop": crop_name,
@@ -818,7 +853,9 @@ class WeatherSuitabilityChartDataAPIView(APIView):
     Query params (optional): crop, risk, start_date, end_date
     """
     permission_classes = [IsAuthenticated]
+    renderer_classes = FAST_RENDERER_CLASSES  # ✅ One point per recommendation: orjson
 
+    @method_decorator(conditional_get(weather_suitability_version))
     def get(self, request):
         qs = Recommendation.objects.filter(user=request.user).select_related('weather_data', 'crop')
         crop = request.query_params.get('crop')
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.http import HttpResponse
 import csv
-from .models import SoilData
+from .models import SoilData, SoilDataRollup
 
 @admin.register(SoilData)
 class SoilDataAdmin(admin.ModelAdmin):
@@ -64,3 +64,12 @@ class SoilDataAdmin(admin.ModelAdmin):
         return response
 
     export_as_csv.short_description = "Export Selected to CSV"
+
+
+
+@admin.register(SoilDataRollup)
+class SoilDataRollupAdmin(admin.ModelAdmin):
+    list_display = ('location', 'resolution', 'metric', 'bucket', 'min_value', 'max_value', 'mean_value', 'count', 'last_updated')
+    list_filter = ('resolution', 'metric')
+    search_fields = ('location',)
+    ordering = ('-bucket',)
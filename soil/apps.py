@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class SoilConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'soil'
+
+    def ready(self):
+        import soil.exports
+        import soil.sync
+        import soil.signals
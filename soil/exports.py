@@ -0,0 +1,37 @@
+from django.db.models import Q
+from datasets.exports import ExportDataset, date_range_lookups, register_export
+from .models import SoilData
+
+
+def soil_export_queryset(user, params):
+    """
+    Soil data with the export filters (location, start_date, end_date, data_source).
+    Dates become a range on the `time` column. Raises ValueError for invalid dates.
+    """
+    location = (params.get("location") or "").strip()
+    data_source = (params.get("data_source") or "").strip()
+
+    soil_data = SoilData.objects.filter(**date_range_lookups("time", params))
+    if location:
+        soil_data = soil_data.filter(Q(location__iexact=location) | Q(original_location__iexact=location))
+    if data_source:
+        soil_data = soil_data.filter(data_source=data_source)
+    return soil_data
+
+def _format_soil_row(row):
+    time, location, original_location, *values = row
+    return [time, location or original_location or "Unknown", *values]
+
+
+SOIL_EXPORT = register_export(ExportDataset(
+    name="soil",
+    headers=["Time", "Location", "Soil Temp (0-7cm)", "Soil Temp (7-28cm)", "Moisture", "pH Level",
+             "Nitrogen", "Phosphorus", "Potassium", "Latitude", "Longitude", "Data Source"],
+    fields=["time", "location", "original_location", "soil_temp_0_to_7cm", "soil_temp_7_to_28cm", "moisture",
+            "ph_level", "nitrogen", "phosphorus", "potassium", "latitude", "longitude", "data_source"],
+    queryset=soil_export_queryset,
+    format_row=_format_soil_row,
+    filename="soil_data_filtered.csv",
+    filters=["location", "start_date", "end_date", "data_source"],
+    types=["datetime", "string", "float", "float", "float", "float", "float", "float", "float", "float", "float", "string"],
+))
@@ -0,0 +1,269 @@
+import json
+import logging
+import math
+import os
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from sklearn.neighbors import BallTree
+
+from .models import SoilData
+from .spatial import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# ✅ Soil properties kept as interpolated rasters
+GRID_PROPERTIES = ["ph_level", "moisture", "nitrogen", "phosphorus", "potassium", "soil_temp_0_to_7cm"]
+
+GRID_RESOLUTION_DEG = getattr(settings, "SOIL_GRID_RESOLUTION_DEG", 0.25)
+GRID_RADIUS_KM = getattr(settings, "SOIL_GRID_RADIUS_KM", 100)  # Samples further away do not contribute to a cell
+GRID_WINDOW_DAYS = getattr(settings, "SOIL_GRID_WINDOW_DAYS", 180)  # Only recent samples are interpolated
+GRID_FULL_REBUILD_DAYS = getattr(settings, "SOIL_GRID_FULL_REBUILD_DAYS", 7)  # Catches deleted / edited samples
+IDW_POWER = 2
+TILE_CELLS = 20  # ✅ Tiles are TILE_CELLS x TILE_CELLS grid cells (5° x 5° at 0.25°)
+
+GRID_ROWS = int(round(180 / GRID_RESOLUTION_DEG))
+GRID_COLS = int(round(360 / GRID_RESOLUTION_DEG))
+
+_grids = {}  # Read-only memory maps, opened lazily per process
+
+
+def _grid_dir():
+    return getattr(settings, "SOIL_GRID_DIR", os.path.join(settings.BASE_DIR, "soil_grid"))
+
+
+def _grid_path(prop):
+    return os.path.join(_grid_dir(), f"{prop}.npy")
+
+
+def _meta_path():
+    return os.path.join(_grid_dir(), "meta.json")
+
+
+def grid_cell(latitude, longitude):
+    """Return the (row, col) of the grid cell containing a coordinate."""
+    row = int((float(latitude) + 90) / GRID_RESOLUTION_DEG)
+    col = int((float(longitude) + 180) / GRID_RESOLUTION_DEG)
+    return min(max(row, 0), GRID_ROWS - 1), min(max(col, 0), GRID_COLS - 1)
+
+
+def _open_grid(prop):
+    """Open (once per process) the memory-mapped raster of one property; None if it was never built."""
+    grid = _grids.get(prop)
+    if grid is None and os.path.exists(_grid_path(prop)):
+        grid = _grids[prop] = np.load(_grid_path(prop), mmap_mode="r")
+    return grid
+
+
+def estimate_soil_properties(latitude, longitude):
+    """
+    O(1) lookup of the interpolated soil properties at a coordinate.
+    Returns a dict of property -> value (None where no samples were close enough),
+    or None when nothing could be estimated at all.
+    """
+    row, col = grid_cell(latitude, longitude)
+    estimate = {}
+    for prop in GRID_PROPERTIES:
+        grid = _open_grid(prop)
+        value = float(grid[row, col]) if grid is not None else math.nan
+        estimate[prop] = None if math.isnan(value) else round(value, 2)
+    if all(value is None for value in estimate.values()):
+        return None
+    return estimate
+
+
+def get_estimated_soil(latitude, longitude, air_temp=None):
+    """
+    Return an "estimated" SoilData row for a location, creating at most one per grid cell per day.
+
+    Values come from the interpolation grid; when the grid has no soil temperature for the cell,
+    it is approximated from the air temperature (`air_temp - 3`). Returns None when neither is available.
+    """
+    estimate = estimate_soil_properties(latitude, longitude) or {}
+    soil_temp = estimate.get("soil_temp_0_to_7cm")
+    if soil_temp is None:
+        if air_temp is None:
+            return None
+        soil_temp = max(0, air_temp - 3)
+
+    row, col = grid_cell(latitude, longitude)
+    day = datetime.combine(timezone.now().date(), dt_time.min, tzinfo=dt_timezone.utc)
+    cell_location = f"grid:{row}:{col}"
+
+    # ✅ Backed by a unique constraint: concurrent callers for the same cell and day share one row
+    soil_data, _ = SoilData.objects.get_or_create(
+        data_source="estimated", location=cell_location, time=day,
+        defaults={
+            "original_location": "Estimated from Grid" if estimate else "Estimated from Weather",
+            "soil_temp_0_to_7cm": soil_temp,
+            "moisture": estimate.get("moisture"),
+            "ph_level": estimate.get("ph_level"),
+            "nitrogen": estimate.get("nitrogen"),
+            "phosphorus": estimate.get("phosphorus"),
+            "potassium": estimate.get("potassium"),
+            "latitude": latitude,
+            "longitude": longitude,
+        },
+    )
+    return soil_data
+
+
+def tiles_for_coordinates(coordinates):
+    """
+    Return the set of (tile_row, tile_col) tiles whose cells may be influenced by samples at `coordinates`
+    (any tile within GRID_RADIUS_KM of a sample).
+    """
+    margin_lat = GRID_RADIUS_KM / 111.0
+    tiles = set()
+    for latitude, longitude in coordinates:
+        margin_lon = margin_lat / max(math.cos(math.radians(latitude)), 0.01)
+        row_min, col_min = grid_cell(latitude - margin_lat, longitude - margin_lon)
+        row_max, col_max = grid_cell(latitude + margin_lat, longitude + margin_lon)
+        for tile_row in range(row_min // TILE_CELLS, row_max // TILE_CELLS + 1):
+            for tile_col in range(col_min // TILE_CELLS, col_max // TILE_CELLS + 1):
+                tiles.add((tile_row, tile_col))
+    return tiles
+
+
+def _writable_grids():
+    """Open every raster for in-place writes, creating NaN-filled files on first use."""
+    os.makedirs(_grid_dir(), exist_ok=True)
+    grids = {}
+    for prop in GRID_PROPERTIES:
+        path = _grid_path(prop)
+        if os.path.exists(path):
+            grids[prop] = np.load(path, mmap_mode="r+")
+        else:
+            grids[prop] = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(GRID_ROWS, GRID_COLS))
+            grids[prop][:] = np.nan
+    return grids
+
+
+def _idw(tree, values, cell_points):
+    """Inverse-distance-weighted estimate for each cell centre (NaN where no sample is within range)."""
+    indices, distances = tree.query_radius(cell_points, r=GRID_RADIUS_KM / EARTH_RADIUS_KM, return_distance=True)
+    result = np.full(len(cell_points), np.nan, dtype=np.float32)
+    for i, (idx, dist) in enumerate(zip(indices, distances)):
+        if not len(idx):
+            continue
+        dist_km = dist * EARTH_RADIUS_KM
+        if dist_km.min() < 1e-3:
+            result[i] = values[idx[np.argmin(dist_km)]]  # ✅ A sample sits on the cell centre
+        else:
+            weights = 1.0 / dist_km ** IDW_POWER
+            result[i] = np.dot(weights, values[idx]) / weights.sum()
+    return result
+
+
+def populated_tiles():
+    """Tiles that currently hold interpolated values in any property raster."""
+    tiles = set()
+    for prop in GRID_PROPERTIES:
+        grid = _open_grid(prop)
+        if grid is None:
+            continue
+        rows, cols = np.nonzero(np.isfinite(grid))
+        cells = np.unique((rows // TILE_CELLS) * GRID_COLS + cols // TILE_CELLS)
+        tiles.update((int(cell // GRID_COLS), int(cell % GRID_COLS)) for cell in cells)
+    return tiles
+
+
+def _grid_samples():
+    return SoilData.objects.exclude(data_source="estimated").exclude(latitude=0.0, longitude=0.0)
+
+
+def rebuild_tiles(tiles, cutoff=None):
+    """
+    Recompute the given tiles of every property raster from samples newer than `cutoff`
+    (default: the last GRID_WINDOW_DAYS) by IDW interpolation.
+    Rasters are updated in place, so readers holding a memory map see the new values.
+    """
+    grids = _writable_grids()
+    cutoff = cutoff or timezone.now() - timedelta(days=GRID_WINDOW_DAYS)
+    margin_lat = GRID_RADIUS_KM / 111.0
+
+    for tile_row, tile_col in sorted(tiles):
+        row_start, col_start = tile_row * TILE_CELLS, tile_col * TILE_CELLS
+        row_stop, col_stop = min(row_start + TILE_CELLS, GRID_ROWS), min(col_start + TILE_CELLS, GRID_COLS)
+        if row_start >= GRID_ROWS or col_start >= GRID_COLS:
+            continue
+
+        # Cell centres of the tile (degrees)
+        lats = -90 + (np.arange(row_start, row_stop) + 0.5) * GRID_RESOLUTION_DEG
+        lons = -180 + (np.arange(col_start, col_stop) + 0.5) * GRID_RESOLUTION_DEG
+        lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+        cell_points = np.radians(np.column_stack([lat_grid.ravel(), lon_grid.ravel()]))
+
+        # Candidate samples: bounding box of the tile widened by the search radius
+        margin_lon = margin_lat / max(math.cos(math.radians(max(abs(lats[0]), abs(lats[-1])))), 0.01)
+        samples = list(
+            _grid_samples().filter(
+                time__gte=cutoff,
+                latitude__gte=lats[0] - margin_lat, latitude__lte=lats[-1] + margin_lat,
+                longitude__gte=lons[0] - margin_lon, longitude__lte=lons[-1] + margin_lon,
+            ).values_list("latitude", "longitude", *GRID_PROPERTIES)
+        )
+
+        for prop_index, prop in enumerate(GRID_PROPERTIES):
+            points = [(s[0], s[1], s[2 + prop_index]) for s in samples if s[2 + prop_index] is not None]
+            if not points:
+                grids[prop][row_start:row_stop, col_start:col_stop] = np.nan
+                continue
+            coords = np.radians(np.array([(p[0], p[1]) for p in points], dtype=np.float64))
+            values = np.array([p[2] for p in points], dtype=np.float64)
+            tile_values = _idw(BallTree(coords, metric="haversine"), values, cell_points)
+            grids[prop][row_start:row_stop, col_start:col_stop] = tile_values.reshape(lat_grid.shape)
+
+    for grid in grids.values():
+        grid.flush()
+    logger.info(f"✅ Rebuilt {len(tiles)} soil grid tiles.")
+    return len(tiles)
+
+
+def refresh_soil_grid():
+    """
+    Rebuild the tiles whose samples changed since the last run (state kept in meta.json):
+    - tiles near samples added since then (primary-key watermark; the first run is a full build),
+    - tiles near samples that have since aged out of the GRID_WINDOW_DAYS window, so a tile whose
+      samples all expired is cleared instead of serving old estimates,
+    - every populated or sampled tile once every GRID_FULL_REBUILD_DAYS, which also folds in
+      deleted and edited samples (neither moves the watermark).
+    """
+    meta = {}
+    if os.path.exists(_meta_path()):
+        with open(_meta_path()) as f:
+            meta = json.load(f)
+    now = timezone.now()
+    cutoff = now - timedelta(days=GRID_WINDOW_DAYS)
+    last_id = meta.get("max_id", 0)
+    max_id = SoilData.objects.aggregate(max_id=Max("id"))["max_id"] or 0
+    previous_cutoff = parse_datetime(meta["window_start"]) if meta.get("window_start") else None
+    last_full = parse_datetime(meta["full_rebuild_at"]) if meta.get("full_rebuild_at") else None
+
+    coordinates = []
+    if max_id > last_id:
+        coordinates += _grid_samples().filter(id__gt=last_id, id__lte=max_id).values_list("latitude", "longitude")
+    if previous_cutoff is not None and previous_cutoff < cutoff:
+        coordinates += _grid_samples().filter(time__gte=previous_cutoff, time__lt=cutoff).values_list("latitude", "longitude")
+
+    full_rebuild = last_full is None or now - last_full >= timedelta(days=GRID_FULL_REBUILD_DAYS)
+    if full_rebuild:
+        coordinates += _grid_samples().filter(time__gte=cutoff).values_list("latitude", "longitude").distinct()
+    tiles = tiles_for_coordinates(set(coordinates))
+    if full_rebuild:
+        tiles |= populated_tiles()
+    rebuilt = rebuild_tiles(tiles, cutoff) if tiles else 0
+
+    os.makedirs(_grid_dir(), exist_ok=True)
+    with open(_meta_path(), "w") as f:
+        json.dump({
+            "max_id": max_id,
+            "window_start": cutoff.isoformat(),
+            "full_rebuild_at": now.isoformat() if full_rebuild else meta.get("full_rebuild_at"),
+            "updated_at": now.isoformat(),
+        }, f)
+    return rebuilt
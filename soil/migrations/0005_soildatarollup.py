@@ -0,0 +1,35 @@
+# Generated by Django 5.0.11 on 2026-10-19 15:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soil', '0004_soildata_sensor_id_soildata_sensor_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SoilDataRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=100)),
+                ('resolution', models.CharField(choices=[('hour', 'Hourly'), ('day', 'Daily')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('metric', models.CharField(max_length=30)),
+                ('min_value', models.FloatField(blank=True, null=True)),
+                ('max_value', models.FloatField(blank=True, null=True)),
+                ('mean_value', models.FloatField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['bucket'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='soildatarollup',
+            constraint=models.UniqueConstraint(fields=('location', 'resolution', 'metric', 'bucket'), name='unique_soil_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.11 on 2026-10-19 15:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soil', '0005_soildatarollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='soildata',
+            index=models.Index(fields=['last_updated', 'id'], name='soildata_sync_idx'),
+        ),
+    ]
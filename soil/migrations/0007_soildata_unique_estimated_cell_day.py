@@ -0,0 +1,42 @@
+# Generated by Django 5.0.11 on 2026-10-19 16:47
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_estimates(apps, schema_editor):
+    """Fold estimates created twice for the same grid cell and day into the first one before the constraint."""
+    SoilData = apps.get_model("soil", "SoilData")
+    Recommendation = apps.get_model("recommendations", "Recommendation")
+    duplicates = (
+        SoilData.objects.filter(data_source="estimated")
+        .values("location", "time")
+        .annotate(rows=Count("id"), keep=Min("id"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in duplicates:
+        extra = SoilData.objects.filter(
+            data_source="estimated", location=group["location"], time=group["time"],
+        ).exclude(id=group["keep"])
+        # ✅ Recommendations cascade on delete, so they move to the kept estimate first
+        Recommendation.objects.filter(soil_data__in=extra).update(soil_data_id=group["keep"])
+        extra.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('soil', '0006_soildata_soildata_sync_idx'),
+        ('recommendations', '0015_recommendationdailystats_risk_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_estimates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='soildata',
+            constraint=models.UniqueConstraint(condition=models.Q(('data_source', 'estimated')), fields=('location', 'time'), name='unique_estimated_soil_cell_day'),
+        ),
+    ]
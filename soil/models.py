@@ -54,7 +54,46 @@ class SoilData(models.Model):
             models.Index(fields=['user']),  # ✅ Faster filtering by user
             models.Index(fields=['sensor_type']),  # ✅ Faster filtering by sensor type
             models.Index(fields=['sensor_id']),  # ✅ Faster filtering by sensor ID
+            models.Index(fields=['last_updated', 'id'], name='soildata_sync_idx'),  # ✅ Change feed and rollup refresh
+        ]
+        constraints = [
+            # ✅ One estimate per grid cell and day (see soil.interpolation.get_estimated_soil)
+            models.UniqueConstraint(
+                fields=['location', 'time'], condition=models.Q(data_source='estimated'), name='unique_estimated_soil_cell_day',
+            ),
         ]
     
     def __str__(self):
         return f"Soil Data at {self.time} for {self.original_location or self.location}"
+
+
+class SoilDataRollup(models.Model):
+    """
+    Pre-aggregated soil metrics (min / max / mean / count) per location, time bucket and metric.
+    Kept up to date incrementally by `soil.rollups.refresh_soil_rollups`; deletions and moved readings rebuild their old buckets (soil.signals).
+    """
+    RESOLUTION_CHOICES = [
+        ("hour", "Hourly"),
+        ("day", "Daily"),
+    ]
+
+    location = models.CharField(max_length=100)
+    resolution = models.CharField(max_length=10, choices=RESOLUTION_CHOICES)
+    bucket = models.DateTimeField()  # ✅ Start of the time bucket (UTC)
+    metric = models.CharField(max_length=30)  # ✅ SoilData field name, e.g. "moisture"
+
+    min_value = models.FloatField(null=True, blank=True)
+    max_value = models.FloatField(null=True, blank=True)
+    mean_value = models.FloatField(null=True, blank=True)
+    count = models.PositiveIntegerField(default=0)
+
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['location', 'resolution', 'metric', 'bucket'], name='unique_soil_rollup_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} ({self.resolution}) at {self.bucket} for {self.location}"
@@ -0,0 +1,162 @@
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import SoilData, SoilDataRollup
+
+logger = logging.getLogger(__name__)
+
+# ✅ Supported resolutions, ordered from finest to coarsest
+ROLLUP_RESOLUTIONS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# ✅ SoilData fields that are aggregated into the rollup table
+ROLLUP_METRICS = [
+    "soil_temp_0_to_7cm",
+    "soil_temp_7_to_28cm",
+    "moisture",
+    "ph_level",
+    "nitrogen",
+    "phosphorus",
+    "potassium",
+]
+
+BUCKET_BATCH = 200  # ✅ (location, bucket) pairs recomputed per query
+
+
+def bucket_start(value, resolution):
+    """
+    Truncate a datetime to the start of its bucket (UTC) for the given resolution.
+    """
+    value = value.astimezone(dt_timezone.utc)
+    if resolution == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unsupported rollup resolution: {resolution}")
+
+
+def choose_resolution(start, end, max_points):
+    """
+    Pick the finest resolution whose bucket count over [start, end) fits within `max_points`.
+    Falls back to the coarsest resolution when none of them fit.
+    """
+    span = end - start
+    for resolution, step in ROLLUP_RESOLUTIONS.items():
+        if span / step <= max_points:
+            return resolution
+    return list(ROLLUP_RESOLUTIONS)[-1]
+
+
+def refresh_soil_rollups(resolution, updated_since=None, since=None):
+    """
+    Recompute rollup buckets for one resolution.
+
+    - `since`: recompute every bucket from this time onwards (full backfill when both arguments are None).
+    - `updated_since`: only recompute the (location, bucket) pairs holding SoilData rows written after
+      this time. This keeps the periodic refresh incremental: normally that is just the newest bucket,
+      and late CSV uploads of historical readings only cost their own buckets.
+
+    Returns the number of rollup rows written.
+    """
+    if updated_since is not None:
+        touched = (
+            SoilData.objects.filter(last_updated__gte=updated_since)
+            .annotate(bucket=Trunc("time", resolution, tzinfo=dt_timezone.utc))
+            .values_list("location", "bucket")
+            .distinct()
+            .order_by()
+        )
+        written = _rebuild_buckets(resolution, touched)
+    else:
+        soil_data = SoilData.objects.all()
+        if since is not None:
+            soil_data = soil_data.filter(time__gte=bucket_start(since, resolution))
+        written = _write_rollups(soil_data, resolution)
+    logger.info(f"✅ Refreshed {written} soil rollup rows at '{resolution}' resolution.")
+    return written
+
+
+def _rebuild_buckets(resolution, buckets):
+    """
+    Recompute the given (location, bucket start) pairs of one resolution from the current SoilData rows,
+    reading only the rows inside those buckets. The buckets are replaced, so metrics (or whole buckets)
+    left without readings are removed. Returns the number of rollup rows written.
+    """
+    step = ROLLUP_RESOLUTIONS[resolution]
+    buckets = sorted(set(buckets))
+    written = 0
+    for i in range(0, len(buckets), BUCKET_BATCH):
+        in_rollup, in_data = Q(), Q()
+        for location, start in buckets[i:i + BUCKET_BATCH]:
+            in_rollup |= Q(location=location, bucket=start)
+            in_data |= Q(location=location, time__gte=start, time__lt=start + step)
+        with transaction.atomic():
+            SoilDataRollup.objects.filter(in_rollup, resolution=resolution).delete()
+            written += _write_rollups(SoilData.objects.filter(in_data), resolution)
+    return written
+
+
+def _write_rollups(soil_data, resolution):
+    """Aggregate `soil_data` into `resolution` buckets and upsert them."""
+    aggregates = {}
+    for metric in ROLLUP_METRICS:
+        aggregates[f"{metric}__min"] = Min(metric)
+        aggregates[f"{metric}__max"] = Max(metric)
+        aggregates[f"{metric}__avg"] = Avg(metric)
+        aggregates[f"{metric}__count"] = Count(metric)
+
+    buckets = (
+        soil_data
+        .annotate(bucket=Trunc("time", resolution, tzinfo=dt_timezone.utc))
+        .values("location", "bucket")
+        .annotate(**aggregates)
+        .order_by()
+    )
+
+    rollups = []
+    for row in buckets.iterator(chunk_size=2000):
+        for metric in ROLLUP_METRICS:
+            if not row[f"{metric}__count"]:
+                continue  # ✅ No readings for this metric in the bucket
+            rollups.append(SoilDataRollup(
+                location=row["location"],
+                resolution=resolution,
+                bucket=row["bucket"],
+                metric=metric,
+                min_value=row[f"{metric}__min"],
+                max_value=row[f"{metric}__max"],
+                mean_value=row[f"{metric}__avg"],
+                count=row[f"{metric}__count"],
+                last_updated=timezone.now(),
+            ))
+
+    SoilDataRollup.objects.bulk_create(
+        rollups,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["location", "resolution", "metric", "bucket"],
+        update_fields=["min_value", "max_value", "mean_value", "count", "last_updated"],
+    )
+    return len(rollups)
+
+
+def rebuild_soil_rollup_buckets(readings):
+    """
+    Recompute, from the current SoilData rows, the rollup buckets that contained `readings`
+    ((location, time) pairs, e.g. of deleted rows or of rows moved to another time). Buckets or metrics
+    left without readings are removed, which the timestamp-driven `refresh_soil_rollups` cannot notice.
+    Returns the number of rows written.
+    """
+    readings = set(readings)
+    written = 0
+    for resolution in ROLLUP_RESOLUTIONS:
+        written += _rebuild_buckets(resolution, {(location, bucket_start(moment, resolution)) for location, moment in readings})
+    logger.info(f"✅ Rebuilt soil rollups for {len({location for location, _ in readings})} location(s) after deletions or moves ({written} rows).")
+    return written
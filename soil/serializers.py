@@ -1,7 +1,19 @@
 from rest_framework import serializers
 from .models import SoilData
 
+DISPLAY_DATETIME_FORMAT = "%b. %d, %Y, %I:%M %p"
+
+
 class SoilDataSerializer(serializers.ModelSerializer):
     class Meta:
         model = SoilData
         fields = '__all__'
+
+
+class SoilDataListSerializer(SoilDataSerializer):
+    """
+    Read-only list representation: timestamps are rendered in local time in a readable format.
+    Formatting happens here so it only runs for the rows of the current page.
+    """
+    time = serializers.DateTimeField(format=DISPLAY_DATETIME_FORMAT, read_only=True)
+    last_updated = serializers.DateTimeField(format=DISPLAY_DATETIME_FORMAT, read_only=True)
@@ -0,0 +1,46 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import SoilData
+from .rollups import rebuild_soil_rollup_buckets
+
+_pending = threading.local()
+
+
+def _rebuild_pending_buckets():
+    readings = getattr(_pending, "readings", None)
+    if readings:
+        _pending.readings = set()
+        rebuild_soil_rollup_buckets(readings)
+
+
+def _rebuild_on_commit(location, moment):
+    if not hasattr(_pending, "readings"):
+        _pending.readings = set()
+    _pending.readings.add((location, moment))
+    # Registered per row: a rolled-back change drops its callback, and the next commit still drains the set
+    transaction.on_commit(_rebuild_pending_buckets)
+
+
+# ✅ SoilDataRollup is refreshed from new/updated rows only, so deletions are folded in here:
+# the buckets of every deleted reading are recomputed once the deleting transaction commits
+# (one rebuild per transaction, however many rows a queryset delete removed).
+@receiver(post_delete, sender=SoilData)
+def rebuild_rollups_on_delete(sender, instance, **kwargs):
+    _rebuild_on_commit(instance.location, instance.time)
+
+
+# ✅ Likewise for a reading whose time or location is edited: the refresh recomputes its new bucket,
+# but only this hook knows the bucket it left.
+@receiver(pre_save, sender=SoilData)
+def rebuild_rollups_on_move(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {"time", "location"} & set(update_fields):
+        return
+    previous = SoilData.objects.filter(pk=instance.pk).values_list("location", "time").first()
+    if previous and previous != (instance.location, instance.time):
+        _rebuild_on_commit(*previous)
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from sklearn.neighbors import BallTree
+
+from .models import SoilData
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(coords_rad, point_rad):
+    """Great-circle distance (km) between an (n, 2) array of [lat, lon] radians and one point."""
+    dlat = coords_rad[:, 0] - point_rad[0]
+    dlon = coords_rad[:, 1] - point_rad[1]
+    a = np.sin(dlat / 2) ** 2 + np.cos(coords_rad[:, 0]) * np.cos(point_rad[0]) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class SoilSampleIndex:
+    """
+    In-memory nearest-neighbour index over the coordinates of recent SoilData samples.
+
+    - A BallTree (haversine metric) holds every sample from the last `window_days`.
+    - Rows inserted since the last build are picked up incrementally (primary-key watermark)
+      into a small delta buffer that is searched by brute force.
+    - The tree is rebuilt when the delta grows past `max_delta` or after `rebuild_interval`
+      seconds, which also drops samples that slid out of the time window.
+    """
+
+    def __init__(self, window_days=365, refresh_interval=60, rebuild_interval=3600, max_delta=5000):
+        self.window_days = window_days
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.max_delta = max_delta
+
+        self._lock = threading.Lock()
+        self._tree = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._times = np.empty(0, dtype=np.float64)
+        self._delta_ids = np.empty(0, dtype=np.int64)
+        self._delta_coords = np.empty((0, 2), dtype=np.float64)
+        self._delta_times = np.empty(0, dtype=np.float64)
+        self._max_id = 0
+        self._last_refresh = 0.0
+        self._last_rebuild = 0.0
+
+    def _load(self, queryset):
+        rows = list(queryset.values_list("id", "latitude", "longitude", "time").iterator(chunk_size=5000))
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, 2)), np.empty(0)
+        ids, lats, lons, times = zip(*rows)
+        coords = np.radians(np.column_stack([lats, lons]).astype(np.float64))
+        return np.asarray(ids, dtype=np.int64), coords, np.array([t.timestamp() for t in times], dtype=np.float64)
+
+    def _base_queryset(self):
+        cutoff = timezone.now() - timedelta(days=self.window_days)
+        # ✅ (0, 0) is the model default, i.e. "no coordinates", not a real sample location.
+        # Estimated rows (soil.interpolation) are derived from samples, so they are not samples themselves.
+        return SoilData.objects.filter(time__gte=cutoff).exclude(latitude=0.0, longitude=0.0).exclude(data_source="estimated")
+
+    def rebuild(self):
+        ids, coords, times = self._load(self._base_queryset())
+        tree = BallTree(coords, metric="haversine") if len(ids) else None
+        self._tree, self._ids, self._times = tree, ids, times
+        self._delta_ids = np.empty(0, dtype=np.int64)
+        self._delta_coords = np.empty((0, 2), dtype=np.float64)
+        self._delta_times = np.empty(0, dtype=np.float64)
+        self._max_id = int(ids.max()) if len(ids) else SoilData.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        self._last_rebuild = time.monotonic()
+        logger.info(f"✅ Soil sample index rebuilt with {len(ids)} samples.")
+
+    def refresh(self, force=False):
+        """Bring the index up to date; cheap no-op when called within `refresh_interval`."""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            if not force and now - self._last_refresh < self.refresh_interval:
+                return
+            if force or self._last_rebuild == 0.0 or now - self._last_rebuild > self.rebuild_interval \
+                    or len(self._delta_ids) > self.max_delta:
+                self.rebuild()
+            else:
+                ids, coords, times = self._load(self._base_queryset().filter(id__gt=self._max_id))
+                if len(ids):
+                    self._delta_ids = np.concatenate([self._delta_ids, ids])
+                    self._delta_coords = np.vstack([self._delta_coords, coords])
+                    self._delta_times = np.concatenate([self._delta_times, times])
+                    self._max_id = int(ids.max())
+            self._last_refresh = now
+
+    def query(self, latitude, longitude, k=5, radius_km=50.0, since=None, until=None):
+        """
+        Return up to `k` `(soil_data_id, distance_km)` pairs within `radius_km`, nearest first.
+        `since` / `until` restrict the sample time window (aware datetimes).
+        """
+        self.refresh()
+        point = np.radians([float(latitude), float(longitude)])
+        since_ts = since.timestamp() if since else -np.inf
+        until_ts = until.timestamp() if until else np.inf
+
+        candidates = []
+        tree, ids, times = self._tree, self._ids, self._times
+        if tree is not None:
+            indices, distances = tree.query_radius([point], r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True)
+            indices, distances = indices[0], distances[0] * EARTH_RADIUS_KM
+            in_window = (times[indices] >= since_ts) & (times[indices] <= until_ts)
+            candidates.extend(zip(ids[indices[in_window]][:k].tolist(), distances[in_window][:k].tolist()))
+
+        delta_ids, delta_coords, delta_times = self._delta_ids, self._delta_coords, self._delta_times
+        if len(delta_ids):
+            distances = haversine_km(delta_coords, point)
+            mask = (distances <= radius_km) & (delta_times >= since_ts) & (delta_times <= until_ts)
+            candidates.extend(zip(delta_ids[mask].tolist(), distances[mask].tolist()))
+
+        candidates.sort(key=lambda item: item[1])
+        return candidates[:k]
+
+
+soil_sample_index = SoilSampleIndex(window_days=getattr(settings, "SOIL_INDEX_WINDOW_DAYS", 365))
+
+
+def find_nearest_soil(latitude, longitude, radius_km=None, max_age=None, until=None, k=5):
+    """
+    Return the closest SoilData sample to (latitude, longitude), or None when nothing is within range.
+
+    - `radius_km`: search radius (defaults to settings.SOIL_NEAREST_RADIUS_KM).
+    - `max_age`: timedelta; only samples newer than `until - max_age` are considered.
+    - `until`: only samples taken at or before this time (e.g. the time of a CSV row).
+    """
+    radius_km = radius_km if radius_km is not None else getattr(settings, "SOIL_NEAREST_RADIUS_KM", 50)
+    reference = until or timezone.now()
+    since = reference - max_age if max_age else None
+
+    matches = soil_sample_index.query(latitude, longitude, k=k, radius_km=radius_km, since=since, until=until)
+    if not matches:
+        return None
+
+    # ✅ One primary-key lookup; rows deleted since the last refresh are simply skipped
+    samples = SoilData.objects.in_bulk([soil_id for soil_id, _ in matches])
+    for soil_id, distance in matches:
+        if soil_id in samples:
+            logger.info(f"✅ Nearest soil sample {soil_id} is {distance:.2f} km from ({latitude}, {longitude})")
+            return samples[soil_id]
+    return None
@@ -0,0 +1,18 @@
+from datasets.sync import SyncFeed, register_sync_feed
+from .models import SoilData
+from .serializers import SoilDataSerializer
+
+
+def soil_sync_queryset(user):
+    """Soil data is shared: every user syncs the whole table (as the soil list API shows it)."""
+    return SoilData.objects.all()
+
+
+SOIL_FEED = register_sync_feed(SyncFeed(
+    name="soil",
+    model=SoilData,
+    updated_field="last_updated",
+    queryset=soil_sync_queryset,
+    serializer_class=SoilDataSerializer,
+    owner_scoped=False,
+))
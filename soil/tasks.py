@@ -0,0 +1,34 @@
+import logging
+from datetime import timedelta
+from celery import shared_task
+from django.utils import timezone
+from .rollups import ROLLUP_RESOLUTIONS, refresh_soil_rollups
+from .interpolation import refresh_soil_grid
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_soil_rollups_task(lookback_minutes=10):
+    """
+    Periodic (Celery beat) refresh of the soil rollup table.
+    Only the buckets touched by rows written in the last `lookback_minutes` are recomputed;
+    the lookback overlaps the beat interval so a delayed run never misses rows.
+    """
+    updated_since = timezone.now() - timedelta(minutes=lookback_minutes)
+    written = {
+        resolution: refresh_soil_rollups(resolution, updated_since=updated_since)
+        for resolution in ROLLUP_RESOLUTIONS
+    }
+    logger.info(f"✅ Soil rollups refreshed: {written}")
+    return written
+
+
+@shared_task
+def refresh_soil_grid_task():
+    """
+    Periodic (Celery beat) rebuild of the interpolation grid tiles touched by newly arrived samples.
+    """
+    rebuilt = refresh_soil_grid()
+    logger.info(f"✅ Soil grid refreshed: {rebuilt} tiles rebuilt.")
+    return rebuilt
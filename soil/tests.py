@@ -1,3 +1,152 @@
-from django.test import TestCase
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import interpolation
+from .models import SoilData, SoilDataRollup
+from .rollups import refresh_soil_rollups
+from .spatial import SoilSampleIndex, find_nearest_soil
+
+
+class SoilDataAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            first_name="Test", last_name="Farmer", username="farmer", email="farmer@example.com", password="pass",
+        )
+        start = datetime(2025, 3, 1, 12, tzinfo=dt_timezone.utc)
+        for day in range(5):
+            SoilData.objects.create(time=start + timedelta(days=day), location="Test Farm", soil_temp_0_to_7cm=15.0 + day)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_date_filters(self):
+        response = self.client.get(reverse("soil-data-list"), {"start_date": "2025-03-02", "end_date": "2025-03-04"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 3)
+
+    def test_invalid_dates(self):
+        for params in ({"start_date": "03/02/2025"}, {"end_date": "2025-02-30"}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("soil-data-list"), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()["status"], "error")
+
+
+
+class SoilSampleIndexTestCase(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.near = SoilData.objects.create(time=self.now - timedelta(days=2), location="Near", latitude=31.01, longitude=-98.0)
+        self.far = SoilData.objects.create(time=self.now - timedelta(days=1), location="Far", latitude=31.3, longitude=-98.0)
+        SoilData.objects.create(time=self.now, location="No coordinates")  # (0, 0) default
+        self.index = SoilSampleIndex(refresh_interval=0)
+
+    def test_nearest_first_within_radius(self):
+        matches = self.index.query(31.0, -98.0, radius_km=50)
+        self.assertEqual([soil_id for soil_id, _ in matches], [self.near.id, self.far.id])
+        self.assertAlmostEqual(matches[0][1], 1.11, places=2)
+        self.assertEqual([soil_id for soil_id, _ in self.index.query(31.0, -98.0, radius_km=10)], [self.near.id])
+
+    def test_time_window(self):
+        matches = self.index.query(31.0, -98.0, since=self.now - timedelta(days=1, hours=12))
+        self.assertEqual([soil_id for soil_id, _ in matches], [self.far.id])
+        matches = self.index.query(31.0, -98.0, until=self.now - timedelta(days=1, hours=12))
+        self.assertEqual([soil_id for soil_id, _ in matches], [self.near.id])
+
+    def test_new_samples_and_estimates(self):
+        self.index.query(31.0, -98.0)
+        # ✅ Picked up through the delta buffer; estimates are derived data and never returned
+        added = SoilData.objects.create(time=self.now, location="Added", latitude=31.005, longitude=-98.0)
+        SoilData.objects.create(time=self.now, location="grid:0:0", latitude=31.0, longitude=-98.0, data_source="estimated")
+        self.assertEqual(self.index.query(31.0, -98.0, k=1)[0][0], added.id)
+        self.index.rebuild()
+        self.assertEqual(self.index.query(31.0, -98.0, k=1)[0][0], added.id)
+        with mock.patch("soil.spatial.soil_sample_index", self.index):
+            self.assertEqual(find_nearest_soil(31.0, -98.0, radius_km=5).location, "Added")
+
+
+class SoilInterpolationTestCase(TestCase):
+    def setUp(self):
+        self.enterContext(override_settings(SOIL_GRID_DIR=self.enterContext(tempfile.TemporaryDirectory())))
+        self.enterContext(mock.patch.dict(interpolation._grids, clear=True))
+        now = timezone.now()
+        # Two samples on grid cell centres (0.25° grid), three cells apart
+        for latitude, ph_level in ((31.125, 6.0), (31.875, 8.0)):
+            SoilData.objects.create(time=now, location="Farm", latitude=latitude, longitude=-97.875, ph_level=ph_level)
+
+    def test_idw_estimate(self):
+        interpolation.refresh_soil_grid()
+        self.assertEqual(interpolation.estimate_soil_properties(31.125, -97.875)["ph_level"], 6.0)
+        # ✅ Cells between the samples lean towards the nearer one (weights 1 / distance²)
+        self.assertEqual(interpolation.estimate_soil_properties(31.4, -97.875)["ph_level"], 6.4)
+        self.assertEqual(interpolation.estimate_soil_properties(31.6, -97.875)["ph_level"], 7.6)
+        self.assertIsNone(interpolation.estimate_soil_properties(35.0, -97.875))  # ✅ Out of range of every sample
+
+    def test_one_estimate_per_cell_and_day(self):
+        self.assertIsNone(interpolation.get_estimated_soil(31.3, -97.9))  # No grid yet and no air temperature
+        first = interpolation.get_estimated_soil(31.3, -97.9, air_temp=20)
+        self.assertEqual((first.data_source, first.soil_temp_0_to_7cm), ("estimated", 17))
+        self.assertEqual(interpolation.get_estimated_soil(31.31, -97.91, air_temp=25), first)  # Same cell
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            SoilData.objects.create(time=first.time, location=first.location, data_source="estimated")
+
+
+class SoilRollupTestCase(TestCase):
+    def setUp(self):
+        self.start = datetime(2025, 3, 1, 10, tzinfo=dt_timezone.utc)
+        for minutes, moisture in ((0, 10.0), (30, 20.0), (24 * 60, 40.0)):
+            SoilData.objects.create(time=self.start + timedelta(minutes=minutes), location="Farm", moisture=moisture)
+        refresh_soil_rollups("hour")
+        refresh_soil_rollups("day")
+
+    def rollups(self, resolution):
+        return {
+            (row.bucket, row.metric): (row.min_value, row.max_value, row.mean_value, row.count)
+            for row in SoilDataRollup.objects.filter(location="Farm", resolution=resolution)
+        }
+
+    def test_full_refresh(self):
+        self.assertEqual(self.rollups("hour"), {
+            (self.start, "moisture"): (10.0, 20.0, 15.0, 2),
+            (self.start + timedelta(days=1), "moisture"): (40.0, 40.0, 40.0, 1),
+        })
+        self.assertEqual(self.rollups("day")[(self.start.replace(hour=0), "moisture")], (10.0, 20.0, 15.0, 2))
+
+    def test_incremental_refresh_touches_only_new_buckets(self):
+        untouched = SoilDataRollup.objects.get(resolution="hour", bucket=self.start + timedelta(days=1))
+        updated_since = timezone.now()
+        SoilData.objects.create(time=self.start + timedelta(minutes=45), location="Farm", moisture=30.0, ph_level=6.5)
+        written = refresh_soil_rollups("hour", updated_since=updated_since)
+        self.assertEqual(written, 2)  # ✅ moisture and ph_level of 10:00 only; the next day is not recomputed
+        untouched.refresh_from_db()
+        self.assertLess(untouched.last_updated, updated_since)
+        self.assertEqual(self.rollups("hour")[(self.start, "moisture")], (10.0, 30.0, 20.0, 3))
+        self.assertEqual(refresh_soil_rollups("hour", updated_since=timezone.now()), 0)
+
+    def test_delete_rebuilds_bucket(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SoilData.objects.filter(time=self.start + timedelta(days=1)).delete()
+        self.assertNotIn((self.start + timedelta(days=1), "moisture"), self.rollups("hour"))
+        self.assertEqual(len(self.rollups("day")), 1)
+
+    def test_moved_reading_rebuilds_old_bucket(self):
+        reading = SoilData.objects.get(moisture=20.0)
+        reading.time += timedelta(days=1)
+        updated_since = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            reading.save()
+        refresh_soil_rollups("hour", updated_since=updated_since)
+        self.assertEqual(self.rollups("hour"), {
+            (self.start, "moisture"): (10.0, 10.0, 10.0, 1),
+            (self.start + timedelta(days=1), "moisture"): (20.0, 40.0, 30.0, 2),
+        })
@@ -10,12 +10,15 @@ from .views import (
     soil_dashboard,
     SampleCSVDownloadAPIView,
     GeocodeAPIView,
+    SoilRollupAPIView,
 )
+from datasets.views import SyncFeedAPIView
 
 urlpatterns = [
     # ✅ Soil Data APIs
     path('api/data/', SoilDataAPIView.as_view(), name='soil-data-list'),
     path('api/data/<int:pk>/', SoilDataDetailAPIView.as_view(), name='soil-data-detail'),
+    path('api/data/changes/', SyncFeedAPIView.as_view(feed_name='soil'), name='soil-data-changes'),  # ✅ Delta sync
     
     # ✅ Fetch Live Soil Data (from external API)
     path('api/fetch/', SoilDataFetchAPIView.as_view(), name='soil-data-fetch'),
@@ -42,4 +45,7 @@ urlpatterns = [
 
     path('api/geocode/', GeocodeAPIView.as_view(), name='geocode-api'),
 
+    # ✅ Aggregated (hourly / daily) soil metrics
+    path('api/rollups/', SoilRollupAPIView.as_view(), name='soil-rollups'),
+
 ]
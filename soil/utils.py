@@ -1,9 +1,9 @@
 import pandas as pd
 from .models import SoilData
-import requests
 from django.utils.timezone import localtime
 import logging
-from django.conf import settings
+from geocoding.services import geocode_dataframe
+from datasets.parsing import parse_timestamps
 
 # Setup logger
 logger = logging.getLogger(__name__)
@@ -61,23 +61,21 @@ def validate_soil_data(data):
 def save_soil_data(soil_data, original_location=None, data_source="manual", user=None, sensor_type=None):
     """
     Save or update soil data in the database with proper handling for missing values.
+    Returns the IDs of the saved rows.
     """
+    saved_ids = []
+    # ✅ Resolve missing coordinates once per distinct location, not once per row
+    geocode_dataframe(soil_data)
+
     for _, row in soil_data.iterrows():
         try:
             # Log received data
             logger.info(f"Processing soil data: {row.to_dict()}")
 
             # Ensure latitude & longitude are present
-            if "latitude" not in row or "longitude" not in row or row["latitude"] is None or row["longitude"] is None:
-                logger.warning(f"Missing coordinates, attempting geolocation for {row['location']}")
-                geocode_result = geocode_location(row["location"])
-                
-                if geocode_result:
-                    row["latitude"] = geocode_result["latitude"]
-                    row["longitude"] = geocode_result["longitude"]
-                else:
-                    logger.error(f"Geocoding failed for location: {row['location']}")
-                    continue  # Skip this entry if geolocation fails
+            if pd.isna(row["latitude"]) or pd.isna(row["longitude"]):
+                logger.error(f"Geocoding failed for location: {row.get('location')}")
+                continue  # Skip this entry if geolocation fails
 
             # Validate data before saving
             validation_errors = validate_soil_data(row.to_dict())
@@ -106,68 +104,78 @@ def save_soil_data(soil_data, original_location=None, data_source="manual", user
             }
 
             # Save or update data
-            SoilData.objects.update_or_create(
+            soil_obj, _ = SoilData.objects.update_or_create(
                 time=row['time'], location=row['location'], user=user,
                 defaults=soil_entry
             )
+            saved_ids.append(soil_obj.id)
             logger.info(f"Soil data successfully saved for location: {row['location']} by user: {user if user else 'Anonymous'}")
 
         except Exception as e:
             logger.error(f"Error saving soil data: {e}")
 
+    return saved_ids
+
 
 def process_csv_data(csv_file, user=None):
     """
     Process CSV file upload, validate, and save soil data.
+    Returns `(success, message, saved_ids)`.
     """
     try:
         df = pd.read_csv(csv_file)
 
-        required_columns = ["time", "location", "soil_temp_0_to_7cm", "soil_temp_7_to_28cm", "moisture", "ph_level", "latitude", "longitude"]
+        required_columns = ["time", "location", "soil_temp_0_to_7cm", "soil_temp_7_to_28cm", "moisture", "ph_level"]
         optional_columns = ["nitrogen", "phosphorus", "potassium"]
 
         # ✅ Ensure column headers match exactly
         missing_columns = [col for col in required_columns if col not in df.columns]
         if missing_columns:
-            return False, f"❌ Missing required columns: {', '.join(missing_columns)}"
+            return False, f"❌ Missing required columns: {', '.join(missing_columns)}", []
 
         # ✅ Fill missing optional columns with None
         for col in optional_columns:
             if col not in df.columns:
                 df[col] = None  
 
-        # ✅ Convert time column to datetime format
-        df["time"] = pd.to_datetime(df["time"], errors="coerce")
+        # ✅ Convert time column to UTC datetimes (vectorized; shared with the recommendations import)
+        df["time"] = parse_timestamps(df["time"])
         df.dropna(subset=["time"], inplace=True)
 
         # ✅ Ensure each row has the correct number of columns
         if df.isnull().all(axis=1).any():
-            return False, f"❌ Detected rows with missing values. Check CSV format."
+            return False, f"❌ Detected rows with missing values. Check CSV format.", []
 
         # ✅ Check for duplicate timestamps per location
         duplicates = df[df.duplicated(subset=["time", "location"], keep=False)]
         if not duplicates.empty:
-            return False, f"❌ Duplicate timestamp entries found: {duplicates[['time', 'location']].to_dict(orient='records')}"
+            return False, f"❌ Duplicate timestamp entries found: {duplicates[['time', 'location']].to_dict(orient='records')}", []
+
+        # ✅ Batch-geocode rows without coordinates (each distinct location resolved once)
+        geocode_dataframe(df)
+        unresolved = df.loc[df["latitude"].isna() | df["longitude"].isna(), "location"].unique().tolist()
+        if unresolved:
+            return False, f"❌ Could not find coordinates for locations: {', '.join(map(str, unresolved))}", []
 
         # ✅ Validate numeric columns
-        numeric_columns = required_columns[2:] + optional_columns  # All columns except "time" and "location"
+        numeric_columns = required_columns[2:] + ["latitude", "longitude"] + optional_columns  # All columns except "time" and "location"
         for col in numeric_columns:
             if col in df.columns:
                 df[col] = pd.to_numeric(df[col], errors='coerce')  # Convert to numeric
                 if df[col].isnull().any():
-                    return False, f"❌ Invalid values detected in column: {col}"
+                    return False, f"❌ Invalid values detected in column: {col}", []
 
         # ✅ Log user who uploaded CSV (if authenticated)
         user_info = user.email if user and hasattr(user, "email") else "Anonymous"
         logger.info(f"Processing CSV upload by user: {user_info}")
 
         # ✅ Save data
-        save_soil_data(df, data_source="csv", user=user)
-        return True, f"✅ CSV file processed successfully by {user_info}."
+        saved_ids = save_soil_data(df, data_source="csv", user=user)
+        return True, f"✅ CSV file processed successfully by {user_info}.", saved_ids
 
     except Exception as e:
         logger.error(f"Error processing CSV file: {e}")
-        return False, f"❌ Error processing CSV file: {str(e)}"
+        return False, f"❌ Error processing CSV file: {str(e)}", []
 
 
 def process_sensor_data(sensor_data):
@@ -215,44 +223,3 @@ def process_sensor_data(sensor_data):
     except Exception as e:
         logger.error(f"Error processing sensor data: {e}")
         return False, f"Error processing sensor data: {str(e)}"
-
-
-def geocode_location(location_name):
-    """
-    Fetch latitude and longitude for a given location name using OpenCage Geocoder.
-    Returns latitude & longitude but logs warnings for low-confidence results.
-    """
-    try:
-        API_KEY = settings.OPENCAGE_API_KEY  # ✅ Use Django settings
-        if not API_KEY:
-            raise ValueError("Missing OpenCage API Key. Check .env file.")
-        url = f"https://api.opencagedata.com/geocode/v1/json?q={location_name}&key={API_KEY}"
-
-        response = requests.get(url)
-        response.raise_for_status()
-
-        data = response.json()
-
-        # ✅ Log the full response for debugging
-        logger.info(f"Geocoder Response for '{location_name}': {data}")
-
-        if data.get('results'):
-            result = data['results'][0]
-            coordinates = result['geometry']
-            confidence = result.get('confidence', 0)
-
-            # ✅ Log confidence level and proceed even if it's low
-            if confidence < 7:
-                logger.warning(f"⚠️ Low confidence ({confidence}) geocode result for '{location_name}', but using it anyway.")
-            
-            logger.info(f"✅ Geocoded '{location_name}' with confidence {confidence}: {coordinates}")
-
-            return {"latitude": coordinates['lat'], "longitude": coordinates['lng']}
-
-        else:
-            logger.warning(f"❌ Geocoding failed: No results for location '{location_name}'")
-            return None
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"🚨 Geocoding API error: {e}")
-        return None
@@ -4,24 +4,29 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
 from django.db.models import Q
 from django.http import HttpResponse
 import csv
 import logging
 import pandas as pd
-from .models import SoilData
-from .serializers import SoilDataSerializer
-from .utils import save_soil_data, process_csv_data, process_sensor_data, validate_soil_data, geocode_location
+from .models import SoilData, SoilDataRollup
+from .serializers import SoilDataSerializer, SoilDataListSerializer
+from farming_ai.pagination import KeysetPagination
+from .rollups import ROLLUP_METRICS, choose_resolution
+from .utils import save_soil_data, process_csv_data, process_sensor_data, validate_soil_data
+from geocoding.services import geocode
 from django.shortcuts import render
-from django.utils.dateparse import parse_date
+from django.utils.dateparse import parse_date, parse_datetime
 from django.contrib import messages
-from django.utils.timezone import localtime
 from django.utils.timezone import now
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-import math
+from datasets.uploads import stream_upload
+from datasets.exports import streaming_csv_response
+from .exports import SOIL_EXPORT, soil_export_queryset
+from datasets.utils import register_upload, find_processed_duplicate, mark_duplicate, finish_upload
 import os
+from datetime import time as dt_time, timedelta, timezone as dt_timezone
 
 
 
@@ -53,31 +58,16 @@ logger = logging.getLogger(__name__)
 
 
 def soil_dashboard(request):
-    """ Render the Soil Data Dashboard Page. """
-    soil_data = SoilData.objects.all()
-    for data in soil_data:
-        data.time = localtime(data.time).strftime("%b. %d, %Y, %I:%M %p")  # Format time to readable format
-        data.last_updated = localtime(data.last_updated).strftime("%b. %d, %Y, %I:%M %p")  # Format last_updated
-    return render(request, 'soil_dashboard.html', {"soil_data": soil_data})
+    """ Render the Soil Data Dashboard Page (the table is filled through the API). """
+    return render(request, 'soil_dashboard.html')
 
 
-# ✅ Custom Pagination Class
-class SoilDataPagination(PageNumberPagination):
+# ✅ Keyset Pagination on (time, id)
+class SoilDataCursorPagination(KeysetPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 50
-
-    def get_paginated_response(self, data):
-        page_size = self.get_page_size(self.request) or self.page_size
-        total_pages = math.ceil(self.page.paginator.count / page_size)
-        return Response({
-            'count': self.page.paginator.count,
-            'total_pages': total_pages,
-            'current_page': self.page.number,
-            'next': self.get_next_link(),
-            'previous': self.get_previous_link(),
-            'results': data
-        })
+    ordering_field = "time"
 
 
 # ✅ List & Retrieve Soil Data
@@ -87,40 +77,40 @@ class SoilDataAPIView(APIView):
 
     def get(self, request):
         try:
-            sort = request.query_params.get("sort", "time")
             order = request.query_params.get("order", "desc")  # ✅ Default to "desc" (newest first)
             start_date = request.query_params.get("start_date")
             end_date = request.query_params.get("end_date")
             location = request.query_params.get("location")
 
-            # ✅ Get data & sort by time (descending order)
-            soil_data = SoilData.objects.all().order_by('-time')  # ✅ Default: Newest first
+            # ✅ Malformed dates are the client's error, not a 500 (same checks as the export)
+            if start_date and not SoilDataExportAPIView.is_valid_date(start_date):
+                return Response({"status": "error", "message": "❌ Invalid start date format. Use YYYY-MM-DD."}, status=400)
+            if end_date and not SoilDataExportAPIView.is_valid_date(end_date):
+                return Response({"status": "error", "message": "❌ Invalid end date format. Use YYYY-MM-DD."}, status=400)
+
+            soil_data = SoilData.objects.all()
 
-            # ✅ Apply filters if provided
+            # ✅ Apply filters if provided (half-open datetime ranges keep the `time` index usable)
             if start_date:
                 start_date = parse_date(start_date)
-                soil_data = soil_data.filter(time__date__gte=start_date)
+                soil_data = soil_data.filter(time__gte=datetime.combine(start_date, dt_time.min, tzinfo=dt_timezone.utc))
             if end_date:
                 end_date = parse_date(end_date)
-                soil_data = soil_data.filter(time__date__lte=end_date)
+                soil_data = soil_data.filter(time__lt=datetime.combine(end_date + timedelta(days=1), dt_time.min, tzinfo=dt_timezone.utc))
             if location:
                 soil_data = soil_data.filter(Q(original_location__icontains=location) | Q(location__icontains=location))
 
-            # ✅ If user wants ascending order, override
-            if order == "asc":
-                soil_data = soil_data.order_by('time')
-
-            # ✅ Convert time to readable format
-            for data in soil_data:
-                data.time = localtime(data.time).strftime("%b. %d, %Y, %I:%M %p")
-                data.last_updated = localtime(data.last_updated).strftime("%b. %d, %Y, %I:%M %p")
-
-            # ✅ Paginate & return response
-            paginator = SoilDataPagination()
+            # ✅ Paginate on (time, id): newest first unless the user asks for ascending order
+            paginator = SoilDataCursorPagination()
+            paginator.descending = order != "asc"
             paginated_data = paginator.paginate_queryset(soil_data, request)
-            serializer = SoilDataSerializer(paginated_data, many=True)
+
+            # ✅ Timestamps are formatted by the serializer, for this page only
+            serializer = SoilDataListSerializer(paginated_data, many=True)
             return paginator.get_paginated_response(serializer.data)
 
+        except NotFound:
+            raise
         except Exception as e:
             logger.error(f"Error fetching soil data: {e}")
             messages.error(request, "Failed to fetch soil data. Please try again later.")
@@ -152,7 +142,7 @@ class ManualSoilDataEntryAPIView(APIView):
             # Ensure location is geocoded if latitude & longitude are missing
             if "latitude" not in data or "longitude" not in data or not data["latitude"] or not data["longitude"]:
                 logger.warning(f"Missing coordinates, attempting geolocation for {data['location']}")
-                geocode_result = geocode_location(data["location"])
+                geocode_result = geocode(data["location"])
                 
                 if geocode_result:
                     data["latitude"] = geocode_result["latitude"]
@@ -190,23 +180,38 @@ class CSVUploadAPIView(APIView):
             upload_dir = os.path.join("uploadCSVSOIL", today_str, username)
             custom_file_name = os.path.join(upload_dir, file.name)
 
-            # Save the file properly using Django's default storage (Cloudflare R2)
-            file_name = default_storage.save(custom_file_name, ContentFile(file.read()))
-            file_url = default_storage.url(file_name)  # Get URL instead of absolute path
+            # Stream the file to Django's default storage (Cloudflare R2) without buffering it in memory
+            streamed = stream_upload(file, custom_file_name)
+            upload = register_upload(request.user, "soil", streamed, file.name)
+            file_name, file_url = upload.file_key, upload.file_url
 
             logger.info(f"✅ File successfully uploaded: {file_url}")
 
+            # ✅ Same content already imported by this user: return the earlier result instead of re-importing
+            previous = find_processed_duplicate(upload)
+            if previous:
+                result = mark_duplicate(upload, previous)
+                return Response({
+                    "status": "success",
+                    "message": "This CSV file was already processed; returning the previous result.",
+                    "file_url": file_url,
+                    "saved_ids": result.get("saved_ids", []),
+                    "duplicate_of": result["duplicate_of"]
+                }, status=status.HTTP_200_OK)
+
             # Open file from Cloudflare R2 and process CSV data
             with default_storage.open(file_name, "rb") as csv_file:
-                success, message = process_csv_data(csv_file, user=request.user)
+                success, message, saved_ids = process_csv_data(csv_file, user=request.user)
 
+            finish_upload(upload, {"message": message, "saved_ids": saved_ids}, status="completed" if success else "failed")
             if not success:
                 return Response({"status": "error", "message": message}, status=status.HTTP_400_BAD_REQUEST)
 
             return Response({
                 "status": "success",
                 "message": "CSV file uploaded and processed.",
-                "file_url": file_url  # Return Cloudflare R2 URL
+                "file_url": file_url,  # Return Cloudflare R2 URL
+                "saved_ids": saved_ids
             }, status=status.HTTP_201_CREATED)
 
         except Exception as e:
@@ -305,7 +310,7 @@ class SoilDataFetchAPIView(APIView):
                                 status=status.HTTP_400_BAD_REQUEST)
             
             if location_name:
-                geocoded = geocode_location(location_name)
+                geocoded = geocode(location_name)
                 if geocoded:
                     latitude = geocoded['latitude']
                     longitude = geocoded['longitude']
@@ -346,10 +351,8 @@ class SoilDataExportAPIView(APIView):
 
     def get(self, request):
         try:
-            location = request.query_params.get("location", "").strip()
             start_date = request.query_params.get("start_date", "").strip()
             end_date = request.query_params.get("end_date", "").strip()
-            data_source = request.query_params.get("data_source", "").strip()
 
             if start_date and not self.is_valid_date(start_date):
                 return Response({"status": "error", "message": "❌ Invalid start date format. Use YYYY-MM-DD."}, status=400)
@@ -357,43 +360,24 @@ class SoilDataExportAPIView(APIView):
             if end_date and not self.is_valid_date(end_date):
                 return Response({"status": "error", "message": "❌ Invalid end date format. Use YYYY-MM-DD."}, status=400)
 
-            soil_data = SoilData.objects.all()
-            if location:
-                soil_data = soil_data.filter(Q(location__iexact=location) | Q(original_location__iexact=location))
-            if start_date and end_date:
-                soil_data = soil_data.filter(time__date__range=[start_date, end_date])
-            elif start_date:
-                soil_data = soil_data.filter(time__date__gte=start_date)
-            elif end_date:
-                soil_data = soil_data.filter(time__date__lte=end_date)
-            if data_source:
-                soil_data = soil_data.filter(data_source=data_source)
-
+            soil_data = soil_export_queryset(request.user, request.query_params)
             if not soil_data.exists():
                 return Response({"status": "empty", "message": "⚠️ No data found for the selected filters."}, status=200)
 
-            response = HttpResponse(content_type="text/csv")
-            response["Content-Disposition"] = 'attachment; filename="soil_data_filtered.csv"'
-            writer = csv.writer(response)
-
-            writer.writerow(["Time", "Location", "Soil Temp (0-7cm)", "Soil Temp (7-28cm)", "Moisture", "pH Level", 
-                             "Nitrogen", "Phosphorus", "Potassium", "Latitude", "Longitude", "Data Source"])
-
-            for record in soil_data:
-                location_name = record.location if record.location else (record.original_location if record.original_location else "Unknown")
-
-                writer.writerow([
-                    record.time, location_name, record.soil_temp_0_to_7cm, record.soil_temp_7_to_28cm,
-                    record.moisture, record.ph_level, record.nitrogen, record.phosphorus, record.potassium,
-                    record.latitude, record.longitude, record.data_source
-                ])
-
-            return response
+            # ✅ Streamed in chunks instead of building the whole CSV in memory
+            return streaming_csv_response(SOIL_EXPORT, soil_data)
 
         except Exception as e:
             logger.error(f"❌ Error exporting soil data: {e}")
             return Response({"status": "error", "message": "❌ Failed to export CSV due to an internal error."}, status=500)
 
+    @staticmethod
+    def is_valid_date(value):
+        try:
+            return parse_date(value) is not None
+        except ValueError:
+            return False
+
 
 
 
@@ -410,7 +394,7 @@ class GeocodeAPIView(APIView):
             if not location_name:
                 return Response({"status": "error", "message": "Location name is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-            geocoded = geocode_location(location_name)
+            geocoded = geocode(location_name)
             if geocoded:
                 return Response({"status": "success", "latitude": geocoded["latitude"], "longitude": geocoded["longitude"]})
             else:
@@ -419,3 +403,84 @@ class GeocodeAPIView(APIView):
         except Exception as e:
             logger.error(f"Error in geocoding API: {e}")
             return Response({"status": "error", "message": "Internal server error."}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+# ✅ Aggregated Soil Metrics (served from the rollup table)
+class SoilRollupAPIView(APIView):
+    """
+    Returns min / max / mean / count of one soil metric for a location over a time range.
+    The resolution (hourly or daily) is chosen so the number of buckets fits `max_points`.
+
+    Query params: location (required), metric, start, end (YYYY-MM-DD or ISO datetime), max_points
+    """
+    permission_classes = [IsAuthenticated]
+
+    DEFAULT_MAX_POINTS = 500
+    MAX_POINTS_LIMIT = 5000
+
+    def get(self, request):
+        location = request.query_params.get("location", "").strip()
+        metric = request.query_params.get("metric", "soil_temp_0_to_7cm")
+
+        if not location:
+            return Response({"status": "error", "message": "Location is required."}, status=status.HTTP_400_BAD_REQUEST)
+        if metric not in ROLLUP_METRICS:
+            return Response({"status": "error", "message": f"Unsupported metric. Choose one of: {', '.join(ROLLUP_METRICS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            max_points = int(request.query_params.get("max_points", self.DEFAULT_MAX_POINTS))
+        except ValueError:
+            return Response({"status": "error", "message": "max_points must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        max_points = max(1, min(max_points, self.MAX_POINTS_LIMIT))
+
+        try:
+            end = self.parse_bound(request.query_params.get("end"), end_of_day=True) or now()
+            start = self.parse_bound(request.query_params.get("start")) or end - timedelta(days=7)
+        except ValueError:
+            return Response({"status": "error", "message": "start and end must be dates (YYYY-MM-DD) or ISO datetimes."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if start >= end:
+            return Response({"status": "error", "message": "start must be before end."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resolution = choose_resolution(start, end, max_points)
+        points = SoilDataRollup.objects.filter(
+            location=location, resolution=resolution, metric=metric,
+            bucket__gte=start, bucket__lt=end,
+        ).order_by("bucket").values("bucket", "min_value", "max_value", "mean_value", "count")[:max_points]
+
+        return Response({
+            "location": location,
+            "metric": metric,
+            "resolution": resolution,
+            "start": start,
+            "end": end,
+            "points": [
+                {
+                    "bucket": point["bucket"],
+                    "min": point["min_value"],
+                    "max": point["max_value"],
+                    "mean": round(point["mean_value"], 3) if point["mean_value"] is not None else None,
+                    "count": point["count"],
+                }
+                for point in points
+            ],
+        })
+
+    @staticmethod
+    def parse_bound(value, end_of_day=False):
+        """Parse a date or ISO datetime query param into an aware UTC datetime (None when absent, ValueError when invalid)."""
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            parsed_date = parse_date(value)
+            if parsed_date is None:
+                raise ValueError(f"Invalid date: {value}")
+            parsed = datetime.combine(parsed_date, dt_time.min)
+            if end_of_day:
+                parsed += timedelta(days=1)  # ✅ Dates are inclusive: stop at the next midnight
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=dt_timezone.utc)
+        return parsed
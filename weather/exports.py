@@ -0,0 +1,34 @@
+from django.db.models import Q
+from datasets.exports import ExportDataset, date_range_lookups, register_export
+from .models import WeatherData
+
+
+def weather_export_queryset(user, params):
+    """
+    Weather data with the export filters (location, start_date, end_date), oldest first.
+    Dates become a half-open range on the indexed `time` column. Raises ValueError for invalid dates.
+    """
+    location = (params.get("location") or "").strip()
+
+    weather_data = WeatherData.objects.filter(**date_range_lookups("time", params))
+    if location:
+        weather_data = weather_data.filter(Q(location__iexact=location) | Q(original_location__iexact=location))
+    return weather_data.order_by("time")
+
+def _format_weather_row(row):
+    time, location, original_location, *values = row
+    return [time, original_location or location, *values]
+
+
+WEATHER_EXPORT = register_export(ExportDataset(
+    name="weather",
+    headers=["Time", "Location", "Temperature (2m)", "Relative Humidity (2m)", "Wind Speed (10m)",
+             "Precipitation", "Latitude", "Longitude"],
+    fields=["time", "location", "original_location", "temperature_2m", "relative_humidity_2m", "wind_speed_10m",
+            "precipitation", "latitude", "longitude"],
+    queryset=weather_export_queryset,
+    format_row=_format_weather_row,
+    filename="weather_data_export.csv",
+    filters=["location", "start_date", "end_date"],
+    types=["datetime", "string", "float", "float", "float", "float", "float", "float"],
+))
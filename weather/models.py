@@ -1,6 +1,7 @@
 from datetime import timedelta
 from django.db import models
-from django.db.models import Sum
+from django.db.models import FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 
 
 class WeatherData(models.Model):
@@ -34,6 +35,20 @@ class WeatherData(models.Model):
             time__gte=last_30_days, time__lte=self.time
         ).aggregate(Sum('precipitation'))['precipitation__sum'] or 0
         return total_precip
+
+
+def precip_30day_sum_subquery(weather_path="weather_data"):
+    """
+    Queryset expression for `WeatherData.get_precip_30day_sum` of a related weather row
+    (`weather_path` is the lookup path to it), so a list can annotate it in one query
+    instead of running one aggregate per row. Uses the (location, time) index.
+    """
+    window = WeatherData.objects.filter(
+        location=OuterRef(f"{weather_path}__location"),
+        time__gte=OuterRef(f"{weather_path}__time") - timedelta(days=30),
+        time__lte=OuterRef(f"{weather_path}__time"),
+    ).order_by().values("location").annotate(total=Sum("precipitation")).values("total")
+    return Coalesce(Subquery(window, output_field=FloatField()), Value(0.0))
     
     
     
@@ -23,4 +23,6 @@ class WeatherDataSerializer(serializers.ModelSerializer):
 
 
     def get_precip_30day_sum(self, obj):
+        if hasattr(obj, "precip_30day_sum"):  # ✅ Precomputed by the queryset (no per-row aggregate query)
+            return obj.precip_30day_sum
         return obj.get_precip_30day_sum()
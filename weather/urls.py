@@ -9,7 +9,7 @@ from .views import (
     delete_weather_data,
     weather_dashboard,
     get_weather_forecast,
-    
+    export_weather_data,
 )
 
 urlpatterns = [
@@ -26,6 +26,7 @@ urlpatterns = [
     path("api/data/<int:pk>/", get_weather_detail, name="get_weather_detail"),
     path("api/data/<int:pk>/update/", update_weather_data, name="update_weather_data"),
     path("api/data/<int:pk>/delete/", delete_weather_data, name="delete_weather_data"),
+    path("api/export/", export_weather_data, name="export_weather_data"),  # ✅ Streamed CSV export
 
 
 ]
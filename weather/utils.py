@@ -1,10 +1,10 @@
 import pandas as pd
+from datetime import datetime, timedelta, time as dt_time
+from django.utils import timezone
 from .models import WeatherData
 import requests_cache
 from retry_requests import retry
 import openmeteo_requests
-import requests
-from django.conf import settings
 
 # Set up caching and retry logic for Open-Meteo requests
 cache_session = requests_cache.CachedSession('.cache', expire_after=3600)
@@ -36,6 +36,42 @@ def save_weather_data(weather_data, original_location=None):
 
 
 
+HISTORY_BATCH_SIZE = 500  # ✅ Distinct points per query (keeps IN lists well below DB parameter limits)
+
+
+def historical_weather_map(pairs):
+    """
+    Weather readings for a batch of `(latitude, longitude, date)` pairs.
+    Returns {(latitude, longitude, date): WeatherData}; pairs without a reading are missing.
+
+    Each batch is one half-open range query (`date_min <= time < date_max + 1 day`) on the indexed `time`
+    column, instead of one `time__date=` query per pair (which can't use the index). When a day has
+    several readings, the one `.first()` would have returned (default ordering) wins.
+    """
+    wanted = {(float(lat), float(lon), day) for lat, lon, day in pairs}
+    if not wanted:
+        return {}
+    tz = timezone.get_current_timezone()
+    found = {}
+    wanted_list = sorted(wanted)
+    for i in range(0, len(wanted_list), HISTORY_BATCH_SIZE):
+        batch = wanted_list[i:i + HISTORY_BATCH_SIZE]
+        days = [day for _, _, day in batch]
+        start = timezone.make_aware(datetime.combine(min(days), dt_time.min), tz)
+        end = timezone.make_aware(datetime.combine(max(days) + timedelta(days=1), dt_time.min), tz)
+        readings = WeatherData.objects.filter(
+            latitude__in={lat for lat, _, _ in batch},
+            longitude__in={lon for _, lon, _ in batch},
+            time__gte=start,
+            time__lt=end,
+        )
+        for reading in readings:
+            key = (reading.latitude, reading.longitude, timezone.localtime(reading.time, tz).date())
+            if key in wanted:
+                found.setdefault(key, reading)
+    return found
+
+
 def fetch_weather_data_from_openmeteo(latitude, longitude):
     """
     Fetch real-time weather data from Open-Meteo for a specific location.
@@ -80,38 +116,3 @@ def fetch_weather_data_from_openmeteo(latitude, longitude):
     except Exception as e:
         print(f"Error fetching weather data: {e}")
         return pd.DataFrame()
-
-
-
-
-def geocode_location(location_name):
-    """
-    Fetch latitude and longitude for a given location name using OpenCage Geocoder.
-    Parameters:
-    - location_name (str): Name of the location (e.g., "Berlin").
-    Returns:
-    - dict: A dictionary with 'latitude' and 'longitude'.
-    """
-    try:
-        # Replace with your OpenCage Geocoder API key
-        API_KEY = settings.OPENCAGE_API_KEY  # ✅ Use Django settings
-        if not API_KEY:
-            raise ValueError("Missing OpenCage API Key. Check .env file.")
-        url = f"https://api.opencagedata.com/geocode/v1/json?q={location_name}&key={API_KEY}"
-
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-
-        data = response.json()
-        if data['results']:
-            coordinates = data['results'][0]['geometry']
-            return {"latitude": coordinates['lat'], "longitude": coordinates['lng']}
-        else:
-            raise ValueError(f"No results found for location: {location_name}")
-
-    except Exception as e:
-        print(f"Error in geocoding: {e}")
-        return None
-
-
-
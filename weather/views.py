@@ -1,13 +1,18 @@
 # views.py
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django.http import JsonResponse
 from .models import WeatherData
 from .serializers import WeatherDataSerializer
-from .utils import fetch_weather_data_from_openmeteo, save_weather_data, geocode_location
+from .utils import fetch_weather_data_from_openmeteo, save_weather_data
+from .exports import WEATHER_EXPORT, weather_export_queryset
+from datasets.exports import streaming_csv_response
+from farming_ai.conditional import conditional_get
+from farming_ai.renderers import FAST_RENDERER_CLASSES
+from geocoding.services import geocode
 from rest_framework.permissions import IsAuthenticated
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.dateparse import parse_datetime
@@ -60,6 +65,7 @@ class WeatherDataPagination(PageNumberPagination):
 # ---------------------------
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(FAST_RENDERER_CLASSES)
 def get_weather_data(request):
     """
     Retrieve weather data intelligently by combining stored historical data and forecast data.
@@ -135,7 +141,7 @@ def get_weather_data(request):
         ).order_by('time')
         if not future_data.exists():
             # Forecast data is not stored – fetch it.
-            coordinates = geocode_location(location)
+            coordinates = geocode(location)
             if not coordinates:
                 return Response({"error": "Could not fetch coordinates for this location."}, status=400)
             forecast_df = fetch_weather_data_from_openmeteo(coordinates["latitude"], coordinates["longitude"])
@@ -162,7 +168,7 @@ def get_weather_data(request):
             time__date__gte=(today + timedelta(days=1)), time__date__lte=end_date_obj
         ).order_by('time')
         if not future_data.exists():
-            coordinates = geocode_location(location)
+            coordinates = geocode(location)
             if not coordinates:
                 return Response({"error": "Could not fetch coordinates for this location."}, status=400)
             forecast_df = fetch_weather_data_from_openmeteo(coordinates["latitude"], coordinates["longitude"])
@@ -191,7 +197,7 @@ def fetch_weather_for_location(request):
     location_name = request.data.get('location')
     if not location_name:
         return Response({'error': 'Location is required'}, status=400)
-    coordinates = geocode_location(location_name)
+    coordinates = geocode(location_name)
     if not coordinates:
         return Response({'error': 'Could not fetch coordinates for this location'}, status=400)
     weather_data = fetch_weather_data_from_openmeteo(coordinates["latitude"], coordinates["longitude"])
@@ -243,6 +249,23 @@ def delete_weather_data(request, pk):
         return Response({"error": "Weather record not found."}, status=404)
 
 
+# ---------------------------
+# API: Export Weather Data as CSV (streamed)
+# ---------------------------
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_weather_data(request):
+    """
+    Stream stored weather data as CSV.
+    Optional filters: location, start_date and end_date (YYYY-MM-DD, inclusive).
+    """
+    try:
+        weather_data = weather_export_queryset(request.user, request.query_params)
+    except ValueError:
+        return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
+    return streaming_csv_response(WEATHER_EXPORT, weather_data)
+
+
 # ---------------------------
 # Web View: Weather Dashboard
 # ---------------------------
@@ -255,13 +278,23 @@ def weather_dashboard(request):
 # ---------------------------
 # API: Get 7-Day Future Weather Forecast
 # ---------------------------
+def forecast_version(request):
+    """
+    The forecast comes from Open-Meteo through an hourly request cache, so for a given location
+    (part of the query string, hence of the ETag) it only changes from one hour to the next:
+    the current UTC hour versions it without any lookup.
+    """
+    return timezone.now().strftime("%Y-%m-%dT%H")
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(forecast_version)
 def get_weather_forecast(request):
     location_name = request.query_params.get("location", None)
     if not location_name:
         return Response({"error": "Location is required"}, status=400)
-    coordinates = geocode_location(location_name)
+    coordinates = geocode(location_name)
     if not coordinates:
         return Response({"error": "Could not fetch coordinates for this location"}, status=400)
     weather_data = fetch_weather_data_from_openmeteo(coordinates["latitude"], coordinates["longitude"])